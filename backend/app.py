@@ -1,4 +1,7 @@
+import asyncio
+import time
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from stlc.code_review import router as code_review_router
@@ -12,11 +15,52 @@ from routers.test_planning_router import router as test_planning_router
 from stlc.test_planning import router as test_planning_process_router
 from stlc.environment_setup import router as environment_setup_router
 from routers.environment_setup_router import router as environment_setup_prompt_router
+from routers.llm_router import router as llm_router
+from routers.storage_router import router as storage_router
+from utils.model_client import close_http_client
+from utils.llm_health import start_health_probe, stop_health_probe
+from core.database import connect_database, close_database
+from core.prompt_repository import get_prompt_repository
+from core.session_writer import get_session_writer
+from core.migrations import run_migrations
+from config import MIGRATE_ON_STARTUP
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app):
+    started = time.perf_counter()
+    # Paylaşılan MongoDB istemcileri ve bağlantı havuzları
+    connected = await connect_database()
+    if connected and MIGRATE_ON_STARTUP:
+        # Güncel veritabanında tek bir find_one; bekleyen migration'lar yalnızca bir kez uygulanır
+        try:
+            await asyncio.to_thread(run_migrations)
+        except Exception as e:
+            logger.error(f"Migration'lar uygulanamadı: {str(e)}")
+    # Süreç promptları tek sorguda belleğe alınır ve değişiklikler izlenir
+    await get_prompt_repository().start()
+    # Session kayıtları istek yolunda beklenmeden arka planda toplu yazılır
+    await get_session_writer().start()
+    # LLM backend'lerinin sağlığını arka planda izle
+    start_health_probe()
+    logger.info(f"Uygulama açılışı {(time.perf_counter() - started) * 1000:.0f} ms sürdü.")
+    try:
+        yield
+    finally:
+        await stop_health_probe()
+        await get_prompt_repository().stop()
+        # Kuyrukta kalan session kayıtları bağlantılar kapanmadan yazılır
+        await get_session_writer().stop()
+        # Paylaşılan LLM bağlantı havuzunu kapat
+        await close_http_client()
+        close_database()
 
 app = FastAPI(
     title="STLC Manager Backend",
     description="STLC Manager Backend API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS ayarları
@@ -42,6 +86,8 @@ app.include_router(test_planning_router)  # test planning prompt router
 app.include_router(test_planning_process_router, prefix="/api/processes/test-planning")
 app.include_router(environment_setup_router, prefix="/api/processes/environment-setup")
 app.include_router(environment_setup_prompt_router)  # environment_setup prompt router
+app.include_router(llm_router)  # LLM durum/önbellek router
+app.include_router(storage_router)  # Veritabanı katmanı durum router
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,67 @@
+"""
+bench_chunker.py
+----------------
+TextProcessor.chunk_text için throughput ölçümü.
+Sentetik çok dosyalı kaynak kod üretir ve farklı boyutlarda bölme süresini yazdırır.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_chunker --sizes 1 4 16 --budget 4000
+"""
+
+import argparse
+import logging
+import time
+from utils.text_processor import TextProcessor
+
+TEMPLATE = (
+    "You are a senior engineer. Review the following code and list issues.\n\n"
+    "{code}\n\n"
+    "Respond in Markdown with one section per file."
+)
+
+FUNCTION = '''def handler_{i}(request, retries=3):
+    """Handle request {i}."""
+    for attempt in range(retries):
+        result = process(request, attempt)
+        if result is not None:
+            return result
+    raise RuntimeError("failed after retries")
+
+'''
+
+
+def build_payload(size_mb, functions_per_file=200):
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    file_index = 0
+    while length < target:
+        body = "".join(FUNCTION.format(i=i) for i in range(functions_per_file))
+        section = f"\n\n### File: module_{file_index}.py\n\n{body}"
+        parts.append(section)
+        length += len(section)
+        file_index += 1
+    return "".join(parts)
+
+
+def run(sizes, budget, model_name):
+    processor = TextProcessor()
+    print(f"{'size_mb':>8} {'chunks':>7} {'seconds':>8} {'mb_per_s':>9} {'max_chunk_tokens':>17}")
+    for size in sizes:
+        payload = build_payload(size)
+        started = time.perf_counter()
+        prompts = processor.chunk_text(TEMPLATE, {"code": payload}, budget, model_name)
+        elapsed = time.perf_counter() - started
+        actual_mb = len(payload) / (1024 * 1024)
+        largest = max(processor.count_tokens(prompt, model_name) for prompt in prompts)
+        print(f"{actual_mb:>8.2f} {len(prompts):>7} {elapsed:>8.3f} {actual_mb / elapsed:>9.2f} {largest:>17}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="chunk_text throughput benchmark")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="İçerik boyutları (MB)")
+    parser.add_argument("--budget", type=int, default=4000, help="Chunk başına token bütçesi")
+    parser.add_argument("--model", default=None, help="Tokenizer'ı kullanılacak model identifier")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    run(args.sizes, args.budget, args.model)
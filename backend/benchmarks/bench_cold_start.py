@@ -0,0 +1,58 @@
+"""
+bench_cold_start.py
+-------------------
+Uygulamanın soğuk açılış süresini ölçer: her tekrar yeni bir Python sürecinde `import app`
+süresini (uvicorn reload / worker fork maliyeti) ve istenirse lifespan açılışını ölçer.
+Import veritabanına erişmez; --lifespan ile açılıştaki bağlantı, migration kontrolü ve prompt
+yüklemesi de dahil edilir (çalışan bir MongoDB gerektirir).
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_cold_start --runs 5
+    python -m benchmarks.bench_cold_start --runs 5 --lifespan
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import app
+print(time.perf_counter() - started)
+"""
+
+LIFESPAN_SNIPPET = """
+import asyncio, time
+started = time.perf_counter()
+import app
+
+async def main():
+    async with app.lifespan(app.app):
+        print(time.perf_counter() - started)
+
+asyncio.run(main())
+"""
+
+
+def measure(snippet, runs):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soğuk açılış benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Ölçüm başına süreç sayısı")
+    parser.add_argument("--lifespan", action="store_true", help="Lifespan açılışını da ölç (MongoDB gerekir)")
+    args = parser.parse_args()
+    phases = {"import": IMPORT_SNIPPET}
+    if args.lifespan:
+        phases["lifespan"] = LIFESPAN_SNIPPET
+    print(f"{'phase':>9} {'mean_ms':>8} {'min_ms':>7} {'max_ms':>7}")
+    for name, snippet in phases.items():
+        timings = measure(snippet, args.runs)
+        print(f"{name:>9} {statistics.mean(timings) * 1000:>8.1f} {min(timings) * 1000:>7.1f} {max(timings) * 1000:>7.1f}")
@@ -0,0 +1,69 @@
+"""
+bench_mongo.py
+--------------
+İstek başına MongoDB bağlantı maliyetini ölçer.
+"per_call" eski davranışı (her çağrıda yeni MongoClient + server_info) taklit eder; "pooled"
+paylaşılan istemciyi (core.database.get_db) kullanır. Her istek, bir code review çalıştırmasındaki
+gibi base prompt, system suffix okuması ve session yazması yapar.
+Çalışan bir MongoDB gerektirir (MONGO_URI).
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_mongo --requests 50
+"""
+
+import argparse
+import statistics
+import time
+from pymongo import MongoClient
+from config import MONGO_URI, MONGO_SERVER_SELECTION_TIMEOUT_MS
+from core.database import DATABASE_NAME, get_db, close_database
+
+SESSION_ID = "bench-mongo"
+
+
+def per_call_db():
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+    client.server_info()
+    return client, client[DATABASE_NAME]
+
+
+def simulated_request(open_db):
+    clients = []
+    for step in ("base_prompt", "system_suffix", "session"):
+        client, db = open_db()
+        if client is not None:
+            clients.append(client)
+        if step == "session":
+            db.session_history.update_one({"session_id": SESSION_ID}, {"$set": {"bench": time.time()}}, upsert=True)
+        else:
+            db.code_review_prompt.find_one({"process_type": "code_review"})
+    for client in clients:
+        client.close()
+
+
+def measure(open_db, requests):
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        simulated_request(open_db)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MongoDB bağlantı havuzu benchmark")
+    parser.add_argument("--requests", type=int, default=50, help="Mod başına simüle edilen istek sayısı")
+    args = parser.parse_args()
+    modes = {
+        "per_call": per_call_db,
+        "pooled": lambda: (None, get_db()),
+    }
+    print(f"{'mode':>9} {'mean_ms':>8} {'p50_ms':>7} {'p95_ms':>7}")
+    try:
+        for name, open_db in modes.items():
+            timings = sorted(measure(open_db, args.requests))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{name:>9} {statistics.mean(timings) * 1000:>8.2f} {statistics.median(timings) * 1000:>7.2f} {p95 * 1000:>7.2f}")
+    finally:
+        get_db().session_history.delete_one({"session_id": SESSION_ID})
+        close_database()
@@ -0,0 +1,71 @@
+"""
+bench_prefix_cache.py
+---------------------
+Prefix-stable prompt düzeninin ilk token gecikmesine (TTFT) etkisini ölçer.
+Aynı talimatlarla, farklı kod parçaları için art arda stream istekleri gönderir; "split"
+düzeninde talimatlar sabit system mesajında, "inline" düzeninde kodla aynı mesajdadır.
+Çalışan bir LLM backend'i gerektirir (LLM_BACKENDS / LLM_API_URL).
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_prefix_cache --model llama-3.2-1b-instruct --runs 5
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from utils.model_client import get_llm_client, close_http_client
+from utils.prompt_assembly import split_template
+from utils.prompt_template import compile_template
+
+INSTRUCTIONS = (
+    "You are a senior software engineer performing a code review. "
+    "Check correctness, error handling, naming, complexity, security and performance. "
+    "For each finding give the line, the problem, and a concrete fix.\n" * 20
+)
+TEMPLATE = INSTRUCTIONS + "\n\nCode to review:\n{code}"
+
+
+def sample_code(index):
+    return "\n".join(f"def function_{index}_{i}(value):\n    return value * {i}\n" for i in range(20))
+
+
+async def measure(client, layout, runs, max_tokens):
+    timings = []
+    system_prompt, user_template = split_template(TEMPLATE, ["code"])
+    for index in range(runs):
+        code = sample_code(index)
+        if layout == "split":
+            prompt, system = user_template.render(code=code).text, system_prompt
+        else:
+            prompt, system = compile_template(TEMPLATE).render(code=code).text, None
+        started = time.perf_counter()
+        ttft = None
+        async for _ in client.stream_response(prompt, max_tokens=max_tokens, use_cache=False, system_prompt=system):
+            if ttft is None:
+                ttft = time.perf_counter() - started
+        timings.append(ttft)
+    return timings
+
+
+async def run(model, runs, max_tokens):
+    client = get_llm_client(model)
+    try:
+        print(f"{'layout':>7} {'first_s':>8} {'repeat_avg_s':>13} {'repeat_median_s':>16}")
+        for layout in ("inline", "split"):
+            timings = await measure(client, layout, runs, max_tokens)
+            repeats = [t for t in timings[1:] if t is not None] or [float("nan")]
+            print(f"{layout:>7} {timings[0]:>8.3f} {statistics.mean(repeats):>13.3f} {statistics.median(repeats):>16.3f}")
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefix-stable prompt TTFT benchmark")
+    parser.add_argument("--model", default=None, help="Model identifier")
+    parser.add_argument("--runs", type=int, default=5, help="Düzen başına istek sayısı")
+    parser.add_argument("--max-tokens", type=int, default=16, help="İstek başına üretilecek token")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args.model, args.runs, args.max_tokens))
@@ -0,0 +1,93 @@
+"""
+bench_validation.py
+-------------------
+Derlenmiş JSON şema doğrulayıcısının binlerce senaryo içeren çıktılardaki süresini ölçer.
+İlk çağrı şemayı derler; sonraki çağrılar önbellekteki doğrulayıcıyı kullanır.
+
+Kullanım (backend dizininden):
+    python -m benchmarks.bench_validation --counts 1000 5000 20000
+"""
+
+import argparse
+import time
+from utils.validation import compile_schema, validate_output_format
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scenarios": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "pattern": "^TS-\\d+$"},
+                    "title": {"type": "string", "minLength": 1},
+                    "description": {"type": "string"},
+                    "priority": {"type": "string", "enum": ["High", "Medium", "Low"]},
+                    "created": {"type": "string", "format": "date"},
+                    "prerequisites": {"type": "array", "items": {"type": "string"}},
+                    "steps": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "order": {"type": "integer", "minimum": 1},
+                                "action": {"type": "string"},
+                                "expected": {"type": "string"}
+                            },
+                            "required": ["order", "action"]
+                        }
+                    }
+                },
+                "required": ["id", "title", "description", "prerequisites", "steps"]
+            }
+        }
+    },
+    "required": ["scenarios"]
+}
+
+
+def build_output(count, invalid_every=0):
+    scenarios = []
+    for index in range(count):
+        scenario = {
+            "id": f"TS-{index:05d}",
+            "title": f"Scenario {index}",
+            "description": "Verify that the system behaves as specified for the given input.",
+            "priority": ("High", "Medium", "Low")[index % 3],
+            "created": "2024-05-01",
+            "prerequisites": ["User is logged in", "Test data is loaded"],
+            "steps": [{"order": step, "action": f"Action {step}", "expected": "Result"} for step in range(1, 6)]
+        }
+        if invalid_every and index % invalid_every == 0:
+            scenario["priority"] = "Urgent"
+            del scenario["title"]
+        scenarios.append(scenario)
+    return {"scenarios": scenarios}
+
+
+def measure(count, repeats):
+    data = build_output(count)
+    started = time.perf_counter()
+    validate_output_format(data, SCHEMA)
+    first = time.perf_counter() - started
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        is_valid, _ = validate_output_format(data, SCHEMA)
+        timings.append(time.perf_counter() - started)
+    assert is_valid
+    invalid_errors = compile_schema(SCHEMA).errors(build_output(count, invalid_every=10))
+    best = min(timings)
+    return first, best, best / count, len(invalid_errors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON şema doğrulama benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 5000, 20000], help="Çıktıdaki senaryo sayıları")
+    parser.add_argument("--repeats", type=int, default=5, help="Ölçüm tekrar sayısı")
+    args = parser.parse_args()
+    print(f"{'scenarios':>10} {'first_ms':>9} {'best_ms':>8} {'us/scenario':>12} {'errors@10%':>11}")
+    for count in args.counts:
+        first, best, per_item, errors = measure(count, args.repeats)
+        print(f"{count:>10} {first * 1000:>9.2f} {best * 1000:>8.2f} {per_item * 1e6:>12.2f} {errors:>11}")
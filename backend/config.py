@@ -6,10 +6,118 @@ model API endpoint’leri, environment değişkenleri gibi bilgiler burada tutul
 """
 
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "stlc_database")
+# Süreç genelinde paylaşılan MongoDB istemcilerinin (sync + async) bağlantı havuzu ayarları
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Prompt deposu: change stream kapalıyken promptların yoklanma aralığı (saniye, 0: yoklama yok)
+PROMPT_REFRESH_INTERVAL = float(os.getenv("PROMPT_REFRESH_INTERVAL", "30"))
+# Prompt deposu: change stream yeniden bağlanma denemeleri arasındaki en uzun bekleme (saniye)
+PROMPT_WATCH_MAX_BACKOFF = float(os.getenv("PROMPT_WATCH_MAX_BACKOFF", "60"))
+# Uygulama açılışında bekleyen veritabanı migration'larını çalıştır (bkz. core/migrations.py)
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Session kayıtlarının write-behind kuyruğu: parti boyutu, en fazla bekleme (saniye) ve kuyruk sınırı
+SESSION_WRITE_BATCH_SIZE = int(os.getenv("SESSION_WRITE_BATCH_SIZE", "100"))
+SESSION_WRITE_FLUSH_INTERVAL = float(os.getenv("SESSION_WRITE_FLUSH_INTERVAL", "1.0"))
+SESSION_WRITE_MAX_BACKLOG = int(os.getenv("SESSION_WRITE_MAX_BACKLOG", "10000"))
+# Süreç çalıştırma kayıtları (process_runs): bu boyutu (byte) aşan output/used_prompt zlib ile sıkıştırılır (0: kapalı)
+SESSION_COMPRESS_THRESHOLD = int(os.getenv("SESSION_COMPRESS_THRESHOLD", "16384"))
+# Session ve çalıştırma kayıtlarının saklanma süresi (gün, 0: süresiz); değişiklik açılışta TTL indekslerine uygulanır
+SESSION_TTL_DAYS = float(os.getenv("SESSION_TTL_DAYS", "0"))
 MODEL_API_BASE_URL = os.getenv("MODEL_API_BASE_URL", "http://localhost:1234")
 MODEL_IDENTIFIER = os.getenv("MODEL_IDENTIFIER", "llama-3.2-3b-instruct")
+
+# LLM HTTP transport ayarları (paylaşılan keep-alive bağlantı havuzu)
+LLM_API_URL = os.getenv("LLM_API_URL", "http://localhost:1234/v1")
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "300"))
+
+# Chunk bazlı LLM çağrıları için model başına eşzamanlılık ayarları
+LLM_CHUNK_CONCURRENCY = int(os.getenv("LLM_CHUNK_CONCURRENCY", "4"))
+# Örnek: '{"qwen2.5-7b-instruct-1m": 2, "gemma-2-2b-it": 6}'
+LLM_MODEL_CONCURRENCY = json.loads(os.getenv("LLM_MODEL_CONCURRENCY", "{}"))
+LLM_CHUNK_ERROR_POLICY = os.getenv("LLM_CHUNK_ERROR_POLICY", "retry")  # retry | skip | fail
+LLM_CHUNK_MAX_RETRIES = int(os.getenv("LLM_CHUNK_MAX_RETRIES", "2"))
+
+# LLM yanıt önbelleği (bellek içi LRU + kalıcı disk katmanı)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("cache", "llm_cache.sqlite3"))
+
+# Model -> inference endpoint listesi. "*" anahtarı eşleşmeyen modeller için kullanılır.
+# Örnek: '{"*": ["http://localhost:1234/v1"], "qwen2.5-7b-instruct-1m": ["http://gpu1:1234/v1", "http://gpu2:1234/v1"]}'
+LLM_BACKENDS = json.loads(os.getenv("LLM_BACKENDS", "{}")) or {"*": [LLM_API_URL]}
+LLM_BACKEND_EWMA_ALPHA = float(os.getenv("LLM_BACKEND_EWMA_ALPHA", "0.3"))
+LLM_BACKEND_RETRY_AFTER = float(os.getenv("LLM_BACKEND_RETRY_AFTER", "15"))
+
+# Model affinity scheduler: aynı modele ait işleri gruplayarak model değişimlerini azaltır
+LLM_SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_SCHEDULER_MAX_CONCURRENT = int(os.getenv("LLM_SCHEDULER_MAX_CONCURRENT", "4"))
+LLM_SCHEDULER_FAIRNESS_WINDOW = float(os.getenv("LLM_SCHEDULER_FAIRNESS_WINDOW", "30"))  # saniye
+LLM_SCHEDULER_MAX_BATCH = int(os.getenv("LLM_SCHEDULER_MAX_BATCH", "16"))
+
+# Backend sağlık kontrolü (/v1/models) aralığı ve timeout'u (saniye)
+LLM_HEALTH_PROBE_INTERVAL = float(os.getenv("LLM_HEALTH_PROBE_INTERVAL", "30"))
+LLM_HEALTH_PROBE_TIMEOUT = float(os.getenv("LLM_HEALTH_PROBE_TIMEOUT", "3"))
+
+# Circuit breaker ve istek bazlı deadline ayarları
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_RESET_TIMEOUT = float(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", "30"))
+LLM_CIRCUIT_HALF_OPEN_MAX_CALLS = int(os.getenv("LLM_CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "600"))  # bir çalıştırmanın tüm chunk'ları için toplam süre
+
+# Hedged requests: yavaş kalan isteğin kopyası başka bir replikaya gönderilir
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "0"))  # 0: gözlenen yüzdelik kullanılır
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))  # istek başına en fazla hedge oranı
+LLM_HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "5"))
+
+# Token sayımı: "auto" model tokenizer'ı varsa onu, yoksa hızlı yaklaşık sayımı kullanır; "approximate" her zaman yaklaşık sayar
+LLM_TOKEN_COUNT_MODE = os.getenv("LLM_TOKEN_COUNT_MODE", "auto")
+# Model tokenizer dosyaları: <LLM_TOKENIZER_DIR>/<model_identifier>/tokenizer.json
+LLM_TOKENIZER_DIR = os.getenv("LLM_TOKENIZER_DIR", "tokenizers")
+
+# Sunucunun (ör: LM Studio) modelleri varsayılan olarak yüklediği context uzunluğu (token).
+# Planlama modelin eğitim üst sınırına değil bu değere göre yapılır; model daha büyük context ile
+# yüklendiyse LLM_SERVED_CONTEXT_WINDOW veya model bazında LLM_MODEL_CAPABILITIES ile yükseltilebilir.
+LLM_SERVED_CONTEXT_WINDOW = int(os.getenv("LLM_SERVED_CONTEXT_WINDOW", "4096"))
+# Model yetenekleri (context window, çıktı bütçesi, token/s) için override'lar.
+# context_window burada açıkça verilirse (modelin eğitim üst sınırını aşmadan) LLM_SERVED_CONTEXT_WINDOW'un yerine geçer.
+# Örnek: '{"qwen2.5-7b-instruct-1m": {"context_window": 32768}, "gemma-2-2b-it": {"max_output_tokens": 1024}}'
+LLM_MODEL_CAPABILITIES = json.loads(os.getenv("LLM_MODEL_CAPABILITIES", "{}"))
+# Token sayımındaki sapmalara karşı context window'un boş bırakılan oranı
+LLM_CONTEXT_SAFETY_MARGIN = float(os.getenv("LLM_CONTEXT_SAFETY_MARGIN", "0.05"))
+
+# Chunk sonuçlarının ağaç yapısında birleştirilmesi: her reduce adımında birleştirilen en fazla sonuç sayısı
+LLM_REDUCE_FAN_IN = int(os.getenv("LLM_REDUCE_FAN_IN", "4"))
+
+# Prompt düzeni: "split" statik talimatları sabit bir system mesajında, değişken içeriği user mesajında gönderir
+# (sunucunun KV önbelleği istekler ve chunk'lar arasında talimat prefix'ini yeniden kullanabilir); "inline" eski tek mesaj düzeni
+LLM_PROMPT_LAYOUT = os.getenv("LLM_PROMPT_LAYOUT", "split")
+# Backend URL -> prompt önbellek ipuçları; yalnızca destekleyen sunucular için tanımlanmalı ("*" tüm backend'ler).
+# Örnek (llama.cpp server): '{"http://gpu1:8080/v1": {"cache_prompt": true, "slots": 4}}'
+LLM_PROMPT_CACHE_HINTS = json.loads(os.getenv("LLM_PROMPT_CACHE_HINTS", "{}"))
+
+# Stream edilen JSON çıktıları: test senaryosu üretiminde varsayılan en fazla senaryo sayısı (0: sınırsız;
+# istekteki advancedSettings.maxScenarios önceliklidir) ve JSON başlamadan önce kabul edilen en fazla açıklama metni (karakter)
+LLM_STREAM_MAX_SCENARIOS = int(os.getenv("LLM_STREAM_MAX_SCENARIOS", "0"))
+LLM_STREAM_MAX_PREAMBLE = int(os.getenv("LLM_STREAM_MAX_PREAMBLE", "2000"))
+
+# Yapısal (JSON) çıktı: backend URL -> "json_schema" | "json_object" | "none" ("*" tüm backend'ler).
+# json_schema destekleyen sunucularda (LM Studio, llama.cpp server, vLLM, Ollama) çıktı şemaya göre kısıtlanarak üretilir;
+# response_format'ı reddeden backend'lerde ilk hatada kapatılır. Şemaya uymayan çıktı en fazla LLM_STRUCTURED_MAX_REPAIRS kez onarılır.
+LLM_STRUCTURED_OUTPUT = json.loads(os.getenv("LLM_STRUCTURED_OUTPUT", "{}")) or {"*": "json_schema"}
+LLM_STRUCTURED_MAX_REPAIRS = int(os.getenv("LLM_STRUCTURED_MAX_REPAIRS", "2"))
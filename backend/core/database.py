@@ -2,51 +2,118 @@
 database.py
 -----------
 MongoDB bağlantısını ve temel veritabanı işlemlerini yönetir.
-Örneğin, koleksiyonlara erişim, CRUD işlemleri gibi fonksiyonları burada tanımlayabilirsiniz.
+Sync (pymongo) ve async (motor) istemcileri süreç başına bir kez oluşturulur ve bağlantı
+havuzlarıyla birlikte paylaşılır; uygulama lifespan'inde açılıp kapanırlar (bkz. app.py).
+İstek yollarında yeni istemci oluşturulmaz ve bağlantı testi (server_info) yapılmaz.
 """
 
 import logging
+import threading
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 import certifi
-import os
+from config import (
+    MONGO_URI,
+    MONGO_DATABASE_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+)
 
 # Logger settings
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+DATABASE_NAME = MONGO_DATABASE_NAME
+
+_sync_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def _client_options():
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "appname": "stlc-manager",
+    }
+    if MONGO_URI.startswith("mongodb+srv://"):
+        # Atlas gibi TLS zorunlu kümeler için güncel CA paketi
+        options["tlsCAFile"] = certifi.where()
+    return options
+
+
+def get_mongo_client():
+    """
+    Süreç genelinde paylaşılan sync MongoClient'ı döndürür (ilk çağrıda oluşturulur).
+    """
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                logger.info(f"Creating MongoDB sync client: {MONGO_URI}")
+                _sync_client = MongoClient(MONGO_URI, **_client_options())
+    return _sync_client
+
+
+def get_async_mongo_client():
+    """
+    Süreç genelinde paylaşılan async (motor) istemciyi döndürür (ilk çağrıda oluşturulur).
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                logger.info(f"Creating MongoDB async client: {MONGO_URI}")
+                _async_client = AsyncIOMotorClient(MONGO_URI, **_client_options())
+    return _async_client
+
+
 def get_db():
     """
-    Returns a synchronous MongoDB database connection
+    Returns the synchronous MongoDB database of the shared client
     """
-    try:
-        logger.info(f"Connecting to MongoDB (sync): {MONGO_URI}")
-        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-
-        # Test the connection
-        client.server_info()
-        db = client[DATABASE_NAME]
-        logger.info("MongoDB sync connection successful")
-        return db
-    except Exception as e:
-        logger.error(f"MongoDB sync connection failed: {str(e)}")
-        raise
+    return get_mongo_client()[DATABASE_NAME]
 
-MONGO_URI = "mongodb://localhost:27017"
-DATABASE_NAME = "stlc_database"
 
 async def get_database():
+    """
+    Returns the asynchronous MongoDB database of the shared client
+    """
+    return get_async_mongo_client()[DATABASE_NAME]
+
+
+async def connect_database():
+    """
+    Uygulama başlarken istemcileri oluşturur ve bağlantıyı tek bir ping ile doğrular.
+    MongoDB erişilemezse hata loglanır; uygulama açılmaya devam eder ve istemciler sunucu geldiğinde bağlanır.
+
+    :return: Ping başarılıysa True.
+    """
+    get_mongo_client()
+    client = get_async_mongo_client()
     try:
-        print("MongoDB URI:", MONGO_URI)
-        logger.info(f"Connecting to MongoDB (async): {MONGO_URI}")
-        client = AsyncIOMotorClient(
-            MONGO_URI,
-            serverSelectionTimeoutMS=5000
-        )
-        await client.list_database_names()
-        db = client[DATABASE_NAME]
-        logger.info("MongoDB async connection successful")
-        return db
+        await client.admin.command("ping")
+        logger.info("MongoDB connection successful")
+        return True
     except Exception as e:
-        logger.error(f"MongoDB async connection failed: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error(f"MongoDB connection failed: {str(e)}")
+        return False
+
+
+def close_database():
+    """
+    Paylaşılan istemcileri ve bağlantı havuzlarını kapatır (uygulama kapanırken).
+    """
+    global _sync_client, _async_client
+    with _client_lock:
+        if _async_client is not None:
+            _async_client.close()
+            _async_client = None
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+    logger.info("MongoDB clients closed")
@@ -0,0 +1,217 @@
+"""
+migrations.py
+-------------
+Sürümlü veritabanı migration'ları (varsayılan promptların eklenmesi, indeksler vb.).
+Uygulanan son sürüm `migrations` koleksiyonunda tek bir dokümanda tutulur; güncel bir
+veritabanında kontrol tek bir find_one'dır ve bekleyen migration'lar sırayla bir kez uygulanır.
+Her migration idempotenttir: aynı anda açılan birden fazla worker çalıştırsa da sonuç değişmez.
+
+Session TTL süresi (SESSION_TTL_DAYS) de aynı dokümanda tutulur; ayar değiştiğinde TTL indeksleri güncellenir.
+
+Uygulama açılışında lifespan içinden çalışır (MIGRATE_ON_STARTUP) veya elle çalıştırılabilir:
+    python -m core.migrations            # bekleyen migration'ları uygula
+    python -m core.migrations --status   # uygulanan / bekleyen sürümleri listele
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+from pymongo import ASCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from config import SESSION_TTL_DAYS
+from core.database import get_db, close_database
+from core.prompt_manager import (
+    default_code_review_prompt,
+    default_requirement_analysis_prompt,
+    default_test_planning_prompt,
+    default_environment_setup_prompt,
+)
+from core.prompt_repository import PROCESS_TYPES
+from core.session_store import SESSIONS_COLLECTION, RUNS_COLLECTION, build_run
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = "migrations"
+STATE_ID = "schema"
+
+DEFAULT_PROMPTS = {
+    "code_review": default_code_review_prompt,
+    "requirement_analysis": default_requirement_analysis_prompt,
+    "test_planning": default_test_planning_prompt,
+    "environment_setup": default_environment_setup_prompt,
+}
+
+
+def seed_process_prompts(db):
+    """
+    Süreçlerin varsayılan promptlarını ekler; mevcut (ör: kullanıcının kaydettiği) promptlara dokunmaz.
+    """
+    for process_type, build in DEFAULT_PROMPTS.items():
+        result = db[f"{process_type}_prompt"].update_one(
+            {"process_type": process_type},
+            {"$setOnInsert": build()},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            logger.info(f"{process_type} varsayılan promptu eklendi.")
+
+
+def create_lookup_indexes(db):
+    """
+    İstek yollarındaki sorguların (process_type, session_id) indekslerini oluşturur.
+    """
+    for process_type in PROCESS_TYPES:
+        db[f"{process_type}_prompt"].create_index("process_type")
+    db.session_history.create_index("session_id")
+
+
+# Eski düzende bir session'ın tüm süreçleri tek dokümanda processes.<süreç> alanlarında tutuluyordu
+SPLIT_BATCH_SIZE = 200
+
+
+def split_session_history(db):
+    """
+    Session'ları başlık + process_runs düzenine taşır (bkz. core/session_store.py) ve
+    (session_id, process_type, timestamp) indeksini oluşturur.
+    Yarıda kesilirse veya aynı anda iki worker'da çalışırsa tekrar çalıştırılabilir: taşınan
+    çalıştırmaların _id'si session'dan türetildiğinden aynı çalıştırma iki kez eklenmez.
+    """
+    db[RUNS_COLLECTION].create_index(
+        [("session_id", ASCENDING), ("process_type", ASCENDING), ("timestamp", ASCENDING)],
+        name="session_process_timestamp"
+    )
+    sessions = db[SESSIONS_COLLECTION]
+    moved = 0
+    while True:
+        documents = list(sessions.find({"processes": {"$exists": True}}).limit(SPLIT_BATCH_SIZE))
+        if not documents:
+            break
+        runs, headers = [], []
+        for document in documents:
+            processes = document.get("processes") or {}
+            for process_type, entry in processes.items():
+                runs.append(InsertOne(build_run(
+                    document["session_id"], process_type, entry.get("output"), entry.get("edited_prompt"),
+                    entry.get("used_prompt"), entry.get("used_model"),
+                    timestamp=entry.get("timestamp") or document.get("created_at"),
+                    run_id=f"{document['_id']}:{process_type}"
+                )))
+            timestamps = [entry.get("timestamp") for entry in processes.values() if entry.get("timestamp")]
+            headers.append(UpdateOne({"_id": document["_id"]}, {
+                "$set": {
+                    "process_types": sorted(processes),
+                    "run_ids": [f"{document['_id']}:{process_type}" for process_type in processes],
+                    "run_count": len(processes),
+                    "updated_at": max(timestamps) if timestamps else document.get("created_at")
+                },
+                "$unset": {"processes": ""}
+            }))
+        if runs:
+            try:
+                db[RUNS_COLLECTION].bulk_write(runs, ordered=False)
+            except BulkWriteError as e:
+                # Daha önce taşınmış çalıştırmalar (duplicate key) atlanır
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+        sessions.bulk_write(headers, ordered=False)
+        moved += len(documents)
+    if moved:
+        logger.info(f"{moved} session process_runs düzenine taşındı.")
+
+
+# (sürüm, ad, fonksiyon); sürümler artan sırada olmalı ve uygulandıktan sonra değiştirilmemeli
+MIGRATIONS = [
+    (1, "seed_process_prompts", seed_process_prompts),
+    (2, "create_lookup_indexes", create_lookup_indexes),
+    (3, "split_session_history", split_session_history),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Süresi dolan session başlıkları (son güncelleme) ve çalıştırmalar için TTL indeksleri
+TTL_INDEXES = ((SESSIONS_COLLECTION, "updated_at"), (RUNS_COLLECTION, "timestamp"))
+
+
+def apply_session_ttl(db, ttl_seconds):
+    """
+    TTL indekslerini verilen süreye getirir; 0 ise indeksleri kaldırır.
+    """
+    for collection, field in TTL_INDEXES:
+        name = f"{field}_ttl"
+        if not ttl_seconds:
+            try:
+                db[collection].drop_index(name)
+            except OperationFailure:
+                pass
+            continue
+        try:
+            db[collection].create_index(field, name=name, expireAfterSeconds=ttl_seconds)
+        except OperationFailure:
+            # İndeks farklı bir süreyle zaten var
+            db.command("collMod", collection, index={"name": name, "expireAfterSeconds": ttl_seconds})
+    logger.info(f"Session TTL: {f'{ttl_seconds}s' if ttl_seconds else 'kapalı'}.")
+
+
+def load_state(db):
+    return db[MIGRATIONS_COLLECTION].find_one({"_id": STATE_ID}, {"version": 1, "session_ttl_seconds": 1}) or {}
+
+
+def current_version(db):
+    return load_state(db).get("version", 0)
+
+
+def pending_migrations(version):
+    return [migration for migration in MIGRATIONS if migration[0] > version]
+
+
+def run_migrations(db=None):
+    """
+    Bekleyen migration'ları sırayla uygular.
+
+    :return: Veritabanının son sürümü.
+    """
+    db = db if db is not None else get_db()
+    state = load_state(db)
+    version = state.get("version", 0)
+    pending = pending_migrations(version)
+    ttl_seconds = int(SESSION_TTL_DAYS * 86400)
+    if not pending and state.get("session_ttl_seconds", 0) == ttl_seconds:
+        logger.info(f"Veritabanı güncel (sürüm {version}).")
+        return version
+    for number, name, migrate in pending:
+        started = time.perf_counter()
+        migrate(db)
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        # $max ile aynı anda çalışan worker'lar sürümü geri almaz
+        db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": STATE_ID},
+            {
+                "$max": {"version": number},
+                "$set": {f"applied.{number}": {"name": name, "applied_at": datetime.now(), "duration_ms": duration_ms}}
+            },
+            upsert=True
+        )
+        version = number
+        logger.info(f"Migration {number} ({name}) uygulandı ({duration_ms} ms).")
+    if state.get("session_ttl_seconds", 0) != ttl_seconds:
+        # TTL bir ayar olduğundan sürümden bağımsız olarak değiştiğinde uygulanır
+        apply_session_ttl(db, ttl_seconds)
+        db[MIGRATIONS_COLLECTION].update_one({"_id": STATE_ID}, {"$set": {"session_ttl_seconds": ttl_seconds}}, upsert=True)
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="STLC Manager veritabanı migration'ları")
+    parser.add_argument("--status", action="store_true", help="Yalnızca uygulanan ve bekleyen sürümleri listele")
+    args = parser.parse_args()
+    try:
+        if args.status:
+            version = current_version(get_db())
+            print(f"current: {version}, latest: {LATEST_VERSION}")
+            for number, name, _ in pending_migrations(version):
+                print(f"pending: {number} {name}")
+        else:
+            print(f"version: {run_migrations()}")
+    finally:
+        close_database()
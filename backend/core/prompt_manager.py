@@ -7,19 +7,19 @@ Ayrıca structured_output formatı gibi ilave bilgileri de buradan alabilirsiniz
 
 import logging
 from core.database import get_db
+from core.prompt_repository import get_prompt_repository, PROCESS_TYPES
+from core.session_store import build_run, session_operations
+from core.session_writer import get_session_writer
 from datetime import datetime
 
 # Logger ayarları
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
-def initialize_test_planning_prompt():
-    db = get_db()
-    # Yeni koleksiyon adı: test_planning_prompt
-    if "test_planning_prompt" not in db.list_collection_names():
-        db.create_collection("test_planning_prompt")
-        print("test_planning_prompt koleksiyonu oluşturuldu.")
-    # Prompt'u ekle
-    prompt = {
+def default_test_planning_prompt():
+    """
+    test_planning süreci için varsayılan prompt dokümanı (core/migrations.py tarafından eklenir).
+    """
+    return {
         "process_type": "test_planning",
         "prompt_text": """Analyze the following project materials as an ISTQB expert and use the information provided to generate a comprehensive test planning schedule that adheres strictly to ISTQB standards. Your objective is to produce a detailed test planning document, optimized for creating a Gantt chart. Your analysis should cover all aspects of test planning, including test strategy, resource estimation, scheduling, risk management, and environment/tool requirements. You must focus solely on constructing the test planning schedule, without incorporating the content of the input documents verbatim.
 
@@ -77,12 +77,6 @@ Below is an example JSON structure to follow:
         "description": "Base prompt for test planning process",
         "created_at": datetime.now()
     }
-    existing = db.test_planning_prompt.find_one({"process_type": "test_planning"})
-    if not existing:
-        db.test_planning_prompt.insert_one(prompt)
-        print("Test planning prompt eklendi.")
-    else:
-        print("Test planning prompt zaten mevcut.")
 
 def initialize_code_review_prompt():
     db = get_db()
@@ -115,14 +109,11 @@ Please organize your response clearly under each section, and provide specific e
     if "session_history" not in db.list_collection_names():
         db.create_collection("session_history")
         print("session_history koleksiyonu oluşturuldu.")
-def initialize_prompt():
-    db = get_db()
-    # Yeni koleksiyon adı: code_review_prompt
-    if "code_review_prompt" not in db.list_collection_names():
-        db.create_collection("code_review_prompt")
-        print("code_review_prompt koleksiyonu oluşturuldu.")
-    # Prompt'u ekle
-    prompt = {
+def default_code_review_prompt():
+    """
+    code_review süreci için varsayılan prompt dokümanı (core/migrations.py tarafından eklenir).
+    """
+    return {
         "process_type": "code_review",
         "prompt_text": """Please perform a comprehensive code review of the following codebase. If no Requirement Document is provided, skip the Requirement Compliance section entirely (do not attempt to infer requirements from the code).
 
@@ -140,23 +131,12 @@ Please organize your response clearly under each section, and provide specific e
         "description": "Base prompt for code review process",
         "created_at": datetime.now()
     }
-    existing = db.code_review_prompt.find_one({"process_type": "code_review"})
-    if not existing:
-        db.code_review_prompt.insert_one(prompt)
-        print("Code review prompt eklendi.")
-    else:
-        print("Code review prompt zaten mevcut.")
-    if "session_history" not in db.list_collection_names():
-        db.create_collection("session_history")
-        print("session_history koleksiyonu oluşturuldu.")
-def initialize_requirement_analysis_prompt():
-    db = get_db()
-    # Yeni koleksiyon adı: requirement_analysis_prompt
-    if "requirement_analysis_prompt" not in db.list_collection_names():
-        db.create_collection("requirement_analysis_prompt")
-        print("requirement_analysis_prompt koleksiyonu oluşturuldu.")
-    # Prompt'u ekle
-    prompt = {
+
+def default_requirement_analysis_prompt():
+    """
+    requirement_analysis süreci için varsayılan prompt dokümanı (core/migrations.py tarafından eklenir).
+    """
+    return {
         "process_type": "requirement_analysis",
         "prompt_text": """Please perform a comprehensive Requirement Analysis for the following codebase, comparing it against the provided Requirement Document. 
 Focus on:
@@ -171,12 +151,6 @@ Please organize your response clearly under each section and provide detailed ex
         "description": "Base prompt for requirement analysis process",
         "created_at": datetime.now()
     }
-    existing = db.requirement_analysis_prompt.find_one({"process_type": "requirement_analysis"})
-    if not existing:
-        db.requirement_analysis_prompt.insert_one(prompt)
-        print("Requirement analysis prompt eklendi.")
-    else:
-        print("Requirement analysis prompt zaten mevcut.")
 
 def get_prompts_for_step(step_name: str):
     """
@@ -205,12 +179,11 @@ def get_prompts_for_step(step_name: str):
     except Exception as e:
         logger.error(f"Prompt bilgileri çekilirken hata oluştu: {str(e)}")
         return {}
-def initialize_environment_setup_prompt():
-    db = get_db()
-    if "environment_setup_prompt" not in db.list_collection_names():
-        db.create_collection("environment_setup_prompt")
-        print("environment_setup_prompt koleksiyonu oluşturuldu.")
-    prompt = {
+def default_environment_setup_prompt():
+    """
+    environment_setup süreci için varsayılan prompt dokümanı (core/migrations.py tarafından eklenir).
+    """
+    return {
         "process_type": "environment_setup",
         "prompt_text": """Objective: You are tasked with preparing the environment setup as part of the Software Testing Life Cycle (STLC) process.
 You will receive two types of inputs:
@@ -254,28 +227,18 @@ Provide installation notes with additional setup instructions (e.g., "Install Py
         "description": "Base prompt for environment setup process",
         "created_at": datetime.now()
     }
-    existing = db.environment_setup_prompt.find_one({"process_type": "environment_setup"})
-    if not existing:
-        db.environment_setup_prompt.insert_one(prompt)
-        print("Environment setup prompt eklendi.")
-    else:
-        print("Environment setup prompt zaten mevcut.")
 
-# Bu fonksiyonu çalıştır
-initialize_prompt()
-initialize_requirement_analysis_prompt()
-initialize_test_planning_prompt()
-initialize_environment_setup_prompt()
 def get_base_prompt(process_type: str):
     """
     Belirtilen süreç için ilgili _prompt koleksiyonundan temel prompt'u çeker.
     """
     logger.info(f"{process_type} süreci için temel prompt çekiliyor.")
     try:
-        db = get_db()
-        collection_name = f"{process_type}_prompt"
-        collection = db[collection_name]
-        document = collection.find_one({"process_type": process_type})
+        if process_type in PROCESS_TYPES:
+            # Bilinen süreçlerin promptları bellekteki depodan okunur (bkz. core/prompt_repository.py)
+            document = get_prompt_repository().get(process_type)
+        else:
+            document = get_db()[f"{process_type}_prompt"].find_one({"process_type": process_type})
         if document:
             logger.info(f"{process_type} süreci için temel prompt bulundu.")
             return document.get("prompt_text", "")
@@ -288,16 +251,17 @@ def get_base_prompt(process_type: str):
 
 def save_session_data(session_data: dict, process_type: str = "code_review"):
     """
-    Her session_id için tek bir doküman, ilgili süreç (örn. code_review, requirement_analysis) için şu alanları kaydeder/günceller:
+    Süreç çalıştırmasını kaydeder: session başlığı (session_history) güncellenir ve çalıştırma
+    process_runs koleksiyonuna ayrı bir doküman olarak eklenir (bkz. core/session_store.py). Alanlar:
     - output: çıktı
     - edited_prompt: base prompt değişti mi (True/False)
     - used_prompt: kullanılan prompt metni
     - used_model: kullanılan AI model
+
+    Kayıt write-behind kuyruğuna bırakılır ve hemen dönülür; veritabanına toplu olarak arka planda yazılır.
     """
-    logger.info(f"Session verisi kaydediliyor/güncelleniyor ({process_type} için özel alanlar).")
+    logger.info(f"Session verisi kaydediliyor ({process_type} çalıştırması).")
     try:
-        db = get_db()
-        collection = db["session_history"]
         session_id = session_data.get("session_id")
         output = session_data.get("output")
         edited_prompt = session_data.get("edited_prompt")
@@ -308,31 +272,18 @@ def save_session_data(session_data: dict, process_type: str = "code_review"):
             logger.warning("Eksik session verisi: session_id, output, edited_prompt veya used_prompt yok.")
             return None
 
-        # Güncellenecek alan: processes.{process_type}
-        update_field = {
-            f"processes.{process_type}": {
-                "output": output,
-                "edited_prompt": edited_prompt,
-                "used_prompt": used_prompt,
-                "used_model": used_model,
-                "timestamp": datetime.now()
-            }
-        }
-
-        # Upsert işlemi: varsa güncelle, yoksa oluştur
-        result = collection.update_one(
-            {"session_id": session_id},
-            {
-                "$set": update_field,
-                "$setOnInsert": {
-                    "session_id": session_id,
-                    "created_at": datetime.now()
-                }
-            },
-            upsert=True
-        )
-        logger.info(f"Session güncellendi/upsert edildi. session_id: {session_id}, process: {process_type}")
-        return result.upserted_id or result.modified_count
+        run = build_run(session_id, process_type, output, edited_prompt, used_prompt, used_model)
+        operations = session_operations(run)
+        # İstek yolunda beklenmez; kayıt write-behind kuyruğuyla toplu yazılır (bkz. core/session_writer.py)
+        if get_session_writer().submit(operations):
+            logger.info(f"Session kaydı kuyruğa alındı. session_id: {session_id}, process: {process_type}")
+            return True
+        # Writer çalışmıyorsa (ör: uygulama dışı kullanım) veya kuyruk doluysa senkron yazılır
+        db = get_db()
+        for collection, operation in operations:
+            db[collection].bulk_write([operation])
+        logger.info(f"Session kaydedildi. session_id: {session_id}, process: {process_type}")
+        return True
     except Exception as e:
         logger.error(f"Session verisi kaydedilirken hata oluştu: {str(e)}")
         return None
@@ -411,20 +362,22 @@ def save_custom_prompt(process_type: str, prompt_text: str):
         db = get_db()
         collection_name = f"{process_type}_prompt"
         collection = db[collection_name]
-        # Mevcut prompt'u ara
-        existing = collection.find_one({"process_type": process_type})
-        if existing:
+        document = {
+            "process_type": process_type,
+            "prompt_text": prompt_text,
+            "description": f"Base prompt for {process_type} process",
+            "created_at": datetime.now(),
+            "version": 1
+        }
+        # Tek atomik upsert: prompt yoksa eklenir, varsa dokunulmaz (find_one + insert_one yarışı olmaz)
+        result = collection.update_one({"process_type": process_type}, {"$setOnInsert": document}, upsert=True)
+        if result.upserted_id is None:
             logger.warning(f"{process_type} için base prompt zaten mevcut, değiştirilmeyecek.")
             return False
-        else:
-            # Yeni prompt ekle
-            result = collection.insert_one({
-                "process_type": process_type,
-                "prompt_text": prompt_text,
-                "description": f"Base prompt for {process_type} process",
-                "created_at": datetime.now()
-            })
-            success = result.acknowledged
+        success = result.acknowledged
+        if success and process_type in PROCESS_TYPES:
+            # Bellekteki depo, change stream/yoklama beklenmeden hemen güncellenir
+            get_prompt_repository().put(document)
         if success:
             logger.info(f"{process_type} süreci için base prompt başarıyla eklendi.")
         else:
@@ -440,9 +393,7 @@ def get_code_review_system_suffix():
     """
     logger.info("code_review system_suffix çekiliyor.")
     try:
-        db = get_db()
-        collection = db["code_review_prompt"]
-        document = collection.find_one({"process_type": "code_review"})
+        document = get_prompt_repository().get("code_review")
         if document:
             return document.get("system_suffix", "\n\nCode to review:\n{code}")
         else:
@@ -458,9 +409,7 @@ def get_requirement_analysis_system_suffix():
     """
     logger.info("requirement_analysis system_suffix çekiliyor.")
     try:
-        db = get_db()
-        collection = db["requirement_analysis_prompt"]
-        document = collection.find_one({"process_type": "requirement_analysis"})
+        document = get_prompt_repository().get("requirement_analysis")
         if document:
             return document.get("system_suffix", "\n\nCodebase:\n{code}\n\nRequirement Document:\n{requirement_document}")
         else:
@@ -478,9 +427,7 @@ def get_test_planning_system_suffix():
     """
     logger.info("test_planning system_suffix çekiliyor.")
     try:
-        db = get_db()
-        collection = db["test_planning_prompt"]
-        document = collection.find_one({"process_type": "test_planning"})
+        document = get_prompt_repository().get("test_planning")
         if document:
             return document.get("system_suffix", "Test planning for the following:\nToday's date: {today}\nProject code:\n{code}\nRequirements document:\n{requirement_document}")
         else:
@@ -495,9 +442,7 @@ def get_test_planning_system_suffix():
 def get_environment_setup_system_suffix():
     logger.info("environment_setup system_suffix çekiliyor.")
     try:
-        db = get_db()
-        collection = db["environment_setup_prompt"]
-        document = collection.find_one({"process_type": "environment_setup"})
+        document = get_prompt_repository().get("environment_setup")
         if document and document.get("system_suffix"):
             return document.get("system_suffix")
         else:
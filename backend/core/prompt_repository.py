@@ -0,0 +1,277 @@
+"""
+prompt_repository.py
+--------------------
+Süreç promptlarının (base prompt + system_suffix) bellek içi deposu.
+Tüm `*_prompt` dokümanları uygulama açılışında tek bir aggregate ($unionWith) ile yüklenir ve
+istek yollarında bellekten okunur; prompt okumak için veritabanına gidilmez.
+
+Değişiklikler MongoDB change stream ile izlenir (replica set gerektirir) ve yalnızca değişen
+koleksiyon yeniden okunur. Change stream koptuğunda artan aralıklarla (PROMPT_WATCH_MAX_BACKOFF'a
+kadar) yeniden bağlanılır; stream kapalı kaldığı sürece dokümanların parmak izleri
+PROMPT_REFRESH_INTERVAL aralıklarla tek sorguda okunur ve yalnızca değişen süreçler yüklenir.
+Depo içeriği her zaman bütün olarak değiştirilir, okuyucular tutarlı bir anlık görüntü görür.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from config import PROMPT_REFRESH_INTERVAL, PROMPT_WATCH_MAX_BACKOFF
+from core.database import get_db, get_database
+
+logger = logging.getLogger(__name__)
+
+# Promptları bellekte tutulan süreçler; koleksiyon adı "<process_type>_prompt"
+PROCESS_TYPES = ("code_review", "requirement_analysis", "test_planning", "environment_setup")
+PROMPT_FIELDS = ("process_type", "prompt_text", "system_suffix", "description", "created_at", "updated_at", "version")
+# Değişiklik tespiti için okunan alanlar; _fingerprint ile aynı sırada
+FINGERPRINT_PROJECTION = {
+    "_id": 0,
+    "process_type": 1,
+    "version": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "prompt_length": {"$strLenCP": {"$ifNull": ["$prompt_text", ""]}},
+    "suffix_length": {"$strLenCP": {"$ifNull": ["$system_suffix", ""]}},
+}
+# Depo başlatılmadan (ör: uygulama dışı kullanım) yapılan senkron yükleme denemeleri arasındaki en kısa süre
+INLINE_LOAD_RETRY_INTERVAL = 30.0
+WATCH_MIN_BACKOFF = 1.0
+
+
+def _collection_for(process_type):
+    return f"{process_type}_prompt"
+
+
+def _process_type_for(collection):
+    return collection[:-len("_prompt")] if collection.endswith("_prompt") else None
+
+
+def _batch_pipeline(process_types, projection=None):
+    """
+    İlk koleksiyonda başlayıp diğerlerini $unionWith ile ekleyen tek sorgu (MongoDB 4.4+).
+    """
+    projection = projection or {"_id": 0, **{field: 1 for field in PROMPT_FIELDS}}
+    pipeline = [{"$match": {"process_type": process_types[0]}}, {"$project": projection}]
+    for process_type in process_types[1:]:
+        pipeline.append({"$unionWith": {
+            "coll": _collection_for(process_type),
+            "pipeline": [{"$match": {"process_type": process_type}}, {"$project": projection}]
+        }})
+    return pipeline
+
+
+def _fingerprint(document):
+    """
+    Dokümanın değişip değişmediğini anlamak için özet (FINGERPRINT_PROJECTION ile aynı alanlar).
+    """
+    if "prompt_length" in document:
+        prompt_length, suffix_length = document["prompt_length"], document["suffix_length"]
+    else:
+        prompt_length = len(document.get("prompt_text") or "")
+        suffix_length = len(document.get("system_suffix") or "")
+    return (document.get("version"), document.get("created_at"), document.get("updated_at"), prompt_length, suffix_length)
+
+
+class PromptRepository:
+    def __init__(self, process_types=PROCESS_TYPES, refresh_interval=PROMPT_REFRESH_INTERVAL,
+                 max_backoff=PROMPT_WATCH_MAX_BACKOFF):
+        self.process_types = tuple(process_types)
+        self.refresh_interval = refresh_interval
+        self.max_backoff = max_backoff
+        # process_type -> doküman; yalnızca referans değiştirilerek güncellenir
+        self._prompts = None
+        self._fingerprints = {}
+        self.version = 0
+        self.mode = "idle"
+        self.reconnects = 0
+        self._lock = threading.Lock()
+        self._task = None
+        self._next_inline_load = 0.0
+
+    def _apply(self, documents, process_types=None):
+        """
+        Yüklenen dokümanları yeni anlık görüntü olarak yayınlar.
+
+        :param process_types: Yüklenen süreçler; None ise tümü (listede olup dokümanı gelmeyenler silinir).
+        :return: İçerik değiştiyse True.
+        """
+        process_types = self.process_types if process_types is None else tuple(process_types)
+        loaded = {}
+        for document in documents:
+            # Aynı süreç için birden fazla doküman varsa find_one gibi ilki geçerlidir
+            loaded.setdefault(document["process_type"], document)
+        with self._lock:
+            prompts = dict(self._prompts or {})
+            for process_type in process_types:
+                if process_type in loaded:
+                    prompts[process_type] = loaded[process_type]
+                else:
+                    prompts.pop(process_type, None)
+            if prompts == self._prompts:
+                return False
+            self._prompts = prompts
+            self._fingerprints = {process_type: _fingerprint(document) for process_type, document in prompts.items()}
+            self.version += 1
+        logger.info(f"Prompt deposu güncellendi (sürüm {self.version}, {', '.join(process_types)}).")
+        return True
+
+    def load(self):
+        """
+        Promptları sync istemciyle tek sorguda yükler (depo başlatılmadan erişilirse kullanılır).
+        """
+        collection = get_db()[_collection_for(self.process_types[0])]
+        return self._apply(list(collection.aggregate(_batch_pipeline(self.process_types))))
+
+    async def load_async(self, process_types=None):
+        """
+        Verilen süreçlerin (None ise tümünün) promptlarını tek sorguda yükler.
+        """
+        process_types = self.process_types if process_types is None else tuple(process_types)
+        database = await get_database()
+        collection = database[_collection_for(process_types[0])]
+        documents = await collection.aggregate(_batch_pipeline(process_types)).to_list(None)
+        return self._apply(documents, process_types)
+
+    def get(self, process_type):
+        """
+        Sürecin prompt dokümanını döndürür; bulunamazsa None.
+        Depo henüz yüklenemediyse arka plan görevi yeniden dener ve None döner; istek yolunda
+        veritabanı beklenmez. Görev çalışmıyorsa (uygulama dışı kullanım) senkron yükleme
+        INLINE_LOAD_RETRY_INTERVAL'da en fazla bir kez denenir.
+        """
+        prompts = self._prompts
+        if prompts is None:
+            if self.running or time.monotonic() < self._next_inline_load:
+                return None
+            self._next_inline_load = time.monotonic() + INLINE_LOAD_RETRY_INTERVAL
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Prompt deposu yüklenemedi: {str(e)}")
+                return None
+            prompts = self._prompts
+        return prompts.get(process_type)
+
+    def put(self, document):
+        """
+        Tek bir prompt dokümanını (ör: save_custom_prompt sonrası) yeni anlık görüntüyle yayınlar.
+        """
+        with self._lock:
+            if self._prompts is None:
+                # Depo henüz yüklenmediyse ilk erişimde doküman veritabanından zaten okunur
+                return
+            prompts = dict(self._prompts)
+            prompts[document["process_type"]] = {key: document[key] for key in PROMPT_FIELDS if key in document}
+            self._prompts = prompts
+            self._fingerprints = {process_type: _fingerprint(item) for process_type, item in prompts.items()}
+            self.version += 1
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """
+        Promptları yükler ve değişiklik izlemeyi başlatır (uygulama açılışında çağrılır).
+        """
+        try:
+            await self.load_async()
+        except Exception as e:
+            logger.error(f"Prompt deposu yüklenemedi, arka planda tekrar denenecek: {str(e)}")
+        if not self.running:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.mode = "idle"
+
+    async def _watch(self):
+        collections = [_collection_for(process_type) for process_type in self.process_types]
+        pipeline = [{"$match": {"ns.coll": {"$in": collections}}}]
+        backoff = WATCH_MIN_BACKOFF
+        while True:
+            try:
+                database = await get_database()
+                async with database.watch(pipeline) as stream:
+                    self.mode = "change_stream"
+                    backoff = WATCH_MIN_BACKOFF
+                    logger.info("Prompt deposu change stream ile izleniyor.")
+                    # Stream açılmadan (veya kopukken) yapılan değişiklikler kaçırılmasın
+                    await self.load_async()
+                    async for change in stream:
+                        process_type = _process_type_for(change.get("ns", {}).get("coll", ""))
+                        await self.load_async([process_type] if process_type in self.process_types else None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Prompt change stream kullanılamıyor ({str(e)}), {backoff:.0f}s sonra tekrar denenecek.")
+            self.reconnects += 1
+            # Stream kapalıyken promptlar yoklanır; ardından yeniden bağlanılır
+            await self._poll(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _poll(self, duration):
+        """
+        `duration` saniye boyunca PROMPT_REFRESH_INTERVAL aralıklarla değişen promptları yükler.
+        Depo hiç yüklenemediyse aralık beklenmeden her turda yeniden denenir.
+        """
+        self.mode = "polling" if self.refresh_interval > 0 else "reconnecting"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        while True:
+            remaining = deadline - loop.time()
+            if self._prompts is None:
+                await asyncio.sleep(max(remaining, 0))
+                await self._refresh()
+                return
+            if self.refresh_interval <= 0 or remaining < self.refresh_interval:
+                await asyncio.sleep(max(remaining, 0))
+                return
+            await asyncio.sleep(self.refresh_interval)
+            await self._refresh()
+
+    async def _refresh(self):
+        """
+        Dokümanların parmak izlerini tek sorguda okur ve yalnızca değişen süreçleri yükler.
+        """
+        try:
+            database = await get_database()
+            collection = database[_collection_for(self.process_types[0])]
+            documents = await collection.aggregate(_batch_pipeline(self.process_types, FINGERPRINT_PROJECTION)).to_list(None)
+            current = {}
+            for document in documents:
+                current.setdefault(document["process_type"], _fingerprint(document))
+            changed = [
+                process_type for process_type in self.process_types
+                if self._prompts is None or current.get(process_type) != self._fingerprints.get(process_type)
+            ]
+            if changed:
+                await self.load_async(changed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Prompt deposu yenilenemedi: {str(e)}")
+
+    def stats(self):
+        prompts = self._prompts or {}
+        return {"version": self.version, "mode": self.mode, "reconnects": self.reconnects, "process_types": sorted(prompts)}
+
+
+_prompt_repository = None
+
+
+def get_prompt_repository():
+    """
+    Süreç genelinde paylaşılan PromptRepository örneğini döndürür.
+    """
+    global _prompt_repository
+    if _prompt_repository is None:
+        _prompt_repository = PromptRepository()
+    return _prompt_repository
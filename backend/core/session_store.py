@@ -0,0 +1,104 @@
+"""
+session_store.py
+----------------
+Session kayıtlarının saklama düzeni.
+Her session için `session_history` koleksiyonunda küçük bir başlık dokümanı (oluşturulma/güncellenme
+zamanı, çalıştırılan süreçler, çalıştırma kimlikleri ve sayısı) ve her süreç çalıştırması için `process_runs`
+koleksiyonunda ayrı bir doküman tutulur. Böylece bir yazma işlemi yalnızca o çalıştırmanın boyutu
+kadar veri taşır; session büyüdükçe doküman yeniden yazılmaz ve 16 MB sınırına yaklaşılmaz.
+
+SESSION_COMPRESS_THRESHOLD byte'ı aşan `output` ve `used_prompt` alanları zlib ile sıkıştırılıp
+`<alan>_zlib` adıyla saklanır; okurken decode_run ile açılır.
+"""
+
+import json
+import zlib
+from datetime import datetime
+from bson import ObjectId
+from pymongo import DESCENDING, InsertOne, UpdateOne
+from config import SESSION_COMPRESS_THRESHOLD
+from core.database import get_database
+
+SESSIONS_COLLECTION = "session_history"
+RUNS_COLLECTION = "process_runs"
+# Boyutu büyüyebilen, sıkıştırılan alanlar
+COMPRESSIBLE_FIELDS = ("output", "used_prompt")
+COMPRESSED_SUFFIX = "_zlib"
+
+
+def build_run(session_id, process_type, output, edited_prompt, used_prompt, used_model, timestamp=None, run_id=None):
+    """
+    Tek bir süreç çalıştırmasının process_runs dokümanını oluşturur; büyük alanlar sıkıştırılır.
+    _id istemcide atanır; böylece tekrar denenen yazma aynı çalıştırmayı ikinci kez eklemez.
+    """
+    run = {
+        "_id": run_id or ObjectId(),
+        "session_id": session_id,
+        "process_type": process_type,
+        "timestamp": timestamp or datetime.now(),
+        "edited_prompt": edited_prompt,
+        "used_model": used_model,
+    }
+    compressed = []
+    for field, value in (("output", output), ("used_prompt", used_prompt)):
+        data = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+        if SESSION_COMPRESS_THRESHOLD and len(data) > SESSION_COMPRESS_THRESHOLD:
+            run[field + COMPRESSED_SUFFIX] = zlib.compress(data)
+            compressed.append(field)
+        else:
+            run[field] = value
+    if compressed:
+        run["compressed"] = compressed
+    return run
+
+
+def session_operations(run):
+    """
+    Çalıştırma dokümanı ve session başlığının güncellemesi için yazma işlemleri.
+    Başlık güncellemesi idempotenttir: çalıştırma kimliği run_ids kümesine eklenir ve run_count bu
+    kümeden hesaplanır, böylece tekrar denenen bir yazma çalıştırmayı iki kez saymaz.
+
+    :return: (koleksiyon adı, yazma işlemi) ikilileri listesi (bkz. SessionWriter.submit).
+    """
+    timestamp = run["timestamp"]
+    # Aggregation pipeline güncellemesi (MongoDB 4.2+)
+    header = UpdateOne(
+        {"session_id": run["session_id"]},
+        [
+            {"$set": {
+                "created_at": {"$ifNull": ["$created_at", timestamp]},
+                "updated_at": {"$max": ["$updated_at", timestamp]},
+                "process_types": {"$setUnion": [{"$ifNull": ["$process_types", []]}, [run["process_type"]]]},
+                "run_ids": {"$setUnion": [{"$ifNull": ["$run_ids", []]}, [run["_id"]]]}
+            }},
+            {"$set": {"run_count": {"$size": "$run_ids"}}}
+        ],
+        upsert=True
+    )
+    return [(SESSIONS_COLLECTION, header), (RUNS_COLLECTION, InsertOne(run))]
+
+
+def decode_run(document):
+    """
+    Sıkıştırılmış alanları açarak çalıştırma dokümanını build_run öncesi biçimine döndürür.
+    """
+    for field in document.pop("compressed", []):
+        document[field] = json.loads(zlib.decompress(document.pop(field + COMPRESSED_SUFFIX)))
+    return document
+
+
+async def load_process_runs(session_id, process_type=None, limit=0):
+    """
+    Session'ın çalıştırmalarını en yeniden eskiye, sıkıştırılmış alanları açılmış olarak döndürür
+    ((session_id, process_type, timestamp) indeksini kullanır).
+    """
+    query = {"session_id": session_id}
+    if process_type:
+        query["process_type"] = process_type
+    database = await get_database()
+    cursor = database[RUNS_COLLECTION].find(query).sort("timestamp", DESCENDING).limit(limit)
+    runs = []
+    async for document in cursor:
+        document["run_id"] = str(document.pop("_id"))
+        runs.append(decode_run(document))
+    return runs
@@ -0,0 +1,233 @@
+"""
+session_writer.py
+-----------------
+Session kayıtları için write-behind (arkadan yazan) kuyruk.
+İstek yolları yazma işlemlerini kuyruğa bırakıp hemen döner; kayıtlar arka planda async istemciyle
+koleksiyon başına `bulk_write` partileri halinde yazılır. Parti SESSION_WRITE_BATCH_SIZE işleme ulaştığında veya
+en eski kayıt SESSION_WRITE_FLUSH_INTERVAL saniye beklediğinde gönderilir. Uygulama kapanırken
+kuyruktaki tüm kayıtlar yazılır.
+
+Yazılamayan partiler kuyruğun başına geri konur ve sonraki turda tekrar denenir; kuyruk
+SESSION_WRITE_MAX_BACKLOG sınırına ulaştığında yeni kayıtlar reddedilir ve çağıran taraf
+senkron yazmaya döner (bkz. prompt_manager.save_session_data).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from pymongo.errors import BulkWriteError
+from config import SESSION_WRITE_BATCH_SIZE, SESSION_WRITE_FLUSH_INTERVAL, SESSION_WRITE_MAX_BACKLOG
+from core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWriter:
+    def __init__(self, batch_size=SESSION_WRITE_BATCH_SIZE, flush_interval=SESSION_WRITE_FLUSH_INTERVAL,
+                 max_backlog=SESSION_WRITE_MAX_BACKLOG):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        # (kuyruğa giriş zamanı, koleksiyon adı, pymongo yazma işlemi) üçlüleri
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = None
+        self._wake = None
+        self._loop = None
+        self._task = None
+        self.submitted = 0
+        self.written = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_flush_ms = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def submit(self, operations):
+        """
+        Yazma işlemlerini (UpdateOne, InsertOne vb.) kuyruğa ekler; beklemeden döner.
+        İşlemler birlikte kabul edilir ya da birlikte reddedilir. Herhangi bir thread'den çağrılabilir.
+
+        :param operations: (koleksiyon adı, yazma işlemi) ikilileri listesi.
+        :return: Kuyruğa alındıysa True; writer çalışmıyorsa veya kuyruk doluysa False.
+        """
+        if not self.running:
+            return False
+        with self._lock:
+            if len(self._pending) + len(operations) > self.max_backlog:
+                self.rejected += len(operations)
+                return False
+            now = time.monotonic()
+            self._pending.extend((now, collection, operation) for collection, operation in operations)
+            self.submitted += len(operations)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    async def start(self):
+        """
+        Arka plan yazma döngüsünü başlatır (uygulama açılışında çağrılır).
+        """
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Döngüyü durdurur ve kuyrukta kalan tüm kayıtları yazar (uygulama kapanırken çağrılır).
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while self._pending:
+            if not await self.flush():
+                logger.error(f"Kapanışta {len(self._pending)} session kaydı yazılamadı.")
+                break
+
+    async def _run(self):
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self._next_deadline())
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                if self._due() and not await self.flush():
+                    # Veritabanı erişilemiyorsa tekrar denemeden önce bekle
+                    await asyncio.sleep(self.flush_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Beklenmeyen hata döngüyü sonlandırmaz; kuyruk yazılmadan büyümesin
+                self.last_error = str(e)
+                logger.exception(f"Session yazma döngüsünde beklenmeyen hata: {str(e)}")
+                await asyncio.sleep(self.flush_interval)
+
+    def _next_deadline(self):
+        with self._lock:
+            if not self._pending:
+                return self.flush_interval
+            age = time.monotonic() - self._pending[0][0]
+        return max(0.0, self.flush_interval - age)
+
+    def _due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            return len(self._pending) >= self.batch_size or time.monotonic() - self._pending[0][0] >= self.flush_interval
+
+    async def flush(self):
+        """
+        Kuyruktaki kayıtları batch_size'lık partiler halinde, her koleksiyona ayrı bulk_write ile yazar.
+
+        :return: Tüm partiler yazıldıysa True.
+        """
+        async with self._flush_lock:
+            database = await get_database()
+            while True:
+                with self._lock:
+                    batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                if not batch:
+                    return True
+                started = time.perf_counter()
+                groups = {}
+                for entry in batch:
+                    groups.setdefault(entry[1], []).append(entry)
+                for collection, entries in groups.items():
+                    try:
+                        # ordered: aynı dokümana ait güncellemeler geliş sırasıyla uygulanır
+                        await database[collection].bulk_write([operation for _, _, operation in entries], ordered=True)
+                    except asyncio.CancelledError:
+                        # Yarıda kalan parti kaybolmasın; kapanışta tekrar yazılır. Sunucu işlemlerin bir kısmını
+                        # uygulamış olabilir: çalıştırmalar istemcide atanan _id ile, başlıklar idempotent
+                        # güncellemeyle yazıldığından tekrar yazmak kayıt çoğaltmaz (bkz. core/session_store.py)
+                        self._requeue(batch, groups, collection)
+                        raise
+                    except BulkWriteError as e:
+                        write_errors = e.details.get("writeErrors") or []
+                        if write_errors:
+                            # Hatalı işlem tekrar denense de başarısız olur; öncekiler yazıldı, sonrakiler kuyruğa döner
+                            error = write_errors[0]
+                            index = error["index"]
+                            with self._lock:
+                                self._pending.extendleft(reversed(entries[index + 1:]))
+                            if error.get("code") == 11000:
+                                # Önceki bir denemede yazılmış çalıştırma (aynı _id)
+                                self.written += index + 1
+                            else:
+                                self.written += index
+                                self.dropped += 1
+                                self.last_error = str(e)
+                                logger.error(f"Session kaydı yazılamadı ve atlandı ({collection}): {str(e)}")
+                            continue
+                        # Yalnızca write concern hatası: işlemler tekrar denenir
+                        self._requeue(batch, groups, collection)
+                        self.failed_batches += 1
+                        self.last_error = str(e)
+                        logger.error(f"Session kayıtları için write concern sağlanamadı ({collection}), tekrar denenecek: {str(e)}")
+                        return False
+                    except Exception as e:
+                        self._requeue(batch, groups, collection)
+                        self.failed_batches += 1
+                        self.last_error = str(e)
+                        logger.error(f"Session kayıtları yazılamadı ({collection}), tekrar denenecek: {str(e)}")
+                        return False
+                    self.written += len(entries)
+                self.batches += 1
+                self.last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def _requeue(self, batch, groups, failed_collection):
+        """
+        Yazılamayan koleksiyonun ve henüz yazılmamış koleksiyonların işlemlerini sıralarını koruyarak kuyruğa geri koyar.
+        """
+        collections = list(groups)
+        remaining = set(collections[collections.index(failed_collection):])
+        with self._lock:
+            self._pending.extendleft(reversed([entry for entry in batch if entry[1] in remaining]))
+
+    def stats(self):
+        with self._lock:
+            backlog = len(self._pending)
+            oldest = time.monotonic() - self._pending[0][0] if self._pending else 0.0
+        return {
+            "running": self.running,
+            "backlog": backlog,
+            "oldest_pending_seconds": round(oldest, 3),
+            "submitted": self.submitted,
+            "written": self.written,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error,
+        }
+
+
+_session_writer = None
+
+
+def get_session_writer():
+    """
+    Süreç genelinde paylaşılan SessionWriter örneğini döndürür.
+    """
+    global _session_writer
+    if _session_writer is None:
+        _session_writer = SessionWriter()
+    return _session_writer
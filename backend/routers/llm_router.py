@@ -0,0 +1,74 @@
+"""
+LLM katmanının durumunu (önbellek istatistikleri vb.) izlemek için API endpoint'leri
+"""
+
+from fastapi import APIRouter, HTTPException
+from utils.llm_cache import get_response_cache
+from utils.single_flight import get_single_flight
+from utils.backend_registry import get_backend_registry
+from utils.model_scheduler import scheduler_stats
+from utils.hedging import get_hedge_policy
+from utils.prompt_assembly import get_prefix_cache_stats
+from utils.structured_output import get_structured_output_stats
+from utils.model_capabilities import MODEL_CAPABILITIES, get_model_capabilities
+
+router = APIRouter(tags=["llm"])
+
+@router.get("/api/llm/stats")
+async def get_llm_stats():
+    """
+    LLM katmanının toplu metriklerini döndürür.
+    """
+    return {
+        "cache": get_response_cache().stats(),
+        "single_flight": get_single_flight().stats(),
+        "hedging": get_hedge_policy().stats(),
+        "prompt_cache": get_prefix_cache_stats().stats(),
+        "structured_output": get_structured_output_stats().stats()
+    }
+
+@router.get("/api/llm/backends")
+async def get_llm_backends():
+    """
+    Backend kaydındaki endpoint'lerin yük, gecikme ve sağlık durumunu döndürür.
+    """
+    return get_backend_registry().snapshot()
+
+@router.get("/api/llm/circuits")
+async def get_llm_circuits():
+    """
+    Backend bazlı circuit breaker durumlarını (closed / open / half_open) döndürür.
+    """
+    return get_backend_registry().circuits()
+
+@router.get("/api/llm/scheduler")
+async def get_llm_scheduler():
+    """
+    Model affinity scheduler'ın model bazlı kuyruk derinliklerini ve model değişim sayısını döndürür.
+    """
+    return scheduler_stats()
+
+@router.get("/api/llm/models")
+async def get_llm_models():
+    """
+    Bilinen modellerin context window, çıktı bütçesi ve token/s değerlerini (override'lar dahil) döndürür.
+    """
+    return {model: get_model_capabilities(model).to_dict() for model in MODEL_CAPABILITIES}
+
+@router.get("/api/llm/cache/stats")
+async def get_llm_cache_stats():
+    """
+    LLM yanıt önbelleğinin isabet/ıskalama sayaçlarını döndürür.
+    """
+    return get_response_cache().stats()
+
+@router.delete("/api/llm/cache")
+async def clear_llm_cache():
+    """
+    Bellek ve disk önbelleğini temizler.
+    """
+    try:
+        get_response_cache().clear()
+        return {"status": "success", "message": "LLM cache cleared"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
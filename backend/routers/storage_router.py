@@ -0,0 +1,34 @@
+"""
+Veritabanı katmanının durumunu (session yazma kuyruğu, prompt deposu) izlemek ve kayıtlı süreç
+çalıştırmalarını okumak için API endpoint'leri
+"""
+
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from core.session_store import load_process_runs
+from core.session_writer import get_session_writer
+from core.prompt_repository import get_prompt_repository
+
+router = APIRouter(tags=["storage"])
+
+@router.get("/api/storage/stats")
+async def get_storage_stats():
+    """
+    Session write-behind kuyruğunun birikmiş kayıt (backlog) metriklerini ve prompt deposunun durumunu döndürür.
+    """
+    return {
+        "session_writer": get_session_writer().stats(),
+        "prompt_repository": get_prompt_repository().stats()
+    }
+
+@router.get("/api/sessions/{session_id}/runs")
+async def get_session_runs(session_id: str, process_type: Optional[str] = None, limit: int = Query(20, ge=0, le=200)):
+    """
+    Session'ın süreç çalıştırmalarını (output, used_prompt, used_model vb.) en yeniden eskiye döndürür.
+    Sıkıştırılarak saklanan alanlar açılmış olarak döner; limit=0 tüm çalıştırmaları döndürür.
+    """
+    try:
+        runs = await load_process_runs(session_id, process_type, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"session_id": session_id, "runs": runs}
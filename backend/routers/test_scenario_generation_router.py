@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from stlc.test_scenario_generation import generate_prompt, run_step
+from fastapi.responses import JSONResponse, StreamingResponse
+from stlc.test_scenario_generation import generate_prompt, run_step, prepare_step, stream_step
+from utils.sse import SSE_HEADERS
 from typing import Dict
 from core.database import get_database
 
@@ -28,6 +29,17 @@ async def run_test_scenario_generation(data: Dict):
         raise HTTPException(status_code=400, detail=result["error"])
     return result
 
+@router.post("/run/stream")
+async def stream_test_scenario_generation(data: Dict):
+    """
+    Test senaryolarını üretildikçe server-sent events olarak stream eder (her senaryo bir `scenario` mesajı).
+    """
+    try:
+        context = await prepare_step(data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(stream_step(context), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.get("/")
 async def read_test_scenarios():
     try:
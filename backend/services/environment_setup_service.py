@@ -1,9 +1,18 @@
 from utils.file_handler import FileHandler
-from utils.model_client import LLMClient
+from utils.model_client import get_llm_client
 from utils.text_processor import TextProcessor
+from utils.chunk_executor import run_chunks
+from utils.sse import format_sse, stream_prompts
+from utils.deadline import deadline_scope
+from utils.model_capabilities import plan_prompt
+from utils.prompt_assembly import assemble_prompt
+from utils.structured_output import response_format_for
+from utils.map_reduce import tree_reduce, llm_merge_reducer, json_merge_reducer, reduce_group_budget
+from config import LLM_REQUEST_DEADLINE
 from core.prompt_manager import get_base_prompt, save_session_data, get_environment_setup_system_suffix
 import logging
 import os
+from functools import partial
 from datetime import datetime
 
 logging.basicConfig(
@@ -16,10 +25,35 @@ logging.basicConfig(
 
 logger = logging.getLogger("EnvironmentSetupService")
 
+# Environment setup çıktısı: tek bir environment_setup nesnesi
+OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "environment_setup": {
+            "type": "object",
+            "properties": {
+                "language": {"type": "string"},
+                "language_version": {"type": "string"},
+                "framework": {"type": "string"},
+                "operating_system": {"type": "string"},
+                "dependencies": {"type": "array", "items": {"type": "string"}},
+                "database": {"type": "string"},
+                "required_tools": {"type": "array", "items": {"type": "string"}},
+                "installation_notes": {"type": "string"}
+            },
+            "required": [
+                "language", "language_version", "framework", "operating_system",
+                "dependencies", "database", "required_tools", "installation_notes"
+            ]
+        }
+    },
+    "required": ["environment_setup"]
+}
+
 class EnvironmentSetupService:
     def __init__(self):
         self.file_handler = FileHandler()
-        self.model_client = LLMClient()
+        self.model_client = get_llm_client()
         self.text_processor = TextProcessor()
         self.logger = logging.getLogger(__name__)
         self.logger.debug("EnvironmentSetupService initialized")
@@ -27,18 +61,21 @@ class EnvironmentSetupService:
     def normalize_prompt(self, text):
         return ' '.join(text.strip().split()).lower()
 
-    async def run_environment_setup(self, files, types, model_key=None, custom_prompt=None, session_id=None):
+    async def prepare_environment_setup(self, files, types, model_key=None, custom_prompt=None, session_id=None, use_cache=True):
+        """
+        Dosyaları kaydeder, modeli ve promptu belirler; run ve stream yolları için ortak bağlamı döndürür.
+        """
+        self.logger.debug(f"run_environment_setup çağrıldı. Dosya sayısı: {len(files)}, Types: {types}")
+        # Dosya isimlerini ve tiplerini logla
+        for idx, (file, file_type) in enumerate(zip(files, types)):
+            self.logger.debug(f"[{idx}] Dosya: {getattr(file, 'filename', str(file))}, Type: '{file_type}'")
+        if not files:
+            raise ValueError("No files provided for environment setup")
+        file_paths = await self.file_handler.save_files(files)
+        self.logger.debug(f"Files saved: {file_paths}")
+        if not file_paths:
+            raise ValueError("Failed to save uploaded files")
         try:
-            self.logger.debug(f"run_environment_setup çağrıldı. Dosya sayısı: {len(files)}, Types: {types}")
-            # Dosya isimlerini ve tiplerini logla
-            for idx, (file, file_type) in enumerate(zip(files, types)):
-                self.logger.debug(f"[{idx}] Dosya: {getattr(file, 'filename', str(file))}, Type: '{file_type}'")
-            if not files:
-                raise ValueError("No files provided for environment setup")
-            file_paths = await self.file_handler.save_files(files)
-            self.logger.debug(f"Files saved: {file_paths}")
-            if not file_paths:
-                raise ValueError("Failed to save uploaded files")
             if len(file_paths) != len(types):
                 self.logger.error(f"file_paths ve types uzunlukları eşit değil! file_paths: {len(file_paths)}, types: {len(types)}")
                 raise ValueError("Dosya sayısı ile types array'i eşleşmiyor!")
@@ -52,11 +89,11 @@ class EnvironmentSetupService:
                     requirement_doc_content += code_content + "\n"
                 else:
                     code_files_content += f"\n\n### File: {os.path.basename(path)}\n\n{code_content}"
-            model_client = LLMClient()
+            model_client = get_llm_client()
             model_name = None
             if model_key:
                 model_name = model_client.get_model_identifier(model_key)
-                model_client = LLMClient(model_name)
+                model_client = get_llm_client(model_name)
                 self.logger.info(f"Using model: {model_name} for environment setup")
             else:
                 self.logger.info("No model specified, using default model")
@@ -76,27 +113,32 @@ class EnvironmentSetupService:
                 else:
                     raise ValueError("No prompt found in database for environment_setup process. Please add a prompt to the database.")
             # Promptu oluştururken requirement_doc_content ve code_files_content'i birleştir
-            review_prompt = used_prompt + system_suffix
-            review_prompt = review_prompt.format(
+            prompt_template = used_prompt + system_suffix
+            # Talimatlar sabit system mesajında, kod ve doküman user mesajında (LLM_PROMPT_LAYOUT)
+            system_prompt, user_template = assemble_prompt(prompt_template, ["code", "requirement_document"])
+            rendered = user_template.render(
+                model_name=model_client.model_name,
                 code=code_files_content,
                 requirement_document=requirement_doc_content
             )
-            MAX_TOKENS = 4000
-            if len(review_prompt.split()) > MAX_TOKENS:
-                self.logger.debug(f"Token limit exceeded: {len(review_prompt.split())} > {MAX_TOKENS}")
-                chunks = self.text_processor.chunk_text(review_prompt)
-                all_reviews = []
-                for i, chunk in enumerate(chunks):
-                    self.logger.debug(f"Processing chunk {i+1}/{len(chunks)}")
-                    review = await model_client.generate_response(chunk)
-                    if review:
-                        all_reviews.append(review)
-                final_review = self._combine_reviews(all_reviews)
+            review_prompt = rendered.text
+            # Modelin context window'una göre tek çağrı mı, kaç chunk mı gerektiği ve max_tokens belirlenir
+            system_tokens = self.text_processor.count_tokens(system_prompt, model_client.model_name) if system_prompt else 0
+            # Render sırasında hesaplanan token tahmini kullanılır, prompt yeniden sayılmaz
+            token_count = rendered.tokens + system_tokens
+            plan = plan_prompt(review_prompt, model_client.model_name, prompt_tokens=token_count)
+            chunked = not plan.fits
+            if chunked:
+                self.logger.debug(f"Token limit exceeded: {token_count} > {plan.input_budget} ({plan.chunks} chunks)")
+                prompts = self.text_processor.chunk_text(
+                    user_template,
+                    {"code": code_files_content, "requirement_document": requirement_doc_content},
+                    plan.input_budget - system_tokens,
+                    model_client.model_name
+                )
             else:
-                self.logger.debug(f"Using single review. Token count: {len(review_prompt.split())}")
-                final_review = await model_client.generate_response(review_prompt)
-            if not final_review:
-                raise ValueError("Failed to generate environment setup output")
+                self.logger.debug(f"Using single review. Token count: {token_count}")
+                prompts = [review_prompt]
             file_names = [os.path.basename(path) for path in file_paths]
             files_header = "Files analyzed:\n" + "\n".join(file_names)
             edited_prompt = False
@@ -104,38 +146,133 @@ class EnvironmentSetupService:
                 edited_prompt = (self.normalize_prompt(custom_prompt) != self.normalize_prompt(base_prompt))
             elif custom_prompt and not base_prompt:
                 edited_prompt = True
-            session_data = {
-                "session_id": session_id,
-                "output": {
-                    "files": files_header,
-                    "setup": final_review
-                },
-                "edited_prompt": edited_prompt,
-                "used_prompt": used_prompt,
-                "used_model": model_name
-            }
-            save_session_data(session_data, process_type="environment_setup")
-            for path in file_paths:
-                try:
-                    if os.path.exists(path):
-                        os.remove(path)
-                except Exception as e:
-                    self.logger.warning(f"Failed to remove temporary file {path}: {str(e)}")
-            return {
-                "status": "success",
-                "setups": [{
-                    "files": files_header,
-                    "setup": final_review
-                }],
-                "prompt_info": {
-                    "source": prompt_source
-                },
-                "session_id": session_id or "unknown"
-            }
+        except Exception:
+            self._cleanup_files(file_paths)
+            raise
+        return {
+            "file_paths": file_paths,
+            "files_header": files_header,
+            "model_client": model_client,
+            "model_name": model_name,
+            "prompts": prompts,
+            "chunked": chunked,
+            "used_prompt": used_prompt,
+            "prompt_source": prompt_source,
+            "edited_prompt": edited_prompt,
+            "session_id": session_id,
+            "use_cache": use_cache,
+            "max_tokens": plan.max_tokens,
+            "system_prompt": system_prompt
+        }
+
+    async def run_environment_setup(self, files, types, model_key=None, custom_prompt=None, session_id=None, use_cache=True):
+        try:
+            context = await self.prepare_environment_setup(files, types, model_key, custom_prompt, session_id, use_cache)
+            try:
+                # Tüm chunk çağrıları aynı toplam süre bütçesini paylaşır
+                with deadline_scope(LLM_REQUEST_DEADLINE):
+                    model_client = context["model_client"]
+                    if context["chunked"]:
+                        # Chunk'lar model bazlı eşzamanlılık limitiyle paralel işlenir, sıra korunur
+                        chunk_results = await run_chunks(
+                            context["prompts"],
+                            partial(
+                                model_client.generate_structured,
+                                schema=OUTPUT_SCHEMA,
+                                name="environment_setup",
+                                max_tokens=context["max_tokens"],
+                                use_cache=context["use_cache"],
+                                system_prompt=context["system_prompt"]
+                            ),
+                            model_name=model_client.model_name
+                        )
+                        all_reviews = [review for review in chunk_results if review]
+                        final_review = await self._combine_reviews(all_reviews, context)
+                    else:
+                        final_review = await model_client.generate_structured(
+                            context["prompts"][0],
+                            OUTPUT_SCHEMA,
+                            "environment_setup",
+                            max_tokens=context["max_tokens"],
+                            use_cache=context["use_cache"],
+                            system_prompt=context["system_prompt"]
+                        )
+                    return self._finalize_environment_setup(context, final_review)
+            finally:
+                self._cleanup_files(context["file_paths"])
         except Exception as e:
             self.logger.error(f"Error in run_environment_setup: {str(e)}")
             raise
 
+    async def stream_environment_setup(self, context):
+        """
+        prepare_environment_setup ile hazırlanan bağlamı LLM'e stream eder ve SSE mesajları üretir.
+        """
+        try:
+            yield format_sse({
+                "files": context["files_header"],
+                "chunks": len(context["prompts"]),
+                "session_id": context["session_id"] or "unknown"
+            }, event="start")
+            outputs = []
+            with deadline_scope(LLM_REQUEST_DEADLINE):
+                async for message in stream_prompts(context["model_client"], context["prompts"], outputs,
+                    max_tokens=context["max_tokens"],
+                    use_cache=context["use_cache"],
+                    system_prompt=context["system_prompt"],
+                    response_format=response_format_for(OUTPUT_SCHEMA, "environment_setup")
+                ):
+                    yield message
+                # Stream edilen çıktı şemaya uymuyorsa (response_format desteklenmiyorsa) onarılır
+                outputs = [
+                    await context["model_client"].repair_structured(output, OUTPUT_SCHEMA, "environment_setup", max_tokens=context["max_tokens"])
+                    for output in outputs
+                ]
+                if context["chunked"]:
+                    final_review = await self._combine_reviews(outputs, context)
+                else:
+                    final_review = outputs[0] if outputs else None
+            yield format_sse(self._finalize_environment_setup(context, final_review), event="done")
+        except Exception as e:
+            self.logger.error(f"Error in stream_environment_setup: {str(e)}")
+            yield format_sse({"detail": str(e)}, event="error")
+        finally:
+            self._cleanup_files(context["file_paths"])
+
+    def _finalize_environment_setup(self, context, final_review):
+        if not final_review:
+            raise ValueError("Failed to generate environment setup output")
+        session_data = {
+            "session_id": context["session_id"],
+            "output": {
+                "files": context["files_header"],
+                "setup": final_review
+            },
+            "edited_prompt": context["edited_prompt"],
+            "used_prompt": context["used_prompt"],
+            "used_model": context["model_name"]
+        }
+        save_session_data(session_data, process_type="environment_setup")
+        return {
+            "status": "success",
+            "setups": [{
+                "files": context["files_header"],
+                "setup": final_review
+            }],
+            "prompt_info": {
+                "source": context["prompt_source"]
+            },
+            "session_id": context["session_id"] or "unknown"
+        }
+
+    def _cleanup_files(self, file_paths):
+        for path in file_paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                self.logger.warning(f"Failed to remove temporary file {path}: {str(e)}")
+
     def _combine_file_contents(self, file_paths):
         combined_content = ""
         for path in file_paths:
@@ -143,6 +280,19 @@ class EnvironmentSetupService:
             combined_content += f"\n\n### File: {os.path.basename(path)}\n\n{code_content}"
         return combined_content
 
-    def _combine_reviews(self, reviews):
-        combined = "\n\n".join(reviews)
-        return "# Complete Environment Setup Summary\n\n" + combined 
\ No newline at end of file
+    async def _combine_reviews(self, reviews, context):
+        # Chunk'lardan gelen environment_setup JSON nesneleri yapısal olarak birleştirilir
+        # (bağımlılık ve araç listeleri tekrarsız birleşir, kurulum notları eklenir, diğer alanlarda ilk değer
+        # korunur); JSON okunamayan gruplar LLM ile birleştirilir.
+        model_client = context["model_client"]
+        fallback = llm_merge_reducer(model_client, "environment setup", context["max_tokens"], context["use_cache"])
+        merged = await tree_reduce(
+            reviews,
+            json_merge_reducer(fallback=fallback, text_keys=("installation_notes",)),
+            model_name=model_client.model_name,
+            max_group_tokens=reduce_group_budget(model_client.model_name, context["max_tokens"])
+        )
+        if not merged:
+            return None
+        # Birleşik çıktı (özellikle LLM fallback'i) şemaya göre yeniden doğrulanır
+        return await model_client.repair_structured(merged, OUTPUT_SCHEMA, "environment_setup", max_tokens=context["max_tokens"])
\ No newline at end of file
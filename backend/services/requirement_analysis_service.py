@@ -1,9 +1,17 @@
 from utils.file_handler import FileHandler
-from utils.model_client import LLMClient
+from utils.model_client import get_llm_client
 from utils.text_processor import TextProcessor
+from utils.chunk_executor import run_chunks
+from utils.sse import format_sse, stream_prompts
+from utils.deadline import deadline_scope
+from utils.model_capabilities import plan_prompt
+from utils.prompt_assembly import assemble_prompt
+from utils.map_reduce import tree_reduce, llm_merge_reducer, reduce_group_budget
+from config import LLM_REQUEST_DEADLINE
 from core.prompt_manager import get_base_prompt, get_requirement_analysis_system_suffix, save_session_data
 import logging
 import os
+from functools import partial
 from datetime import datetime
 
 logger = logging.getLogger("RequirementAnalysisService")
@@ -11,24 +19,27 @@ logger = logging.getLogger("RequirementAnalysisService")
 class RequirementAnalysisService:
     def __init__(self):
         self.file_handler = FileHandler()
-        self.model_client = LLMClient()
+        self.model_client = get_llm_client()
         self.text_processor = TextProcessor()
         self.logger = logging.getLogger(__name__)
 
     def normalize_prompt(self, text):
         return ' '.join(text.strip().split()).lower()
 
-    async def run_requirement_analysis(self, files, types=None, model_key=None, custom_prompt=None, session_id=None):
-        try:
-            self.logger.debug(f"Starting requirement analysis for {len(files)} files with model: {model_key}")
-            if not files:
-                raise ValueError("No files provided for analysis")
+    async def prepare_requirement_analysis(self, files, types=None, model_key=None, custom_prompt=None, session_id=None, use_cache=True):
+        """
+        Dosyaları kaydeder, modeli ve promptu belirler; run ve stream yolları için ortak bağlamı döndürür.
+        """
+        self.logger.debug(f"Starting requirement analysis for {len(files)} files with model: {model_key}")
+        if not files:
+            raise ValueError("No files provided for analysis")
 
-            file_paths = await self.file_handler.save_files(files)
-            self.logger.debug(f"Files saved: {file_paths}")
-            if not file_paths:
-                raise ValueError("Failed to save uploaded files")
+        file_paths = await self.file_handler.save_files(files)
+        self.logger.debug(f"Files saved: {file_paths}")
+        if not file_paths:
+            raise ValueError("Failed to save uploaded files")
 
+        try:
             # types zorunlu, eksik veya uzunluklar eşit değilse hata fırlat
             if types is None or len(types) != len(file_paths):
                 raise ValueError("Hem Source Code hem de Requirement Document dosyası yüklenmeli ve types parametresi eksiksiz olmalı!")
@@ -43,11 +54,11 @@ class RequirementAnalysisService:
                 else:
                     code_files_content += f"\n\n### File: {os.path.basename(path)}\n\n{content}"
 
-            model_client = LLMClient()
+            model_client = get_llm_client()
             model_name = None
             if model_key:
                 model_name = model_client.get_model_identifier(model_key)
-                model_client = LLMClient(model_name)
+                model_client = get_llm_client(model_name)
                 self.logger.info(f"Using model: {model_name} for analysis")
             else:
                 self.logger.info("No model specified, using default model")
@@ -70,29 +81,33 @@ class RequirementAnalysisService:
                     raise ValueError("No prompt found in database for requirement_analysis process. Please add a prompt to the database.")
 
             # Promptu oluştururken doğru alanları kullan
-            analysis_prompt = used_prompt + system_suffix
-            analysis_prompt = analysis_prompt.format(
+            prompt_template = used_prompt + system_suffix
+            # Talimatlar sabit system mesajında, kod ve doküman user mesajında (LLM_PROMPT_LAYOUT)
+            system_prompt, user_template = assemble_prompt(prompt_template, ["code", "requirement_document"])
+            rendered = user_template.render(
+                model_name=model_client.model_name,
                 code=code_files_content,
                 requirement_document=requirement_doc_content
             )
+            analysis_prompt = rendered.text
 
-            MAX_TOKENS = 4000
-            if len(analysis_prompt.split()) > MAX_TOKENS:
-                self.logger.debug(f"Token limit exceeded: {len(analysis_prompt.split())} > {MAX_TOKENS}")
-                chunks = self.text_processor.chunk_text(analysis_prompt)
-                all_results = []
-                for i, chunk in enumerate(chunks):
-                    self.logger.debug(f"Processing chunk {i+1}/{len(chunks)}")
-                    result = await model_client.generate_response(chunk)
-                    if result:
-                        all_results.append(result)
-                final_result = self._combine_results(all_results)
+            # Modelin context window'una göre tek çağrı mı, kaç chunk mı gerektiği ve max_tokens belirlenir
+            system_tokens = self.text_processor.count_tokens(system_prompt, model_client.model_name) if system_prompt else 0
+            # Render sırasında hesaplanan token tahmini kullanılır, prompt yeniden sayılmaz
+            token_count = rendered.tokens + system_tokens
+            plan = plan_prompt(analysis_prompt, model_client.model_name, prompt_tokens=token_count)
+            chunked = not plan.fits
+            if chunked:
+                self.logger.debug(f"Token limit exceeded: {token_count} > {plan.input_budget} ({plan.chunks} chunks)")
+                prompts = self.text_processor.chunk_text(
+                    user_template,
+                    {"code": code_files_content, "requirement_document": requirement_doc_content},
+                    plan.input_budget - system_tokens,
+                    model_client.model_name
+                )
             else:
-                self.logger.debug(f"Using single analysis. Token count: {len(analysis_prompt.split())}")
-                final_result = await model_client.generate_response(analysis_prompt)
-
-            if not final_result:
-                raise ValueError("Failed to generate requirement analysis")
+                self.logger.debug(f"Using single analysis. Token count: {token_count}")
+                prompts = [analysis_prompt]
 
             file_names = [os.path.basename(path) for path in file_paths]
             files_header = "Files analyzed:\n" + "\n".join(file_names)
@@ -102,42 +117,128 @@ class RequirementAnalysisService:
                 edited_prompt = (self.normalize_prompt(custom_prompt) != self.normalize_prompt(base_prompt))
             elif custom_prompt and not base_prompt:
                 edited_prompt = True
+        except Exception:
+            self._cleanup_files(file_paths)
+            raise
 
-            session_data = {
-                "session_id": session_id,
-                "output": {
-                    "files": files_header,
-                    "analysis": final_result
-                },
-                "edited_prompt": edited_prompt,
-                "used_prompt": used_prompt,
-                "used_model": model_name
-            }
-            save_session_data(session_data, process_type="requirement_analysis")
-
-            for path in file_paths:
-                try:
-                    if os.path.exists(path):
-                        os.remove(path)
-                except Exception as e:
-                    self.logger.warning(f"Failed to remove temporary file {path}: {str(e)}")
-
-            return {
-                "status": "success",
-                "analysis": [{
-                    "files": files_header,
-                    "result": final_result
-                }],
-                "prompt_info": {
-                    "source": prompt_source
-                },
-                "session_id": session_id or "unknown"
-            }
+        return {
+            "file_paths": file_paths,
+            "files_header": files_header,
+            "model_client": model_client,
+            "model_name": model_name,
+            "prompts": prompts,
+            "chunked": chunked,
+            "used_prompt": used_prompt,
+            "prompt_source": prompt_source,
+            "edited_prompt": edited_prompt,
+            "session_id": session_id,
+            "use_cache": use_cache,
+            "max_tokens": plan.max_tokens,
+            "system_prompt": system_prompt
+        }
+
+    async def run_requirement_analysis(self, files, types=None, model_key=None, custom_prompt=None, session_id=None, use_cache=True):
+        try:
+            context = await self.prepare_requirement_analysis(files, types, model_key, custom_prompt, session_id, use_cache)
+            try:
+                # Tüm chunk çağrıları aynı toplam süre bütçesini paylaşır
+                with deadline_scope(LLM_REQUEST_DEADLINE):
+                    model_client = context["model_client"]
+                    if context["chunked"]:
+                        # Chunk'lar model bazlı eşzamanlılık limitiyle paralel işlenir, sıra korunur
+                        chunk_results = await run_chunks(
+                            context["prompts"],
+                            partial(
+                                model_client.generate_response,
+                                max_tokens=context["max_tokens"],
+                                use_cache=context["use_cache"],
+                                system_prompt=context["system_prompt"]
+                            ),
+                            model_name=model_client.model_name
+                        )
+                        all_results = [result for result in chunk_results if result]
+                        final_result = await self._combine_results(all_results, context)
+                    else:
+                        final_result = await model_client.generate_response(
+                            context["prompts"][0],
+                            max_tokens=context["max_tokens"],
+                            use_cache=context["use_cache"],
+                            system_prompt=context["system_prompt"]
+                        )
+
+                    return self._finalize_requirement_analysis(context, final_result)
+            finally:
+                self._cleanup_files(context["file_paths"])
 
         except Exception as e:
             self.logger.error(f"Error in run_requirement_analysis: {str(e)}")
             raise
 
+    async def stream_requirement_analysis(self, context):
+        """
+        prepare_requirement_analysis ile hazırlanan bağlamı LLM'e stream eder ve SSE mesajları üretir.
+        """
+        try:
+            yield format_sse({
+                "files": context["files_header"],
+                "chunks": len(context["prompts"]),
+                "session_id": context["session_id"] or "unknown"
+            }, event="start")
+            outputs = []
+            with deadline_scope(LLM_REQUEST_DEADLINE):
+                async for message in stream_prompts(context["model_client"], context["prompts"], outputs,
+                    max_tokens=context["max_tokens"],
+                    use_cache=context["use_cache"],
+                    system_prompt=context["system_prompt"]
+                ):
+                    yield message
+                if context["chunked"]:
+                    final_result = await self._combine_results(outputs, context)
+                else:
+                    final_result = outputs[0] if outputs else None
+            yield format_sse(self._finalize_requirement_analysis(context, final_result), event="done")
+        except Exception as e:
+            self.logger.error(f"Error in stream_requirement_analysis: {str(e)}")
+            yield format_sse({"detail": str(e)}, event="error")
+        finally:
+            self._cleanup_files(context["file_paths"])
+
+    def _finalize_requirement_analysis(self, context, final_result):
+        if not final_result:
+            raise ValueError("Failed to generate requirement analysis")
+
+        session_data = {
+            "session_id": context["session_id"],
+            "output": {
+                "files": context["files_header"],
+                "analysis": final_result
+            },
+            "edited_prompt": context["edited_prompt"],
+            "used_prompt": context["used_prompt"],
+            "used_model": context["model_name"]
+        }
+        save_session_data(session_data, process_type="requirement_analysis")
+
+        return {
+            "status": "success",
+            "analysis": [{
+                "files": context["files_header"],
+                "result": final_result
+            }],
+            "prompt_info": {
+                "source": context["prompt_source"]
+            },
+            "session_id": context["session_id"] or "unknown"
+        }
+
+    def _cleanup_files(self, file_paths):
+        for path in file_paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                self.logger.warning(f"Failed to remove temporary file {path}: {str(e)}")
+
     def _combine_file_contents(self, file_paths):
         combined_content = ""
         for path in file_paths:
@@ -145,6 +246,16 @@ class RequirementAnalysisService:
             combined_content += f"\n\n### File: {os.path.basename(path)}\n\n{code_content}"
         return combined_content
 
-    def _combine_results(self, results):
-        combined = "\n\n".join(results)
+    async def _combine_results(self, results, context):
+        # Chunk analizleri fan-in'lik gruplar halinde, ağaç yapısında LLM ile birleştirilir
+        model_client = context["model_client"]
+        reducer = llm_merge_reducer(model_client, "requirement analysis", context["max_tokens"], context["use_cache"])
+        combined = await tree_reduce(
+            results,
+            reducer,
+            model_name=model_client.model_name,
+            max_group_tokens=reduce_group_budget(model_client.model_name, context["max_tokens"])
+        )
+        if not combined:
+            return None
         return "# Complete Requirement Analysis Summary\n\n" + combined 
\ No newline at end of file
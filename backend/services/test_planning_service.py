@@ -1,9 +1,18 @@
 from utils.file_handler import FileHandler
-from utils.model_client import LLMClient
+from utils.model_client import get_llm_client
 from utils.text_processor import TextProcessor
+from utils.chunk_executor import run_chunks
+from utils.sse import format_sse, stream_prompts
+from utils.deadline import deadline_scope
+from utils.model_capabilities import plan_prompt
+from utils.prompt_assembly import assemble_prompt
+from utils.structured_output import response_format_for
+from utils.map_reduce import tree_reduce, llm_merge_reducer, json_merge_reducer, reduce_group_budget
+from config import LLM_REQUEST_DEADLINE
 from core.prompt_manager import get_base_prompt, save_session_data, get_test_planning_system_suffix
 import logging
 import os
+from functools import partial
 from datetime import datetime
 
 logging.basicConfig(
@@ -17,10 +26,32 @@ logging.basicConfig(
 logger = logging.getLogger("TestPlanningService")
 logger.debug("Test log message - If you see this, logging is working!")
 
+# Test planı çıktısı: görev nesnelerinden oluşan JSON dizisi (Gantt/XLSX'e dönüştürülür)
+OUTPUT_SCHEMA = {
+    "type": "array",
+    "minItems": 1,
+    "items": {
+        "type": "object",
+        "properties": {
+            "Task Name": {"type": "string", "minLength": 1},
+            "Description": {"type": "string"},
+            "Start Date": {"type": "string", "format": "date"},
+            "End Date": {"type": "string", "format": "date"},
+            "Duration (days)": {"type": "integer", "minimum": 0}
+        },
+        "required": ["Task Name", "Description", "Start Date", "End Date", "Duration (days)"]
+    }
+}
+
+# Aynı görev birden fazla chunk'ta üretildiğinde: açıklamalar birleştirilir, en erken başlangıç ve
+# en geç bitiş alınır (ISO tarihler metin olarak sıralanabilir); diğer alanlarda ilk değer korunur
+MERGE_TEXT_KEYS = ("Description",)
+MERGE_KEY_RULES = {"Start Date": min, "End Date": max, "Duration (days)": max}
+
 class TestPlanningService:
     def __init__(self):
         self.file_handler = FileHandler()
-        self.model_client = LLMClient()
+        self.model_client = get_llm_client()
         self.text_processor = TextProcessor()
         self.logger = logging.getLogger(__name__)
         self.logger.debug("TestPlanningService initialized")
@@ -28,19 +59,22 @@ class TestPlanningService:
     def normalize_prompt(self, text):
         return ' '.join(text.strip().split()).lower()
 
-    async def run_test_planning(self, files, model_key=None, custom_prompt=None, session_id=None):
-        try:
-            self.logger.debug(f"Starting test planning for {len(files)} files with model: {model_key}")
-            
-            if not files:
-                raise ValueError("No files provided for test planning")
-                
-            file_paths = await self.file_handler.save_files(files)
-            self.logger.debug(f"Files saved: {file_paths}")
-            
-            if not file_paths:
-                raise ValueError("Failed to save uploaded files")
+    async def prepare_test_planning(self, files, model_key=None, custom_prompt=None, session_id=None, use_cache=True):
+        """
+        Dosyaları kaydeder, modeli ve promptu belirler; run ve stream yolları için ortak bağlamı döndürür.
+        """
+        self.logger.debug(f"Starting test planning for {len(files)} files with model: {model_key}")
+
+        if not files:
+            raise ValueError("No files provided for test planning")
 
+        file_paths = await self.file_handler.save_files(files)
+        self.logger.debug(f"Files saved: {file_paths}")
+
+        if not file_paths:
+            raise ValueError("Failed to save uploaded files")
+
+        try:
             # Dosya içeriklerini ayır: requirement ve kod dosyaları
             requirement_doc_content = ""
             code_files_content = ""
@@ -52,19 +86,16 @@ class TestPlanningService:
                 else:
                     code_files_content += f"\n\n### File: {os.path.basename(path)}\n\n{content}"
 
-            model_client = LLMClient()
+            model_client = get_llm_client()
             self.logger.info(f"Model key: {model_key}")
             model_name = None
             if model_key:
                 model_name = model_client.get_model_identifier(model_key)
-                model_client = LLMClient(model_name)
+                model_client = get_llm_client(model_name)
                 self.logger.info(f"Using model: {model_name} for test planning")
             else:
                 self.logger.info("No model specified, using default model")
 
-            # Bugünün tarihini al
-            today = datetime.now().strftime("%Y-%m-%d")
-
             used_prompt = None
             prompt_source = None
             base_prompt = get_base_prompt("test_planning")
@@ -81,31 +112,37 @@ class TestPlanningService:
                     self.logger.info("Using base prompt from database")
                 else:
                     raise ValueError("No prompt found in database for test_planning process. Please add a prompt to the database.")
+            # Bugünün tarihini al
             today = datetime.now().strftime("%Y-%m-%d")
-            planning_prompt = used_prompt.format(
+            # Talimatlar sabit system mesajında, kod ve doküman user mesajında (LLM_PROMPT_LAYOUT)
+            system_prompt, user_template = assemble_prompt(used_prompt, ["code", "requirement_document"], today=today)
+            rendered = user_template.render(
+                model_name=model_client.model_name,
                 code=code_files_content,
                 requirement_document=requirement_doc_content,
                 today=today
             )
+            planning_prompt = rendered.text
 
-            MAX_TOKENS = 4000
-            if len(planning_prompt.split()) > MAX_TOKENS:
-                self.logger.debug(f"Token limit exceeded: {len(planning_prompt.split())} > {MAX_TOKENS}")
-                chunks = self.text_processor.chunk_text(planning_prompt)
-                all_plans = []
-                for i, chunk in enumerate(chunks):
-                    self.logger.debug(f"Processing chunk {i+1}/{len(chunks)}")
-                    plan = await model_client.generate_response(chunk)
-                    if plan:
-                        all_plans.append(plan)
-                final_plan = self._combine_plans(all_plans)
+            # Modelin context window'una göre tek çağrı mı, kaç chunk mı gerektiği ve max_tokens belirlenir
+            system_tokens = self.text_processor.count_tokens(system_prompt, model_client.model_name) if system_prompt else 0
+            # Render sırasında hesaplanan token tahmini kullanılır, prompt yeniden sayılmaz
+            token_count = rendered.tokens + system_tokens
+            plan = plan_prompt(planning_prompt, model_client.model_name, prompt_tokens=token_count)
+            chunked = not plan.fits
+            if chunked:
+                self.logger.debug(f"Token limit exceeded: {token_count} > {plan.input_budget} ({plan.chunks} chunks)")
+                prompts = self.text_processor.chunk_text(
+                    user_template,
+                    {"code": code_files_content, "requirement_document": requirement_doc_content},
+                    plan.input_budget - system_tokens,
+                    model_client.model_name,
+                    today=today
+                )
             else:
-                self.logger.debug(f"Using single plan. Token count: {len(planning_prompt.split())}")
-                final_plan = await model_client.generate_response(planning_prompt)
-            
-            if not final_plan:
-                raise ValueError("Failed to generate test planning")
-                
+                self.logger.debug(f"Using single plan. Token count: {token_count}")
+                prompts = [planning_prompt]
+
             file_names = [os.path.basename(path) for path in file_paths]
             files_header = "Files analyzed:\n" + "\n".join(file_names)
 
@@ -114,42 +151,138 @@ class TestPlanningService:
                 edited_prompt = (self.normalize_prompt(custom_prompt) != self.normalize_prompt(base_prompt))
             elif custom_prompt and not base_prompt:
                 edited_prompt = True
-            
-            session_data = {
-                "session_id": session_id,
-                "output": {
-                    "files": files_header,
-                    "plan": final_plan
-                },
-                "edited_prompt": edited_prompt,
-                "used_prompt": used_prompt,
-                "used_model": model_name
-            }
-            save_session_data(session_data, process_type="test_planning")
-            
-            for path in file_paths:
-                try:
-                    if os.path.exists(path):
-                        os.remove(path)
-                except Exception as e:
-                    self.logger.warning(f"Failed to remove temporary file {path}: {str(e)}")
-            
-            return {
-                "status": "success",
-                "plans": [{
-                    "files": files_header,
-                    "plan": final_plan
-                }],
-                "prompt_info": {
-                    "source": prompt_source
-                },
-                "session_id": session_id or "unknown"
-            }
+        except Exception:
+            self._cleanup_files(file_paths)
+            raise
+
+        return {
+            "file_paths": file_paths,
+            "files_header": files_header,
+            "model_client": model_client,
+            "model_name": model_name,
+            "prompts": prompts,
+            "chunked": chunked,
+            "used_prompt": used_prompt,
+            "prompt_source": prompt_source,
+            "edited_prompt": edited_prompt,
+            "session_id": session_id,
+            "use_cache": use_cache,
+            "max_tokens": plan.max_tokens,
+            "system_prompt": system_prompt
+        }
+
+    async def run_test_planning(self, files, model_key=None, custom_prompt=None, session_id=None, use_cache=True):
+        try:
+            context = await self.prepare_test_planning(files, model_key, custom_prompt, session_id, use_cache)
+            try:
+                # Tüm chunk çağrıları aynı toplam süre bütçesini paylaşır
+                with deadline_scope(LLM_REQUEST_DEADLINE):
+                    model_client = context["model_client"]
+                    if context["chunked"]:
+                        # Chunk'lar model bazlı eşzamanlılık limitiyle paralel işlenir, sıra korunur
+                        chunk_results = await run_chunks(
+                            context["prompts"],
+                            partial(
+                                model_client.generate_structured,
+                                schema=OUTPUT_SCHEMA,
+                                name="test_planning",
+                                max_tokens=context["max_tokens"],
+                                use_cache=context["use_cache"],
+                                system_prompt=context["system_prompt"]
+                            ),
+                            model_name=model_client.model_name
+                        )
+                        all_plans = [plan for plan in chunk_results if plan]
+                        final_plan = await self._combine_plans(all_plans, context)
+                    else:
+                        final_plan = await model_client.generate_structured(
+                            context["prompts"][0],
+                            OUTPUT_SCHEMA,
+                            "test_planning",
+                            max_tokens=context["max_tokens"],
+                            use_cache=context["use_cache"],
+                            system_prompt=context["system_prompt"]
+                        )
+
+                    return self._finalize_test_planning(context, final_plan)
+            finally:
+                self._cleanup_files(context["file_paths"])
 
         except Exception as e:
             self.logger.error(f"Error in run_test_planning: {str(e)}")
             raise
 
+    async def stream_test_planning(self, context):
+        """
+        prepare_test_planning ile hazırlanan bağlamı LLM'e stream eder ve SSE mesajları üretir.
+        """
+        try:
+            yield format_sse({
+                "files": context["files_header"],
+                "chunks": len(context["prompts"]),
+                "session_id": context["session_id"] or "unknown"
+            }, event="start")
+            outputs = []
+            with deadline_scope(LLM_REQUEST_DEADLINE):
+                async for message in stream_prompts(context["model_client"], context["prompts"], outputs,
+                    max_tokens=context["max_tokens"],
+                    use_cache=context["use_cache"],
+                    system_prompt=context["system_prompt"],
+                    response_format=response_format_for(OUTPUT_SCHEMA, "test_planning")
+                ):
+                    yield message
+                # Stream edilen çıktı şemaya uymuyorsa (response_format desteklenmiyorsa) onarılır
+                outputs = [
+                    await context["model_client"].repair_structured(output, OUTPUT_SCHEMA, "test_planning", max_tokens=context["max_tokens"])
+                    for output in outputs
+                ]
+                if context["chunked"]:
+                    final_plan = await self._combine_plans(outputs, context)
+                else:
+                    final_plan = outputs[0] if outputs else None
+            yield format_sse(self._finalize_test_planning(context, final_plan), event="done")
+        except Exception as e:
+            self.logger.error(f"Error in stream_test_planning: {str(e)}")
+            yield format_sse({"detail": str(e)}, event="error")
+        finally:
+            self._cleanup_files(context["file_paths"])
+
+    def _finalize_test_planning(self, context, final_plan):
+        if not final_plan:
+            raise ValueError("Failed to generate test planning")
+
+        session_data = {
+            "session_id": context["session_id"],
+            "output": {
+                "files": context["files_header"],
+                "plan": final_plan
+            },
+            "edited_prompt": context["edited_prompt"],
+            "used_prompt": context["used_prompt"],
+            "used_model": context["model_name"]
+        }
+        save_session_data(session_data, process_type="test_planning")
+
+        return {
+            "status": "success",
+            "plans": [{
+                "files": context["files_header"],
+                "plan": final_plan
+            }],
+            "prompt_info": {
+                "source": context["prompt_source"]
+            },
+            "session_id": context["session_id"] or "unknown"
+        }
+
+    def _cleanup_files(self, file_paths):
+        for path in file_paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                self.logger.warning(f"Failed to remove temporary file {path}: {str(e)}")
+
     def _combine_file_contents(self, file_paths):
         combined_content = ""
         for path in file_paths:
@@ -157,6 +290,18 @@ class TestPlanningService:
             combined_content += f"\n\n### File: {os.path.basename(path)}\n\n{code_content}"
         return combined_content
 
-    def _combine_plans(self, plans):
-        combined = "\n\n".join(plans)
-        return "# Complete Test Planning Summary\n\n" + combined 
\ No newline at end of file
+    async def _combine_plans(self, plans, context):
+        # Chunk planlarındaki JSON dizileri yapısal olarak birleştirilir; aynı "Task Name" tek görevde toplanır
+        # (açıklamalar eklenir, tarih aralığı genişletilir). JSON okunamayan gruplar LLM ile birleştirilir.
+        model_client = context["model_client"]
+        fallback = llm_merge_reducer(model_client, "test plan", context["max_tokens"], context["use_cache"])
+        merged = await tree_reduce(
+            plans,
+            json_merge_reducer(identity_key="Task Name", fallback=fallback, text_keys=MERGE_TEXT_KEYS, key_rules=MERGE_KEY_RULES),
+            model_name=model_client.model_name,
+            max_group_tokens=reduce_group_budget(model_client.model_name, context["max_tokens"])
+        )
+        if not merged:
+            return None
+        # Birleşik plan (özellikle LLM fallback'i) şemaya göre yeniden doğrulanır
+        return await model_client.repair_structured(merged, OUTPUT_SCHEMA, "test_planning", max_tokens=context["max_tokens"])
\ No newline at end of file
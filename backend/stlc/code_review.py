@@ -1,5 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi.responses import StreamingResponse
 from services.review_service import ReviewService
+from utils.sse import SSE_HEADERS
 import logging
 from typing import Optional, List
 
@@ -13,7 +15,8 @@ async def process_code_review(
     types: Optional[List[str]] = Form(None),
     model: Optional[str] = Form(None),
     custom_prompt: Optional[str] = Form(None),
-    session_id: Optional[str] = Form(None)  # session_id parametresi eklendi
+    session_id: Optional[str] = Form(None),  # session_id parametresi eklendi
+    use_cache: bool = Form(True)  # False: önbelleği atla
 ):
     try:
         if not files:
@@ -21,8 +24,37 @@ async def process_code_review(
         
         logger.info(f"Code review requested with model: {model} ve session_id: {session_id}")
         # session_id parametresini de geçiriyoruz
-        results = await review_service.run_code_review(files, types, model, custom_prompt, session_id)
+        results = await review_service.run_code_review(files, types, model, custom_prompt, session_id, use_cache=use_cache)
         return results
     except Exception as e:
         logger.error(f"Code Review Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run/stream")
+async def process_code_review_stream(
+    files: List[UploadFile] = File(...),
+    types: Optional[List[str]] = Form(None),
+    model: Optional[str] = Form(None),
+    custom_prompt: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    use_cache: bool = Form(True)  # False: önbelleği atla
+):
+    """
+    Çıktıyı server-sent events olarak stream eder; sonuç stream sonunda session'a kaydedilir.
+    """
+    try:
+        if not files:
+            raise HTTPException(status_code=400, detail="No files uploaded.")
+        logger.info(f"Code review stream requested with model: {model} ve session_id: {session_id}")
+        # Dosyalar response başlamadan kaydedilir; upload nesneleri stream sırasında kapanmış olabilir
+        context = await review_service.prepare_code_review(files, types, model, custom_prompt, session_id, use_cache=use_cache)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Code Review Stream Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        review_service.stream_code_review(context),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -5,7 +5,9 @@ STLC'nin Environment Setup adımına ait işlemleri yönetir.
 """
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi.responses import StreamingResponse
 from services.environment_setup_service import EnvironmentSetupService
+from utils.sse import SSE_HEADERS
 import logging
 from typing import Optional, List
 
@@ -19,14 +21,44 @@ async def process_environment_setup(
     types: List[str] = Form(...),
     model: Optional[str] = Form(None),
     custom_prompt: Optional[str] = Form(None),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    use_cache: bool = Form(True)  # False: önbelleği atla
 ):
     try:
         if not files:
             raise HTTPException(status_code=400, detail="No files uploaded.")
         logger.info(f"Environment setup requested with model: {model} ve session_id: {session_id}")
-        results = await env_setup_service.run_environment_setup(files, types, model, custom_prompt, session_id)
+        results = await env_setup_service.run_environment_setup(files, types, model, custom_prompt, session_id, use_cache=use_cache)
         return results
     except Exception as e:
         logger.error(f"Environment Setup Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run/stream")
+async def process_environment_setup_stream(
+    files: List[UploadFile] = File(...),
+    types: List[str] = Form(...),
+    model: Optional[str] = Form(None),
+    custom_prompt: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    use_cache: bool = Form(True)  # False: önbelleği atla
+):
+    """
+    Çıktıyı server-sent events olarak stream eder; sonuç stream sonunda session'a kaydedilir.
+    """
+    try:
+        if not files:
+            raise HTTPException(status_code=400, detail="No files uploaded.")
+        logger.info(f"Environment setup stream requested with model: {model} ve session_id: {session_id}")
+        # Dosyalar response başlamadan kaydedilir; upload nesneleri stream sırasında kapanmış olabilir
+        context = await env_setup_service.prepare_environment_setup(files, types, model, custom_prompt, session_id, use_cache=use_cache)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Environment Setup Stream Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        env_setup_service.stream_environment_setup(context),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi.responses import StreamingResponse
 from services.requirement_analysis_service import RequirementAnalysisService
+from utils.sse import SSE_HEADERS
 import logging
 from typing import Optional, List
 
@@ -13,14 +15,44 @@ async def process_requirement_analysis(
     types: Optional[List[str]] = Form(None),
     model: Optional[str] = Form(None),
     custom_prompt: Optional[str] = Form(None),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    use_cache: bool = Form(True)  # False: önbelleği atla
 ):
     try:
         if not files:
             raise HTTPException(status_code=400, detail="No files uploaded.")
         logger.info(f"Requirement analysis requested with model: {model} ve session_id: {session_id}")
-        results = await requirement_analysis_service.run_requirement_analysis(files, types, model, custom_prompt, session_id)
+        results = await requirement_analysis_service.run_requirement_analysis(files, types, model, custom_prompt, session_id, use_cache=use_cache)
         return results
     except Exception as e:
         logger.error(f"Requirement Analysis Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run/stream")
+async def process_requirement_analysis_stream(
+    files: List[UploadFile] = File(...),
+    types: Optional[List[str]] = Form(None),
+    model: Optional[str] = Form(None),
+    custom_prompt: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    use_cache: bool = Form(True)  # False: önbelleği atla
+):
+    """
+    Çıktıyı server-sent events olarak stream eder; sonuç stream sonunda session'a kaydedilir.
+    """
+    try:
+        if not files:
+            raise HTTPException(status_code=400, detail="No files uploaded.")
+        logger.info(f"Requirement analysis stream requested with model: {model} ve session_id: {session_id}")
+        # Dosyalar response başlamadan kaydedilir; upload nesneleri stream sırasında kapanmış olabilir
+        context = await requirement_analysis_service.prepare_requirement_analysis(files, types, model, custom_prompt, session_id, use_cache=use_cache)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Requirement Analysis Stream Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        requirement_analysis_service.stream_requirement_analysis(context),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi.responses import StreamingResponse
 from services.test_planning_service import TestPlanningService
+from utils.sse import SSE_HEADERS
 import logging
 from typing import Optional, List
 
@@ -12,14 +14,43 @@ async def process_test_planning(
     files: List[UploadFile] = File(...),
     model: Optional[str] = Form(None),
     custom_prompt: Optional[str] = Form(None),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    use_cache: bool = Form(True)  # False: önbelleği atla
 ):
     try:
         if not files:
             raise HTTPException(status_code=400, detail="No files uploaded.")
         logger.info(f"Test planning requested with model: {model} ve session_id: {session_id}")
-        results = await test_planning_service.run_test_planning(files, model, custom_prompt, session_id)
+        results = await test_planning_service.run_test_planning(files, model, custom_prompt, session_id, use_cache=use_cache)
         return results
     except Exception as e:
         logger.error(f"Test Planning Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run/stream")
+async def process_test_planning_stream(
+    files: List[UploadFile] = File(...),
+    model: Optional[str] = Form(None),
+    custom_prompt: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    use_cache: bool = Form(True)  # False: önbelleği atla
+):
+    """
+    Çıktıyı server-sent events olarak stream eder; sonuç stream sonunda session'a kaydedilir.
+    """
+    try:
+        if not files:
+            raise HTTPException(status_code=400, detail="No files uploaded.")
+        logger.info(f"Test planning stream requested with model: {model} ve session_id: {session_id}")
+        # Dosyalar response başlamadan kaydedilir; upload nesneleri stream sırasında kapanmış olabilir
+        context = await test_planning_service.prepare_test_planning(files, model, custom_prompt, session_id, use_cache=use_cache)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Test Planning Stream Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        test_planning_service.stream_test_planning(context),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -5,12 +5,39 @@ STLC'nin Test Scenario Generation adımına ait işlemleri yönetir.
 """
 
 import logging
-from utils.model_client import get_llm_instance
+from utils.model_client import get_llm_client
+from utils.json_stream import JSONArrayStream
+from utils.deadline import deadline_scope
+from utils.sse import format_sse
 from core.prompt_manager import get_prompts_for_step
-from utils.validation import validate_output_format
+from utils.validation import compile_schema
+from utils.structured_output import response_format_for
+from config import LLM_REQUEST_DEADLINE, LLM_STREAM_MAX_SCENARIOS
 
 logger = logging.getLogger(__name__)
 
+# Beklenen çıktı şeması; her senaryo `items` şemasına göre geldiği anda doğrulanır
+SCENARIO_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scenarios": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "prerequisites": {"type": "array", "items": {"type": "string"}},
+                    "steps": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["id", "title", "description", "prerequisites", "steps"]
+            }
+        }
+    },
+    "required": ["scenarios"]
+}
+
 async def generate_prompt(input_data):
     try:
         # Form verilerini al
@@ -56,84 +83,167 @@ Output should be in JSON format with the following structure:
         logger.error(f"Prompt generation error: {str(e)}")
         return {"status": "error", "message": str(e)}
 
-async def run_step(input_data):
-    try:
-        # Form verilerini al
-        document_type = input_data.get("document_type", "")
-        test_type = input_data.get("test_type", "")
-        test_category = input_data.get("test_category", "")
-        model_name = input_data.get("model", "")
-        files = input_data.get("files", [])
-        scoring_elements = input_data.get("scoringElements", {})
-        instruction_elements = input_data.get("instructionElements", {})
-
-        if not files:
-            raise ValueError("No files provided")
-            
-        if not all([test_type, test_category, model_name]):
-            raise ValueError("Missing required configuration")
-
-        # Dosya içeriğini oku
-        file_content = ""
-        for file_path in files:
-            with open(file_path, "r") as f:
-                file_content += f.read() + "\n"
-
-        # Prompt oluştur
-        prompt_data = {
-            "test_type": test_type,
+def _max_scenarios(input_data):
+    settings = input_data.get("advancedSettings") or {}
+    value = input_data.get("max_scenarios") or settings.get("maxScenarios") or LLM_STREAM_MAX_SCENARIOS
+    return max(0, int(value or 0))
+
+async def prepare_step(input_data):
+    """
+    Girdileri doğrular, dosyaları okur ve promptu hazırlar.
+
+    :return: stream_scenarios için bağlam (prompt, model client, senaryo limiti, metadata).
+    :raises ValueError: Eksik girdi veya prompt üretim hatasında.
+    """
+    # Form verilerini al
+    document_type = input_data.get("document_type", "")
+    test_type = input_data.get("test_type", "")
+    test_category = input_data.get("test_category", "")
+    model_name = input_data.get("model", "")
+    files = input_data.get("files", [])
+    scoring_elements = input_data.get("scoringElements", {})
+    instruction_elements = input_data.get("instructionElements", {})
+
+    if not files:
+        raise ValueError("No files provided")
+
+    if not all([test_type, test_category, model_name]):
+        raise ValueError("Missing required configuration")
+
+    # Dosya içeriğini oku
+    file_contents = []
+    for file_path in files:
+        with open(file_path, "r") as f:
+            file_contents.append(f.read() + "\n")
+    file_content = "".join(file_contents)
+
+    # Prompt oluştur
+    prompt_data = {
+        "test_type": test_type,
+        "test_category": test_category,
+        "scoringElements": scoring_elements,
+        "instructionElements": instruction_elements
+    }
+    prompt_response = await generate_prompt(prompt_data)
+    if prompt_response.get("status") == "error":
+        raise ValueError(prompt_response["message"])
+    full_prompt = prompt_response["prompt"] + f"\nInput Content:\n{file_content}"
+
+    # Model client süreç genelinde paylaşılır (test sorgusu yapılmaz)
+    model_id = get_llm_client().get_model_identifier(model_name)
+    return {
+        "prompt": full_prompt,
+        "model_client": get_llm_client(model_id, temperature=0.7),
+        "max_scenarios": _max_scenarios(input_data),
+        "metadata": {
             "test_category": test_category,
-            "scoringElements": scoring_elements,
-            "instructionElements": instruction_elements
-        }
-        prompt_response = await generate_prompt(prompt_data)
-        if "error" in prompt_response:
-            raise ValueError(prompt_response["error"])
-        full_prompt = prompt_response["prompt"] + f"\nInput Content:\n{file_content}"
-
-        # LLM modelini al ve çalıştır
-        #burası değiştirilecek
-        llm = get_llm_instance(model_name=model_name, temperature=0.7)
-        response = llm.invoke(full_prompt)
-
-        # Yanıtı doğrula
-        schema = {
-            "type": "object",
-            "properties": {
-                "scenarios": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "title": {"type": "string"},
-                            "description": {"type": "string"},
-                            "prerequisites": {"type": "array", "items": {"type": "string"}},
-                            "steps": {"type": "array", "items": {"type": "string"}}
-                        },
-                        "required": ["id", "title", "description", "prerequisites", "steps"]
-                    }
-                }
-            },
-            "required": ["scenarios"]
+            "test_type": test_type,
+            "model": model_name,
+            "scoring_elements": scoring_elements,
+            "instruction_elements": instruction_elements
         }
+    }
+
+async def stream_scenarios(context):
+    """
+    Çıktıyı stream eder; her senaryo kapandığı anda ayrıştırılıp doğrulanır.
+    Yeterli sayıda geçerli senaryo üretildiğinde, JSON dizisi kapandığında veya çıktı
+    bozulduğunda stream kapatılır (sunucu bağlantısı kesilir, kalan token'lar üretilmez).
+
+    :return: (event, veri) ikilileri veren async generator; event "scenario", "invalid" veya "stopped".
+    """
+    parser = JSONArrayStream("scenarios")
+    validator = compile_schema(SCENARIO_SCHEMA["properties"]["scenarios"]["items"])
+    limit = context["max_scenarios"]
+    valid = 0
+    reason, detail = "completed", None
+    # Destekleyen backend'lerde çıktı şemaya göre kısıtlanır
+    stream = context["model_client"].stream_response(
+        context["prompt"], response_format=response_format_for(SCENARIO_SCHEMA, "test_scenario_generation")
+    )
+    try:
+        async for delta in stream:
+            for scenario in parser.feed(delta):
+                index = parser.items - 1
+                errors = validator.errors(scenario, f"$.scenarios[{index}]")
+                if errors:
+                    yield "invalid", {"index": index, "scenario": scenario, "errors": errors}
+                    continue
+                valid += 1
+                yield "scenario", {"index": index, "scenario": scenario}
+                if limit and valid >= limit:
+                    reason = "max_scenarios"
+                    break
+            if reason == "max_scenarios" or parser.finished:
+                break
+    finally:
+        await stream.aclose()
+
+    if parser.error:
+        reason, detail = "malformed", str(parser.error)
+    elif reason != "max_scenarios" and not parser.finished:
+        reason, detail = "malformed", "Output ended before the scenarios array was closed"
+    elif not parser.found:
+        reason, detail = "malformed", "Output does not contain a scenarios array"
+    yield "stopped", {"reason": reason, "detail": detail, "scenarios": valid, "invalid": parser.items - valid}
 
-        is_valid, validation_msg = validate_output_format(response, schema)
-        if not is_valid:
-            raise ValueError(f"Invalid output format: {validation_msg}")
+async def run_step(input_data):
+    try:
+        context = await prepare_step(input_data)
+        scenarios, stopped = [], {}
+        with deadline_scope(LLM_REQUEST_DEADLINE):
+            async for event, data in stream_scenarios(context):
+                if event == "scenario":
+                    scenarios.append(data["scenario"])
+                elif event == "invalid":
+                    logger.warning(f"Senaryo {data['index']} şemaya uymuyor: {data['errors']}")
+                elif event == "stopped":
+                    stopped = data
+
+        # Hiç geçerli senaryo yoksa çıktı kullanılamaz; kısmi çıktıda geçerli senaryolar döndürülür
+        if not scenarios:
+            raise ValueError(f"Invalid output format: {stopped.get('detail') or 'no valid scenarios'}")
 
         return {
             "step": "testScenarioGeneration",
-            "result": response,
+            "result": {"scenarios": scenarios},
+            "scenarios": scenarios,
             "metadata": {
-                "test_category": test_category,
-                "test_type": test_type,
-                "model": model_name,
-                "scoring_elements": scoring_elements,
-                "instruction_elements": instruction_elements
+                **context["metadata"],
+                "stop_reason": stopped.get("reason"),
+                "invalid_scenarios": stopped.get("invalid", 0)
             }
         }
 
     except Exception as e:
         logger.error(f"Test senaryo üretimi hatası: {str(e)}")
         return {"step": "testScenarioGeneration", "error": str(e)}
+
+async def stream_step(context):
+    """
+    prepare_step ile hazırlanan bağlamı stream eder; her senaryo ayrı bir SSE `scenario` mesajıdır.
+    """
+    try:
+        yield format_sse({"max_scenarios": context["max_scenarios"]}, event="start")
+        scenarios = []
+        with deadline_scope(LLM_REQUEST_DEADLINE):
+            async for event, data in stream_scenarios(context):
+                if event == "scenario":
+                    scenarios.append(data["scenario"])
+                if event == "stopped":
+                    if not scenarios:
+                        raise ValueError(f"Invalid output format: {data['detail'] or 'no valid scenarios'}")
+                    yield format_sse({
+                        "step": "testScenarioGeneration",
+                        "scenarios": scenarios,
+                        "metadata": {
+                            **context["metadata"],
+                            "stop_reason": data["reason"],
+                            "invalid_scenarios": data["invalid"]
+                        }
+                    }, event="done")
+                else:
+                    yield format_sse(data, event=event)
+    except Exception as e:
+        logger.error(f"Test senaryo stream hatası: {str(e)}")
+        yield format_sse({"detail": str(e)}, event="error")
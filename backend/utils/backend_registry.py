@@ -0,0 +1,190 @@
+"""
+backend_registry.py
+-------------------
+Birden fazla inference sunucusunu yöneten backend kaydı.
+Her model bir veya daha fazla endpoint'e eşlenir; her çağrı, sağlıklı endpoint'ler
+arasından en az devam eden isteğe (in-flight) sahip olana, eşitlikte gecikme EWMA'sı
+en düşük olana yönlendirilir.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+import httpx
+from config import LLM_BACKENDS, LLM_BACKEND_EWMA_ALPHA, LLM_BACKEND_RETRY_AFTER
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.deadline import DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+
+class NoBackendAvailableError(ConnectionError):
+    """Model için kullanılabilir bir backend bulunamadığında fırlatılır."""
+
+
+def is_backend_failure(error):
+    """
+    Hatanın backend kaynaklı olup olmadığını belirler; yalnızca bunlar circuit breaker'ı etkiler.
+    İstemci hataları (4xx) ve istek deadline'ının dolması backend'e yazılmaz.
+    """
+    if isinstance(error, DeadlineExceededError):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class Backend:
+    def __init__(self, url, ewma_alpha=LLM_BACKEND_EWMA_ALPHA):
+        self.url = url.rstrip("/")
+        self.ewma_alpha = ewma_alpha
+        self.in_flight = 0
+        self.ewma_latency = None
+        self.requests = 0
+        self.failures = 0
+        self.unhealthy_until = 0.0
+        self.last_error = None
+        self.available_models = None
+        self.last_probe = None
+        self.circuit = CircuitBreaker(self.url)
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.unhealthy_until and self.circuit.can_attempt()
+
+    def mark_unhealthy(self, reason, retry_after=LLM_BACKEND_RETRY_AFTER):
+        self.unhealthy_until = time.monotonic() + retry_after
+        self.last_error = reason
+        logger.warning(f"Backend sağlıksız olarak işaretlendi ({retry_after}s): {self.url} - {reason}")
+
+    def mark_healthy(self):
+        self.unhealthy_until = 0.0
+
+    def record_success(self, latency):
+        self.requests += 1
+        self.circuit.record_success()
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = self.ewma_alpha * latency + (1 - self.ewma_alpha) * self.ewma_latency
+
+    def record_failure(self, error):
+        self.requests += 1
+        self.failures += 1
+        self.last_error = str(error)
+        if is_backend_failure(error):
+            self.circuit.record_failure()
+        elif isinstance(error, httpx.HTTPStatusError):
+            # Backend yanıt verdi (4xx); sağlık açısından başarı sayılır
+            self.circuit.record_success()
+        else:
+            self.circuit.release_attempt()
+
+    def load_key(self):
+        # Önce devam eden istek sayısı, sonra gözlenen gecikme; hiç ölçülmemiş backend öne alınır
+        return (self.in_flight, self.ewma_latency or 0.0)
+
+    def snapshot(self):
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "ewma_latency_s": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "available_models": self.available_models,
+            "last_probe": self.last_probe,
+            "circuit": self.circuit.snapshot()
+        }
+
+
+class BackendRegistry:
+    def __init__(self, mapping=None):
+        mapping = mapping or LLM_BACKENDS
+        self._backends = {}
+        self._routes = {}
+        for model, urls in mapping.items():
+            if isinstance(urls, str):
+                urls = [urls]
+            # Aynı URL birden fazla modele hizmet veriyorsa tek Backend nesnesi paylaşılır
+            self._routes[model] = [self._get_or_create(url) for url in urls]
+        if "*" not in self._routes:
+            raise ValueError("LLM_BACKENDS içinde varsayılan ('*') backend tanımlı olmalı.")
+
+    def _get_or_create(self, url):
+        key = url.rstrip("/")
+        if key not in self._backends:
+            self._backends[key] = Backend(key)
+        return self._backends[key]
+
+    def backends_for(self, model_name):
+        return self._routes.get(model_name) or self._routes["*"]
+
+    def all_backends(self):
+        return list(self._backends.values())
+
+    def pick(self, model_name, exclude=()):
+        """
+        Model için en az yüklü sağlıklı backend'i seçer.
+
+        :param exclude: Seçimde atlanacak backend URL'leri.
+        :raises NoBackendAvailableError: Hiç aday yoksa.
+        :raises CircuitOpenError: Tüm adayların devresi açıksa (istek hızlıca reddedilir).
+        """
+        candidates = [b for b in self.backends_for(model_name) if b.url not in exclude]
+        if not candidates:
+            raise NoBackendAvailableError(f"{model_name} için kullanılabilir backend yok.")
+        allowed = [b for b in candidates if b.circuit.can_attempt()]
+        if not allowed:
+            raise CircuitOpenError(f"{model_name} için tüm backend devreleri açık: {[b.url for b in candidates]}")
+        healthy = [b for b in allowed if b.healthy]
+        # Sağlık kontrolü hepsini sağlıksız gösteriyorsa isteği yine de en az yüklüye gönder
+        backend = min(healthy or allowed, key=lambda b: b.load_key())
+        backend.circuit.on_attempt()
+        return backend
+
+    @asynccontextmanager
+    async def acquire(self, model_name, exclude=()):
+        """
+        Bir backend seçer, çağrı süresince in-flight sayacını artırır ve gecikmeyi kaydeder.
+        """
+        backend = self.pick(model_name, exclude)
+        backend.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield backend
+        except Exception as e:
+            backend.record_failure(e)
+            raise
+        except BaseException:
+            # İptal edilen istek (CancelledError, GeneratorExit) sonuç bildirmez
+            backend.circuit.release_attempt()
+            raise
+        else:
+            backend.record_success(time.monotonic() - started)
+        finally:
+            backend.in_flight -= 1
+
+    def snapshot(self):
+        return {
+            "backends": [b.snapshot() for b in self._backends.values()],
+            "routes": {model: [b.url for b in backends] for model, backends in self._routes.items()}
+        }
+
+    def circuits(self):
+        return {b.url: b.circuit.snapshot() for b in self._backends.values()}
+
+
+_registry = None
+
+
+def get_backend_registry():
+    """
+    Süreç genelinde paylaşılan BackendRegistry örneğini döndürür.
+    """
+    global _registry
+    if _registry is None:
+        _registry = BackendRegistry()
+    return _registry
@@ -0,0 +1,100 @@
+"""
+chunk_executor.py
+-----------------
+Token limitini aşan promptlardan üretilen chunk'ları LLM'e eşzamanlı olarak gönderir.
+Her model için ayrı bir semaphore ile eşzamanlılık sınırlandırılır, sonuçlar giriş
+sırasıyla döndürülür ve tek bir chunk'ın hatası tüm çalıştırmayı durdurmaz.
+"""
+
+import asyncio
+import logging
+from config import (
+    LLM_CHUNK_CONCURRENCY,
+    LLM_MODEL_CONCURRENCY,
+    LLM_CHUNK_ERROR_POLICY,
+    LLM_CHUNK_MAX_RETRIES,
+)
+from utils.deadline import DeadlineExceededError, remaining_time
+
+logger = logging.getLogger(__name__)
+
+ERROR_POLICIES = ("retry", "skip", "fail")
+
+# Model adı -> asyncio.Semaphore; aynı modele giden tüm çalıştırmalar aynı limiti paylaşır.
+_model_semaphores = {}
+
+
+def get_model_semaphore(model_name, limit=None):
+    """
+    Belirtilen model için paylaşılan semaphore'u döndürür, yoksa oluşturur.
+
+    :param model_name: Model identifier (ör: qwen2.5-7b-instruct-1m).
+    :param limit: Semaphore ilk kez oluşturulurken kullanılacak limit; None ise config değeri.
+    :return: asyncio.Semaphore nesnesi.
+    """
+    key = model_name or "default"
+    semaphore = _model_semaphores.get(key)
+    if semaphore is None:
+        if limit is None:
+            limit = LLM_MODEL_CONCURRENCY.get(key, LLM_CHUNK_CONCURRENCY)
+        semaphore = asyncio.Semaphore(max(1, int(limit)))
+        _model_semaphores[key] = semaphore
+        logger.info(f"{key} modeli için chunk eşzamanlılık limiti: {limit}")
+    return semaphore
+
+
+async def run_chunks(chunks, worker, model_name=None, on_error=None, max_retries=None, retry_backoff=1.0):
+    """
+    Chunk'ları eşzamanlı olarak işler ve sonuçları giriş sırasıyla döndürür.
+
+    :param chunks: İşlenecek chunk listesi.
+    :param worker: Tek bir chunk alıp sonucu döndüren async fonksiyon.
+    :param model_name: Eşzamanlılık limitinin uygulanacağı model.
+    :param on_error: "retry" (tekrar dene, olmazsa atla), "skip" (atla) veya "fail" (hatayı yükselt).
+    :param max_retries: "retry" politikasında chunk başına ek deneme sayısı.
+    :param retry_backoff: Denemeler arası bekleme süresinin tabanı (saniye, üstel artar).
+    :return: Chunk sırasıyla sonuç listesi; başarısız chunk'lar için None.
+    :raises ValueError: Geçersiz hata politikası verilirse.
+    """
+    policy = on_error or LLM_CHUNK_ERROR_POLICY
+    if policy not in ERROR_POLICIES:
+        raise ValueError(f"Geçersiz chunk hata politikası: {policy}")
+    retries = (LLM_CHUNK_MAX_RETRIES if max_retries is None else max_retries) if policy == "retry" else 0
+    semaphore = get_model_semaphore(model_name)
+    total = len(chunks)
+
+    async def process(index, chunk):
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    logger.debug(f"Processing chunk {index + 1}/{total} (attempt {attempt + 1})")
+                    return await worker(chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if policy == "fail":
+                    raise
+                delay = retry_backoff * (2 ** attempt)
+                left = remaining_time()
+                # Ortak deadline dolduysa veya beklemeye yetmiyorsa tekrar denenmez
+                out_of_time = isinstance(e, DeadlineExceededError) or (left is not None and left <= delay)
+                if attempt >= retries or out_of_time:
+                    logger.warning(f"Chunk {index + 1}/{total} atlandı: {str(e)}")
+                    return None
+                attempt += 1
+                logger.warning(f"Chunk {index + 1}/{total} hata verdi, tekrar denenecek ({attempt}/{retries}): {str(e)}")
+                await asyncio.sleep(delay)
+
+    tasks = [asyncio.ensure_future(process(i, chunk)) for i, chunk in enumerate(chunks)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    failed = sum(1 for r in results if r is None)
+    if failed:
+        logger.warning(f"{failed}/{total} chunk sonuç üretmedi.")
+    return list(results)
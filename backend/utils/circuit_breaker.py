@@ -0,0 +1,102 @@
+"""
+circuit_breaker.py
+------------------
+Backend bazlı circuit breaker.
+Art arda belirli sayıda hata alan backend "open" durumuna geçer ve istekler beklemeden
+reddedilir. reset_timeout sonunda "half_open" durumunda sınırlı sayıda deneme isteğine
+izin verilir; deneme başarılıysa devre kapanır, başarısızsa tekrar açılır.
+"""
+
+import logging
+import time
+from config import (
+    LLM_CIRCUIT_FAILURE_THRESHOLD,
+    LLM_CIRCUIT_RESET_TIMEOUT,
+    LLM_CIRCUIT_HALF_OPEN_MAX_CALLS,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Tüm adaylar için devre açıkken fırlatılır; istek backend'e gönderilmez."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=LLM_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=LLM_CIRCUIT_RESET_TIMEOUT, half_open_max_calls=LLM_CIRCUIT_HALF_OPEN_MAX_CALLS):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"Circuit half-open: {self.name}")
+        return self._state
+
+    def can_attempt(self):
+        """
+        Yeni bir isteğe izin verilip verilmeyeceğini döndürür (durumu değiştirmez).
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            return self._half_open_calls < self.half_open_max_calls
+        return False
+
+    def on_attempt(self):
+        if self.state == HALF_OPEN:
+            self._half_open_calls += 1
+
+    def release_attempt(self):
+        """
+        Sonucu bilinmeyen (iptal edilen) bir denemenin half-open hakkını geri verir.
+        """
+        if self._state == HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self):
+        if self._state != CLOSED:
+            logger.info(f"Circuit closed: {self.name}")
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._half_open_calls = 0
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        if self.state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._trip()
+
+    def _trip(self):
+        if self._state != OPEN:
+            self.times_opened += 1
+            logger.warning(f"Circuit open: {self.name} ({self._consecutive_failures} ardışık hata)")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_calls = 0
+
+    def snapshot(self):
+        state = self.state
+        retry_in = None
+        if state == OPEN:
+            retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+        return {
+            "state": state,
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_in_s": retry_in
+        }
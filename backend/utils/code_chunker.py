@@ -0,0 +1,367 @@
+"""
+code_chunker.py
+---------------
+Sözdizimine duyarlı kod bölücü.
+Kaynak dosya üst seviye tanımlara (fonksiyon, sınıf, üst seviye ifade) ayrılır: Python için
+`ast` düğümlerinin satır aralıkları, JS/TS/Java/C# gibi diller için string ve yorumları
+atlayan bir süslü parantez tarayıcısı kullanılır. Bütçeye sığmayan sınıflar üyelerine
+bölünür. Tanımlar bölünmeden token bütçeli parçalara (bin) yerleştirilir ve her parçaya
+yalnızca ihtiyaç duyduğu import'lar, üst sınıf imzası ve başka parçada kalan tanımların
+imzaları eklenir.
+"""
+
+import ast
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+PYTHON_EXTENSIONS = {".py", ".pyw"}
+BRACE_EXTENSIONS = {
+    ".js", ".jsx", ".mjs", ".ts", ".tsx", ".java", ".cs", ".c", ".h", ".cpp", ".hpp",
+    ".cc", ".go", ".kt", ".swift", ".php", ".rs", ".scala", ".dart",
+}
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_$][\w$]*")
+# Süslü parantez tarayıcısının tokenları: yorumlar ve string'ler tek eşleşmede atlanır
+_BRACE_TOKEN_RE = re.compile(
+    r"//[^\n]*|/\*.*?(?:\*/|\Z)|\"(?:\\.|[^\"\\\n])*\"?|'(?:\\.|[^'\\\n])*'?|`(?:\\.|[^`\\])*`?|[{}()\[\];\n]",
+    re.S,
+)
+_BRACE_IMPORT_RE = re.compile(r"^\s*(import\b|using\b|package\b|#include\b|#import\b|export\s+\*\s+from\b|(const|let|var)\s+.*=\s*require\()")
+_BRACE_IMPORT_KEYWORDS = {"import", "from", "as", "static", "type", "const", "let", "var", "require", "export", "default"}
+# Signatures kısmı bir parçanın bütçesinin en fazla bu oranını kullanır
+SIGNATURE_BUDGET_RATIO = 0.2
+
+
+class CodeUnit:
+    def __init__(self, text, kind, name=None, signature=None, context=None, names=()):
+        self.text = text
+        # "import", "definition" veya "statement"
+        self.kind = kind
+        self.name = name
+        # Tanımın gövdesiz başlığı (ör: "def f(a, b):"); başka parçalara referans olarak eklenir
+        self.signature = signature
+        # Üye ise bağlı olduğu sınıfın imzası
+        self.context = context
+        # import birimi için bağladığı isimler; boşsa import her parçaya eklenir
+        self.names = set(names)
+        self.tokens = 0
+        self.identifiers = set()
+
+
+def language_for(filename):
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in PYTHON_EXTENSIONS:
+        return "python"
+    if ext in BRACE_EXTENSIONS:
+        return "brace"
+    return None
+
+
+def _python_signature(node, lines):
+    body_start = node.body[0].lineno - 1 if node.body else node.lineno
+    header = lines[node.lineno - 1:max(body_start, node.lineno)]
+    signature = " ".join(line.strip() for line in header)
+    if not signature.rstrip().endswith(":"):
+        signature = signature.split(":", 1)[0] + ":"
+    return signature
+
+
+def _python_node_units(nodes, lines, first_line, last_line, context=None):
+    units = []
+    previous_end = first_line
+    for node in nodes:
+        # Önceki düğümle arasındaki yorum, decorator ve boş satırlar bu düğüme eklenir
+        text = "".join(lines[previous_end:node.end_lineno])
+        span = (previous_end, node.end_lineno)
+        previous_end = node.end_lineno
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = [(alias.asname or alias.name).split(".")[0] for alias in node.names if alias.name != "*"]
+            units.append(CodeUnit(text, "import", names=names))
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            unit = CodeUnit(text, "definition", node.name, _python_signature(node, lines), context)
+            unit.node = node
+        else:
+            unit = CodeUnit(text, "statement", context=context)
+        unit.span = span
+        units.append(unit)
+    if units and previous_end < last_line:
+        units[-1].text += "".join(lines[previous_end:last_line])
+    return units
+
+
+def _python_units(source):
+    tree = ast.parse(source)
+    lines = source.splitlines(keepends=True)
+    return _python_node_units(tree.body, lines, 0, len(lines)), lines
+
+
+def _split_python_class(unit, lines):
+    node = unit.node
+    if not isinstance(node, ast.ClassDef) or len(node.body) < 2:
+        return None
+    first = node.body[0]
+    header_end = min([first.lineno] + [d.lineno for d in getattr(first, "decorator_list", [])]) - 1
+    members = _python_node_units(node.body, lines, header_end, node.end_lineno, context=unit.signature)
+    # Sınıf başlığı ilk üyeyle aynı parçada kalır
+    members[0].text = "".join(lines[unit.span[0]:header_end]) + members[0].text
+    return members
+
+
+def _scan_brace_boundaries(source, start, end, target_depth):
+    """
+    [start, end) aralığında, derinlik target_depth'e döndüğü noktalardan sonraki satır sonlarını döndürür.
+    String, karakter ve yorum içerikleri atlanır; yalnızca yapısal karakterler taranır.
+    """
+    boundaries = []
+    depth = target_depth
+    pending = False
+    for match in _BRACE_TOKEN_RE.finditer(source, start, end):
+        token = match.group()
+        if token in "{([":
+            depth += 1
+        elif token in "})]":
+            depth -= 1
+            if depth == target_depth and token == "}":
+                pending = True
+        elif token == ";":
+            if depth == target_depth:
+                pending = True
+        elif token == "\n":
+            if pending and depth == target_depth:
+                boundaries.append(match.end())
+                pending = False
+    return boundaries
+
+
+def _brace_signature(text):
+    head = text.split("{", 1)[0] if "{" in text else text
+    lines = [line.strip() for line in head.splitlines() if line.strip() and not line.strip().startswith(("//", "*", "/*", "@"))]
+    return " ".join(lines)[:200] if lines else None
+
+
+def _brace_definition_name(signature):
+    match = re.search(r"\b(class|interface|struct|enum|record|trait|namespace)\s+([A-Za-z_$][\w$]*)", signature)
+    if match:
+        return match.group(2)
+    names = _IDENTIFIER_RE.findall(signature.split("(", 1)[0])
+    return names[-1] if names else None
+
+
+def _brace_import_names(text):
+    if re.match(r"\s*(using|package|#include|#import)\b", text) or "*" in text:
+        return []
+    text = re.sub(r"([\"'`]).*?\1", "", text)
+    names = [name for name in _IDENTIFIER_RE.findall(text) if name not in _BRACE_IMPORT_KEYWORDS]
+    if text.lstrip().startswith("import") and "{" not in text and " from" not in text:
+        # Java: import a.b.C; -> C
+        return names[-1:]
+    return names
+
+
+def _brace_units(source, start=0, end=None, target_depth=0, context=None):
+    end = len(source) if end is None else end
+    cuts = [start] + [b for b in _scan_brace_boundaries(source, start, end, target_depth) if start < b < end] + [end]
+    units = []
+    for a, b in zip(cuts, cuts[1:]):
+        text = source[a:b]
+        if not text.strip():
+            if units:
+                units[-1].text += text
+            continue
+        if _BRACE_IMPORT_RE.match(text.lstrip("\n")):
+            units.append(CodeUnit(text, "import", names=_brace_import_names(text)))
+            continue
+        signature = _brace_signature(text) if "{" in text else None
+        name = _brace_definition_name(signature) if signature else None
+        unit = CodeUnit(text, "definition" if signature else "statement", name, signature, context)
+        unit.span = (a, b)
+        units.append(unit)
+    return units
+
+
+def _split_brace_class(unit, source):
+    a, b = unit.span
+    open_index = source.find("{", a, b)
+    close_index = source.rfind("}", a, b)
+    if open_index == -1 or close_index <= open_index:
+        return None
+    body_start = source.find("\n", open_index, close_index)
+    if body_start == -1:
+        return None
+    members = _brace_units(source, body_start + 1, close_index, target_depth=1, context=unit.signature)
+    if len(members) < 2:
+        return None
+    members[0].text = source[a:body_start + 1] + members[0].text
+    members[-1].text += source[close_index:b]
+    return members
+
+
+def _split_lines(unit, budget, count):
+    """
+    Tek bir tanım bile bütçeyi aşıyorsa satır gruplarına bölünür (son çare).
+    """
+    pieces, current, current_tokens = [], [], 0
+    for line in unit.text.splitlines(keepends=True):
+        tokens = count(line)
+        if current and current_tokens + tokens > budget:
+            pieces.append(CodeUnit("".join(current), "statement", context=unit.context))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        pieces.append(CodeUnit("".join(current), "statement", context=unit.context))
+    return pieces
+
+
+def _expand(units, budget, count, split_class):
+    """
+    Bütçeyi aşan sınıfları üyelerine, üyeleri de gerekirse satırlara böler.
+    """
+    result = []
+    for unit in units:
+        unit.tokens = count(unit.text)
+        if unit.tokens <= budget or unit.kind == "import":
+            result.append(unit)
+            continue
+        members = split_class(unit) if unit.kind == "definition" else None
+        if members:
+            result.extend(_expand(members, budget, count, split_class))
+        else:
+            for piece in _split_lines(unit, budget, count):
+                piece.tokens = count(piece.text)
+                result.append(piece)
+    return result
+
+
+def chunk_code(filename, source, budget, count):
+    """
+    Kaynak dosyayı tanım sınırlarından, token bütçeli parçalara böler.
+
+    :param filename: Dosya adı (dil uzantıdan belirlenir).
+    :param source: Dosya içeriği.
+    :param budget: Parça başına token bütçesi (eklenen import ve imzalar dahil).
+    :param count: Metnin token sayısını döndüren fonksiyon.
+    :return: (parça metni, tahmini token sayısı) listesi; dil desteklenmiyor veya dosya ayrıştırılamıyorsa None.
+    """
+    language = language_for(filename)
+    if language is None:
+        return None
+    try:
+        if language == "python":
+            units, lines = _python_units(source)
+            split_class = lambda unit: _split_python_class(unit, lines) if hasattr(unit, "node") else None
+            comment, stub = "#", " ..."
+        else:
+            units = _brace_units(source)
+            split_class = lambda unit: _split_brace_class(unit, source) if hasattr(unit, "span") else None
+            comment, stub = "//", " { ... }"
+    except (SyntaxError, ValueError, RecursionError) as e:
+        logger.info(f"{filename} ayrıştırılamadı, satır bazlı bölmeye geçiliyor: {str(e)}")
+        return None
+    if not units:
+        return None
+
+    imports = [unit for unit in units if unit.kind == "import"]
+    for unit in imports:
+        unit.tokens = count(unit.text.rstrip("\n") + "\n")
+    # Tek bir birim, eklenecek import/imza satırlarıyla birlikte bütçeye sığacak şekilde bölünür
+    reserved = sum(unit.tokens for unit in imports) + int(budget * SIGNATURE_BUDGET_RATIO)
+    body = _expand(
+        [unit for unit in units if unit.kind != "import"], max(budget // 2, budget - reserved), count, split_class
+    )
+    if any(unit.tokens > budget for unit in body):
+        # Tek satırı bile bütçeyi aşan (ör: minify edilmiş) dosyalar karakter bazlı bölmeye bırakılır
+        return None
+    signature_lines = {
+        unit.name: f"{comment} {unit.signature}{stub}\n"
+        for unit in body if unit.kind == "definition" and unit.name and unit.signature
+    }
+    signature_tokens = {name: count(line) for name, line in signature_lines.items()}
+    signature_header = f"{comment} Referenced definitions (signatures only):\n"
+    signature_header_tokens = count(signature_header)
+    context_lines = {}
+    always_imports = {index for index, unit in enumerate(imports) if not unit.names}
+    import_index = {}
+    for index, unit in enumerate(imports):
+        for name in unit.names:
+            import_index.setdefault(name, set()).add(index)
+    for unit in body:
+        identifiers = set(_IDENTIFIER_RE.findall(unit.text))
+        # Birim başına gereken import'lar ve imzası eklenecek tanımlar bir kez hesaplanır
+        unit.imports = set(always_imports)
+        for name in identifiers & import_index.keys():
+            unit.imports |= import_index[name]
+        unit.references = (identifiers & signature_lines.keys()) - {unit.name}
+        if unit.context and unit.context not in context_lines:
+            line = f"{comment} Member of: {unit.context}\n"
+            context_lines[unit.context] = (line, count(line))
+
+    class Bin:
+        def __init__(self):
+            self.members = []
+            self.tokens = 0
+            self.imports = set()
+            self.references = set()
+            self.defined = set()
+            self.contexts = {}
+
+        def kept_references(self, references, defined):
+            limit = int(budget * SIGNATURE_BUDGET_RATIO) - signature_header_tokens
+            kept = []
+            for name in sorted(references - defined):
+                if signature_tokens[name] <= limit:
+                    limit -= signature_tokens[name]
+                    kept.append(name)
+            return kept
+
+        def total_with(self, unit=None):
+            """Birim eklenirse parçanın (import, imza ve bağlam satırları dahil) token sayısı."""
+            imports, references, defined = self.imports, self.references, self.defined
+            contexts = set(self.contexts)
+            tokens = self.tokens
+            if unit is not None:
+                imports, references, defined = imports | unit.imports, references | unit.references, defined | {unit.name}
+                if unit.context:
+                    contexts.add(unit.context)
+                tokens += unit.tokens
+            kept = self.kept_references(references, defined)
+            total = tokens + sum(imports_tokens[i] for i in imports)
+            total += sum(context_lines[c][1] for c in contexts)
+            if kept:
+                total += signature_header_tokens + sum(signature_tokens[name] for name in kept)
+            return total + 1
+
+        def add(self, unit):
+            self.members.append(unit)
+            self.tokens += unit.tokens
+            self.imports |= unit.imports
+            self.references |= unit.references
+            self.defined.add(unit.name)
+            if unit.context:
+                self.contexts[unit.context] = True
+
+        def render(self):
+            parts = [imports[i].text.rstrip("\n") + "\n" for i in sorted(self.imports)]
+            kept = self.kept_references(self.references, self.defined)
+            if kept:
+                parts.append(signature_header)
+                parts.extend(signature_lines[name] for name in kept)
+            parts.extend(context_lines[c][0] for c in self.contexts)
+            if parts:
+                parts.append("\n")
+            parts.extend(unit.text for unit in self.members)
+            return "".join(parts)
+
+    imports_tokens = [unit.tokens for unit in imports]
+    bins = [Bin()]
+    for unit in body:
+        if bins[-1].members and bins[-1].total_with(unit) > budget:
+            bins.append(Bin())
+        bins[-1].add(unit)
+    pieces = [(current.render(), current.total_with()) for current in bins if current.members]
+    logger.debug(f"{filename}: {len(body)} birim {len(pieces)} parçaya yerleştirildi.")
+    return pieces
@@ -0,0 +1,59 @@
+"""
+deadline.py
+-----------
+İstek bazlı toplam süre bütçesi (deadline).
+Bir çalıştırmanın tüm chunk'ları aynı deadline'ı paylaşır; deadline contextvar üzerinde
+tutulduğu için asyncio.gather ile oluşturulan task'lara da aktarılır.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_deadline = ContextVar("llm_request_deadline", default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """İstek için ayrılan toplam süre dolduğunda fırlatılır."""
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """
+    Blok içindeki tüm LLM çağrıları için ortak bir deadline belirler.
+    İç içe kullanımda daha erken olan deadline geçerli kalır.
+
+    :param seconds: Toplam süre bütçesi; None veya <= 0 ise deadline uygulanmaz.
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        new_deadline = min(current, new_deadline)
+    token = _deadline.set(new_deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """
+    :return: Deadline'a kalan süre (saniye); deadline yoksa None.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline():
+    """
+    :raises DeadlineExceededError: Deadline dolmuşsa.
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError("LLM istek süresi (deadline) doldu.")
+    return remaining
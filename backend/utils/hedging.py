@@ -0,0 +1,114 @@
+"""
+hedging.py
+----------
+Hedged request politikası.
+Bir model birden fazla replikadan servis ediliyorsa, belirli bir gecikmeden (sabit veya
+gözlenen p90) sonra hâlâ tamamlanmamış isteğin bir kopyası başka replikaya gönderilir;
+önce biten yanıt kullanılır. Hedge sayısı bir token bucket ile istek sayısının belirli
+bir oranıyla sınırlandırılır, böylece hedge'ler filoyu aşırı yükleyemez.
+"""
+
+import logging
+import math
+from collections import deque
+from config import (
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_DELAY,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_MAX_RATIO,
+    LLM_HEDGE_BURST,
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+
+
+class HedgePolicy:
+    def __init__(self, enabled=LLM_HEDGE_ENABLED, fixed_delay=LLM_HEDGE_DELAY, percentile=LLM_HEDGE_PERCENTILE,
+                 min_samples=LLM_HEDGE_MIN_SAMPLES, max_ratio=LLM_HEDGE_MAX_RATIO, burst=LLM_HEDGE_BURST):
+        self.enabled = enabled
+        self.fixed_delay = fixed_delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self.burst = burst
+        self._tokens = burst
+        self._latencies = {}
+        self.requests = 0
+        self.hedges_issued = 0
+        self.hedges_suppressed = 0
+        self.hedge_wins = 0
+
+    def record_latency(self, model_name, latency):
+        window = self._latencies.get(model_name)
+        if window is None:
+            window = self._latencies[model_name] = deque(maxlen=LATENCY_WINDOW)
+        window.append(latency)
+
+    def observed_percentile(self, model_name):
+        window = self._latencies.get(model_name)
+        if not window or len(window) < self.min_samples:
+            return None
+        ordered = sorted(window)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.percentile * len(ordered)) - 1))
+        return ordered[index]
+
+    def hedge_delay(self, model_name, replicas):
+        """
+        İstek için hedge gecikmesini döndürür; hedge yapılmayacaksa None.
+
+        :param replicas: Modeli servis eden backend sayısı.
+        """
+        self.requests += 1
+        # Her istek bütçeye max_ratio kadar hedge hakkı ekler
+        self._tokens = min(self.burst, self._tokens + self.max_ratio)
+        if not self.enabled or replicas < 2:
+            return None
+        if self.fixed_delay > 0:
+            return self.fixed_delay
+        return self.observed_percentile(model_name)
+
+    def try_acquire(self):
+        """
+        Hedge bütçesinden bir hak düşer; bütçe yoksa False döner.
+        """
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.hedges_issued += 1
+            return True
+        self.hedges_suppressed += 1
+        return False
+
+    def record_win(self):
+        self.hedge_wins += 1
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedges_issued": self.hedges_issued,
+            "hedges_suppressed": self.hedges_suppressed,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedges_issued / self.requests, 4) if self.requests else 0.0,
+            "budget_tokens": round(self._tokens, 2),
+            "observed_delay_s": {
+                model: round(delay, 3)
+                for model in list(self._latencies)
+                if (delay := self.observed_percentile(model)) is not None
+            }
+        }
+
+
+_hedge_policy = None
+
+
+def get_hedge_policy():
+    """
+    Süreç genelinde paylaşılan HedgePolicy örneğini döndürür.
+    """
+    global _hedge_policy
+    if _hedge_policy is None:
+        _hedge_policy = HedgePolicy()
+    return _hedge_policy
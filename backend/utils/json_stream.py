@@ -0,0 +1,175 @@
+"""
+json_stream.py
+--------------
+Stream edilen LLM çıktısı için artımlı JSON ayrıştırıcı.
+Çıktı parça parça beslenir; hedef dizinin (ör: {"scenarios": [...]}) her elemanı kapandığı
+anda JSON olarak çözülüp döndürülür. Böylece tamamlanmış elemanlar üretim sürerken
+doğrulanıp kullanıcıya iletilebilir, yapı bozulduğunda üretim erken durdurulabilir.
+Bellekte yalnızca henüz tamamlanmamış eleman (ve taranmamış kısım) tutulur; işlenen önek her
+parçada atılır, böylece uzun çıktılarda her parça tüm metni yeniden kopyalamaz.
+"""
+
+import json
+import re
+from config import LLM_STREAM_MAX_PREAMBLE
+
+# String içindeyken yalnızca kapanış tırnağı ve kaçış karakteri önemlidir
+_STRING_SPECIAL_RE = re.compile(r'["\\]')
+_WHITESPACE = " \t\r\n"
+
+
+class MalformedJSONError(ValueError):
+    pass
+
+
+class JSONArrayStream:
+    def __init__(self, array_key="scenarios", max_preamble=None):
+        """
+        :param array_key: Elemanları stream edilecek üst seviye dizi anahtarı. Kök değer dizi ise kökün kendisi kullanılır.
+        :param max_preamble: JSON başlamadan önce atlanacak en fazla karakter (açıklama metni, ```json vb.).
+        """
+        self.array_key = array_key
+        self.max_preamble = LLM_STREAM_MAX_PREAMBLE if max_preamble is None else max_preamble
+        # Henüz işi bitmemiş metin; konumlar (_pos, _item_start, _string_start) bu tampona göredir
+        self._buffer = ""
+        # Tamponun ilk karakterinin çıktıdaki mutlak konumu
+        self._offset = 0
+        self.items = 0
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._pending_key = None
+        self._key = None
+        self._prev = None
+        self._array_depth = None
+        self._item_start = None
+        self.started = False
+        # Hedef dizi kapandı (veya kök değer tamamlandı)
+        self.finished = False
+        # Yapı bozulduysa MalformedJSONError; sonraki parçalar işlenmez
+        self.error = None
+
+    @property
+    def found(self):
+        """Hedef dizinin başlangıcı görüldü mü."""
+        return self._array_depth is not None
+
+    def feed(self, chunk):
+        """
+        Yeni çıktı parçasını işler.
+
+        :return: Bu parçayla tamamlanan dizi elemanları (çözülmüş JSON değerleri) listesi.
+            Çıktı geçerli JSON yapısından saparsa o ana kadar tamamlanan elemanlar döner,
+            hata `error` alanına yazılır ve ayrıştırma sonlanır.
+        """
+        if self.finished:
+            return []
+        self._discard_consumed()
+        self._buffer += chunk
+        completed = []
+        try:
+            self._scan(completed)
+        except MalformedJSONError as e:
+            self.error = e
+            self.finished = True
+        return completed
+
+    def _discard_consumed(self):
+        """
+        Tamponun, taranmış ve açık bir elemana/anahtara ait olmayan önekini atar.
+        """
+        keep = min(index for index in (self._pos, self._item_start, self._string_start) if index is not None)
+        if not keep:
+            return
+        self._buffer = self._buffer[keep:]
+        self._offset += keep
+        self._pos -= keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        if self._string_start is not None:
+            self._string_start -= keep
+
+    def _scan(self, completed):
+        text = self._buffer
+        i = self._pos
+        length = len(text)
+        while i < length and not self.finished:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL_RE.search(text, i)
+                if not match:
+                    i = length
+                    break
+                i = match.start()
+                if text[i] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    if self._string_start is not None:
+                        self._pending_key = text[self._string_start + 1:i]
+                        self._string_start = None
+                    self._prev = '"'
+                i += 1
+                continue
+
+            c = text[i]
+            if not self.started:
+                if c in "{[":
+                    self.started = True
+                else:
+                    if self._offset + i + 1 > self.max_preamble:
+                        raise MalformedJSONError(f"İlk {self.max_preamble} karakterde JSON başlamadı.")
+                    i += 1
+                    continue
+            if c in _WHITESPACE:
+                i += 1
+                continue
+
+            depth = len(self._stack)
+            if depth == self._array_depth and self._item_start is None and c not in ",]":
+                self._item_start = i
+            if c == '"':
+                self._in_string = True
+                # Kök nesnedeki anahtarlar hedef diziyi bulmak için saklanır
+                self._string_start = i if depth == 1 and self._stack[0] == "{" else None
+            elif c == ":":
+                self._key = self._pending_key if depth == 1 else None
+            elif c in "{[":
+                self._stack.append(c)
+                if self._array_depth is None and c == "[":
+                    if depth == 0 or (depth == 1 and self._prev == ":" and self._key == self.array_key):
+                        self._array_depth = len(self._stack)
+            elif c in "}]":
+                expected = "{" if c == "}" else "["
+                if not self._stack or self._stack[-1] != expected:
+                    raise MalformedJSONError(f"Beklenmeyen '{c}' (konum {self._offset + i}).")
+                if depth == self._array_depth and self._item_start is not None:
+                    # Dizinin son elemanı skaler
+                    completed.append(self._decode(text[self._item_start:i]))
+                    self._item_start = None
+                self._stack.pop()
+                depth -= 1
+                if depth == self._array_depth and self._item_start is not None:
+                    completed.append(self._decode(text[self._item_start:i + 1]))
+                    self._item_start = None
+                if self._array_depth is not None and depth < self._array_depth or not self._stack:
+                    self.finished = True
+            elif c == "," and depth == self._array_depth and self._item_start is not None:
+                completed.append(self._decode(text[self._item_start:i]))
+                self._item_start = None
+            self._prev = c
+            i += 1
+        self._pos = i
+
+    def _decode(self, item):
+        try:
+            value = json.loads(item)
+        except json.JSONDecodeError as e:
+            raise MalformedJSONError(f"Eleman {self.items} geçerli JSON değil: {e.msg}") from e
+        self.items += 1
+        return value
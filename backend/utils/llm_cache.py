@@ -0,0 +1,172 @@
+"""
+llm_cache.py
+------------
+LLM yanıtları için iki katmanlı önbellek.
+Önde boyutu sınırlı bellek içi bir LRU, arkada yeniden başlatmalardan sonra da kalan
+SQLite tabanlı bir disk katmanı bulunur. Anahtar; model, render edilmiş promptun hash'i,
+temperature, max_tokens ve response_format değerlerinden üretilir.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model, prompt, temperature, max_tokens, response_format=None, system_prompt=None):
+    """
+    İstek parametrelerinden deterministik bir önbellek anahtarı üretir.
+
+    :param system_prompt: Ayrı system mesajı kullanılıyorsa anahtara dahil edilir.
+    :return: SHA-256 hex string.
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    parts = [model, prompt_hash, temperature, max_tokens, response_format]
+    if system_prompt:
+        parts.append(hashlib.sha256(system_prompt.encode("utf-8")).hexdigest())
+    material = json.dumps(
+        parts,
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, path=LLM_CACHE_PATH, enabled=LLM_CACHE_ENABLED):
+        self.max_entries = max(0, int(max_entries))
+        self.path = path
+        self.enabled = enabled
+        self._memory = OrderedDict()
+        self._conn = None
+        self._disk_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.writes = 0
+
+    def _get_connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            logger.info(f"LLM disk önbelleği açıldı: {self.path}")
+        return self._conn
+
+    def _disk_get(self, key):
+        with self._disk_lock:
+            row = self._get_connection().execute(
+                "SELECT value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _disk_set(self, key, value):
+        with self._disk_lock:
+            conn = self._get_connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            conn.commit()
+
+    def _remember(self, key, value):
+        if self.max_entries == 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key):
+        """
+        Önce bellek, sonra disk katmanına bakar. Disk isabeti belleğe de alınır.
+
+        :return: Önbellekteki yanıt veya None.
+        """
+        if not self.enabled:
+            return None
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+        try:
+            value = await asyncio.to_thread(self._disk_get, key)
+        except Exception as e:
+            logger.warning(f"LLM disk önbelleği okunamadı: {str(e)}")
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    async def set(self, key, value):
+        if not self.enabled or not value:
+            return
+        self._remember(key, value)
+        self.writes += 1
+        try:
+            await asyncio.to_thread(self._disk_set, key, value)
+        except Exception as e:
+            logger.warning(f"LLM disk önbelleğine yazılamadı: {str(e)}")
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def clear(self):
+        """
+        Her iki katmanı da temizler.
+        """
+        self._memory.clear()
+        with self._disk_lock:
+            conn = self._get_connection()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+        logger.info("LLM önbelleği temizlendi.")
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "writes": self.writes,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "disk_path": self.path
+        }
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """
+    Süreç genelinde paylaşılan LLMResponseCache örneğini döndürür.
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = LLMResponseCache()
+    return _response_cache
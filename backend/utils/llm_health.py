@@ -0,0 +1,82 @@
+"""
+llm_health.py
+-------------
+Backend'lerin sağlığını arka planda ucuz bir `/v1/models` isteğiyle izler.
+İstek yolları bağlantı doğrulaması için test sorgusu göndermez; sağlık bilgisi
+backend kaydı üzerinden okunur.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+import httpx
+from config import LLM_HEALTH_PROBE_INTERVAL, LLM_HEALTH_PROBE_TIMEOUT
+from utils.backend_registry import get_backend_registry
+from utils.model_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+_probe_task = None
+
+
+async def probe_backend(backend):
+    """
+    Tek bir backend'e /models isteği gönderir ve sağlık durumunu günceller.
+
+    :return: Backend sağlıklıysa True.
+    """
+    client = await get_http_client()
+    backend.last_probe = datetime.now().isoformat()
+    try:
+        response = await client.get(f"{backend.url}/models", timeout=LLM_HEALTH_PROBE_TIMEOUT)
+        response.raise_for_status()
+        data = response.json().get("data", [])
+        backend.available_models = [model.get("id") for model in data if isinstance(model, dict)]
+        backend.mark_healthy()
+        return True
+    except (httpx.HTTPError, ValueError) as e:
+        backend.mark_unhealthy(f"health probe: {str(e)}", retry_after=LLM_HEALTH_PROBE_INTERVAL)
+        return False
+
+
+async def probe_all_backends():
+    backends = get_backend_registry().all_backends()
+    results = await asyncio.gather(*(probe_backend(b) for b in backends))
+    return dict(zip((b.url for b in backends), results))
+
+
+async def _probe_loop(interval):
+    while True:
+        try:
+            results = await probe_all_backends()
+            logger.debug(f"Backend sağlık kontrolü: {results}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Backend sağlık kontrolü başarısız: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+def start_health_probe(interval=LLM_HEALTH_PROBE_INTERVAL):
+    """
+    Arka plan sağlık kontrolünü başlatır (uygulama açılışında çağrılır).
+    """
+    global _probe_task
+    if interval <= 0:
+        logger.info("Backend sağlık kontrolü devre dışı.")
+        return None
+    if _probe_task is None or _probe_task.done():
+        _probe_task = asyncio.create_task(_probe_loop(interval))
+        logger.info(f"Backend sağlık kontrolü başlatıldı (her {interval}s).")
+    return _probe_task
+
+
+async def stop_health_probe():
+    global _probe_task
+    if _probe_task is not None:
+        _probe_task.cancel()
+        try:
+            await _probe_task
+        except asyncio.CancelledError:
+            pass
+        _probe_task = None
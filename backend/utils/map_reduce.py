@@ -0,0 +1,190 @@
+"""
+map_reduce.py
+-------------
+Chunk sonuçlarının hiyerarşik (map-reduce) birleştirilmesi.
+Map adımında chunk'lar run_chunks ile paralel işlenir; reduce adımında sonuçlar `fan_in` büyüklüğündeki
+gruplar halinde, her seviyede paralel olarak birleştirilir. Böylece çıktı boyutu sınırlı
+kalır ve toplam gecikme chunk sayısının logaritmasıyla artar.
+
+Metin çıktıları LLM ile, JSON çıktıları yapısal olarak (dizi birleştirme, nesne derin
+birleştirme) birleştirilir.
+"""
+
+import json
+import logging
+import re
+from config import LLM_REDUCE_FAN_IN, LLM_CONTEXT_SAFETY_MARGIN
+from utils.chunk_executor import run_chunks
+from utils.model_capabilities import get_model_capabilities
+from utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+MERGE_PROMPT_HEADER = (
+    "You are given {count} partial {title} results, each produced from a different part of the same input.\n"
+    "Merge them into one consolidated {title}. Remove duplicated findings, keep every distinct finding, "
+    "group related items together and keep the same format and heading style as the partial results. "
+    "Do not mention that the input was split into parts.\n"
+)
+
+_CODE_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+
+async def tree_reduce(results, reducer, fan_in=None, model_name=None, max_group_tokens=None):
+    """
+    Sonuçları ağaç yapısında tek bir sonuca indirger.
+
+    :param results: Birleştirilecek sonuç listesi (giriş sırası korunur).
+    :param reducer: Bir sonuç grubunu alıp tek sonuç döndüren async fonksiyon.
+    :param fan_in: Bir reduce adımında birleştirilecek en fazla sonuç sayısı; None ise config değeri.
+    :param model_name: Reduce çağrılarının eşzamanlılık limiti için model.
+    :param max_group_tokens: Verilirse bir grubun toplam token sayısı bu değeri aşmaz (en az 2 sonuç).
+    :return: Tek sonuç; sonuç yoksa None.
+    """
+    fan_in = max(2, int(fan_in or LLM_REDUCE_FAN_IN))
+    results = [result for result in results if result]
+    level = 0
+    while len(results) > 1:
+        groups = _group(results, fan_in, model_name, max_group_tokens)
+        level += 1
+        logger.info(f"Reduce seviyesi {level}: {len(results)} sonuç -> {len(groups)} grup")
+
+        async def reduce_group(group):
+            if len(group) == 1:
+                return group[0]
+            return await reducer(group)
+
+        reduced = await run_chunks(groups, reduce_group, model_name=model_name)
+        # Başarısız grup birleştirmesinde grubun sonuçları kaybolmaz, ardışık eklenir
+        results = [r if r else "\n\n".join(group) for r, group in zip(reduced, groups)]
+    return results[0] if results else None
+
+
+def _group(results, fan_in, model_name, max_group_tokens):
+    if not max_group_tokens:
+        return [results[i:i + fan_in] for i in range(0, len(results), fan_in)]
+    groups, current, current_tokens = [], [], 0
+    for result in results:
+        tokens = count_tokens(result, model_name)
+        if current and (len(current) >= fan_in or (len(current) >= 2 and current_tokens + tokens > max_group_tokens)):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(result)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def llm_merge_reducer(model_client, title, max_tokens=None, use_cache=True):
+    """
+    Metin sonuçlarını LLM ile birleştiren reducer üretir.
+    LLM çağrısı başarısız olursa sonuçlar ardışık eklenerek döndürülür.
+
+    :param model_client: generate_response metoduna sahip LLMClient.
+    :param title: Sonuç türü (ör: "code review"); birleştirme talimatında kullanılır.
+    """
+    async def reduce(parts):
+        sections = [MERGE_PROMPT_HEADER.format(count=len(parts), title=title)]
+        for index, part in enumerate(parts, 1):
+            sections.append(f"\n### Partial result {index}\n\n{part}\n")
+        prompt = "".join(sections)
+        try:
+            return await model_client.generate_response(prompt, max_tokens=max_tokens, use_cache=use_cache)
+        except Exception as e:
+            logger.warning(f"{title} sonuçları LLM ile birleştirilemedi, ardışık ekleniyor: {str(e)}")
+            return "\n\n".join(parts)
+
+    return reduce
+
+
+def reduce_group_budget(model_name, max_tokens):
+    """
+    Bir birleştirme promptuna girebilecek toplam sonuç token'ı (modelin context window'undan çıktı bütçesi düşülür).
+    """
+    caps = get_model_capabilities(model_name)
+    usable = int(caps.context_window * (1 - LLM_CONTEXT_SAFETY_MARGIN))
+    header_tokens = count_tokens(MERGE_PROMPT_HEADER, model_name)
+    return max(1, usable - (max_tokens or caps.max_output_tokens) - header_tokens)
+
+
+def parse_json_output(text):
+    """
+    LLM çıktısından JSON değeri çıkarır (```json blokları ve öncesindeki açıklamalar atlanır).
+
+    :raises ValueError: Çıktıda geçerli JSON yoksa.
+    """
+    if not isinstance(text, str):
+        raise ValueError(f"Çıktı metin değil ({type(text).__name__}).")
+    cleaned = _CODE_FENCE_RE.sub("", text.strip())
+    starts = [i for i in (cleaned.find("["), cleaned.find("{")) if i >= 0]
+    if not starts:
+        raise ValueError("Çıktıda JSON bulunamadı.")
+    value, _ = json.JSONDecoder().raw_decode(cleaned[min(starts):])
+    return value
+
+
+def merge_json(values, identity_key=None, text_keys=(), key_rules=None, _key=None):
+    """
+    JSON değerlerini yapısal olarak birleştirir.
+    Diziler birleştirilip tekrarlar atılır (identity_key verilirse aynı anahtarlı nesneler
+    derin birleştirilir), nesneler anahtar bazında derin birleştirilir.
+    Farklı metin değerleri yalnızca serbest metin alanlarında (text_keys) alt alta eklenir;
+    tarih, enum, kimlik gibi diğer skalerlerde ilk dolu değer korunur.
+
+    :param text_keys: Değerleri birleştirilecek serbest metin anahtarları (ör: "Description").
+    :param key_rules: Anahtar -> değer listesinden tek değer seçen fonksiyon (ör: {"Start Date": min}).
+    """
+    values = [value for value in values if value not in (None, "", [], {})]
+    if not values:
+        return None
+    if all(isinstance(value, list) for value in values):
+        merged, index = [], {}
+        for value in values:
+            for item in value:
+                key = item.get(identity_key) if identity_key and isinstance(item, dict) else None
+                if key is None:
+                    key = json.dumps(item, sort_keys=True, ensure_ascii=False)
+                if key in index:
+                    merged[index[key]] = merge_json([merged[index[key]], item], identity_key, text_keys, key_rules, _key)
+                else:
+                    index[key] = len(merged)
+                    merged.append(item)
+        return merged
+    if all(isinstance(value, dict) for value in values):
+        merged = {}
+        for value in values:
+            for key, item in value.items():
+                merged[key] = merge_json([merged[key], item], identity_key, text_keys, key_rules, key) if key in merged else item
+        return merged
+    rule = (key_rules or {}).get(_key)
+    if rule is not None:
+        try:
+            return rule(values)
+        except TypeError:
+            # Karşılaştırılamayan karışık tipler
+            return values[0]
+    if _key in text_keys and all(isinstance(value, str) for value in values):
+        distinct = list(dict.fromkeys(value.strip() for value in values))
+        return "\n".join(distinct)
+    return values[0]
+
+
+def json_merge_reducer(identity_key=None, fallback=None, text_keys=(), key_rules=None):
+    """
+    JSON çıktıları yapısal olarak birleştiren reducer üretir.
+    JSON olarak okunamayan sonuçlar varsa grup `fallback` reducer'ına (yoksa ardışık eklemeye) bırakılır.
+
+    :param identity_key: Dizi elemanlarını eşleştirmek için kullanılacak anahtar (ör: "Task Name").
+    :param text_keys: merge_json'a bakınız.
+    :param key_rules: merge_json'a bakınız.
+    """
+    async def reduce(parts):
+        try:
+            parsed = [parse_json_output(part) for part in parts]
+        except ValueError as e:
+            logger.warning(f"JSON sonuç yapısal birleştirilemedi: {str(e)}")
+            return await fallback(parts) if fallback else "\n\n".join(parts)
+        return json.dumps(merge_json(parsed, identity_key, text_keys, key_rules), ensure_ascii=False, indent=2)
+
+    return reduce
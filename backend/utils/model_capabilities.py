@@ -0,0 +1,143 @@
+"""
+model_capabilities.py
+---------------------
+Model yetenek kaydı ve istek planlayıcı.
+Her model için eğitim context üst sınırı, önerilen çıktı bütçesi ve yaklaşık üretim hızı tutulur.
+Planlamada kullanılan context window sunucunun modeli yüklediği uzunluktur (LLM_SERVED_CONTEXT_WINDOW
+veya model bazında LLM_MODEL_CAPABILITIES); eğitim üst sınırı yalnızca tavan olarak kullanılır.
+Planlayıcı, render edilmiş bir prompt için tek çağrıya sığıp sığmadığını, kaç chunk
+gerektiğini ve istenecek `max_tokens` değerini hesaplar; böylece büyük context'li modeller
+gereksiz yere chunk'lanmaz, küçük modellerde context taşmaz.
+"""
+
+import logging
+import math
+from config import LLM_MODEL_CAPABILITIES, LLM_CONTEXT_SAFETY_MARGIN, LLM_SERVED_CONTEXT_WINDOW
+from utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Çıktı için en az bu kadar token ayrılır; daha azı anlamlı bir yanıt üretmez
+MIN_OUTPUT_TOKENS = 256
+
+
+class ModelCapabilities:
+    def __init__(self, context_window, max_output_tokens, tokens_per_second, max_context_window=None):
+        """
+        :param context_window: Planlamada kullanılan (sunucuda yüklü) context uzunluğu.
+        :param max_context_window: Modelin eğitim context üst sınırı; None ise context_window.
+        """
+        self.context_window = int(context_window)
+        self.max_output_tokens = int(max_output_tokens)
+        self.tokens_per_second = float(tokens_per_second)
+        self.max_context_window = int(max_context_window or context_window)
+
+    def to_dict(self):
+        return {
+            "context_window": self.context_window,
+            "max_context_window": self.max_context_window,
+            "max_output_tokens": self.max_output_tokens,
+            "tokens_per_second": self.tokens_per_second
+        }
+
+
+# Model identifier -> yetenekler (get_model_identifier eşlemesindeki modeller).
+# İlk değer eğitim context üst sınırıdır; planlama get_model_capabilities ile sunucudaki uzunluğa indirilir.
+DEFAULT_CAPABILITIES = ModelCapabilities(4096, 1024, 20)
+MODEL_CAPABILITIES = {
+    "llama-3.2-1b-instruct": ModelCapabilities(131072, 4096, 60),
+    "llama-3.2-3b-instruct": ModelCapabilities(131072, 4096, 40),
+    "codegeex4-all-9b": ModelCapabilities(131072, 4096, 15),
+    "codellama-7b-instruct": ModelCapabilities(16384, 4096, 20),
+    "deepseek-coder-6.7b-instruct": ModelCapabilities(16384, 4096, 20),
+    "gemma-2-2b-it": ModelCapabilities(8192, 2048, 45),
+    "gemma-3-4b-it": ModelCapabilities(131072, 8192, 30),
+    "qwen2.5-7b-instruct-1m": ModelCapabilities(1010000, 8192, 20),
+    "qwen2.5-coder-3b-instruct": ModelCapabilities(32768, 8192, 35),
+    "stable-code-instruct-3b": ModelCapabilities(16384, 4096, 35),
+    "starcoder2-7b": ModelCapabilities(16384, 4096, 20),
+}
+
+
+def get_model_capabilities(model_name):
+    """
+    Modelin yeteneklerini döndürür; LLM_MODEL_CAPABILITIES içindeki alanlar varsayılanları ezer.
+    Context window, override yoksa LLM_SERVED_CONTEXT_WINDOW ile sınırlanır ve hiçbir durumda
+    modelin eğitim üst sınırını aşmaz.
+    """
+    base = MODEL_CAPABILITIES.get(model_name, DEFAULT_CAPABILITIES)
+    override = LLM_MODEL_CAPABILITIES.get(model_name) or {}
+    values = base.to_dict()
+    values.update(override)
+    ceiling = values["max_context_window"]
+    served = override.get("context_window", LLM_SERVED_CONTEXT_WINDOW)
+    values["context_window"] = min(served, ceiling)
+    # Çıktı bütçesi yüklü context'in yarısını geçmez
+    values["max_output_tokens"] = min(values["max_output_tokens"], max(MIN_OUTPUT_TOKENS, values["context_window"] // 2))
+    return ModelCapabilities(**values)
+
+
+class PromptPlan:
+    def __init__(self, model_name, prompt_tokens, input_budget, max_tokens, chunks, estimated_seconds):
+        self.model_name = model_name
+        self.prompt_tokens = prompt_tokens
+        self.input_budget = input_budget
+        self.max_tokens = max_tokens
+        self.chunks = chunks
+        self.estimated_seconds = estimated_seconds
+
+    @property
+    def fits(self):
+        return self.chunks == 1
+
+    def to_dict(self):
+        return {
+            "model": self.model_name,
+            "prompt_tokens": self.prompt_tokens,
+            "input_budget": self.input_budget,
+            "max_tokens": self.max_tokens,
+            "chunks": self.chunks,
+            "estimated_seconds": self.estimated_seconds
+        }
+
+
+def output_budget(model_name, prompt_tokens):
+    """
+    Verilen prompt uzunluğu için istenecek `max_tokens` değerini döndürür.
+    Çıktı, modelin önerilen bütçesini ve context'te kalan alanı aşmaz.
+    """
+    caps = get_model_capabilities(model_name)
+    usable = int(caps.context_window * (1 - LLM_CONTEXT_SAFETY_MARGIN))
+    return max(MIN_OUTPUT_TOKENS, min(caps.max_output_tokens, usable - prompt_tokens))
+
+
+def plan_prompt(prompt, model_name, prompt_tokens=None):
+    """
+    Render edilmiş prompt için çağrı planı üretir.
+
+    :param prompt: Modele gönderilecek prompt.
+    :param model_name: Model identifier.
+    :param prompt_tokens: Önceden hesaplanmış token sayısı; None ise modelin tokenizer'ıyla sayılır.
+    :return: PromptPlan; `input_budget` chunk başına kullanılabilecek prompt token sayısıdır.
+    """
+    caps = get_model_capabilities(model_name)
+    if prompt_tokens is None:
+        prompt_tokens = count_tokens(prompt, model_name)
+    usable = int(caps.context_window * (1 - LLM_CONTEXT_SAFETY_MARGIN))
+    reserved_output = min(caps.max_output_tokens, max(MIN_OUTPUT_TOKENS, usable // 2))
+    input_budget = usable - reserved_output
+
+    if prompt_tokens <= input_budget:
+        chunks = 1
+        max_tokens = output_budget(model_name, prompt_tokens)
+    else:
+        chunks = math.ceil(prompt_tokens / input_budget)
+        max_tokens = reserved_output
+
+    estimated_seconds = round(chunks * max_tokens / caps.tokens_per_second, 1)
+    plan = PromptPlan(model_name, prompt_tokens, input_budget, max_tokens, chunks, estimated_seconds)
+    logger.info(
+        f"Prompt planı ({model_name}): {prompt_tokens} token, bütçe {input_budget}, "
+        f"{chunks} chunk, max_tokens={max_tokens}, tahmini en fazla {estimated_seconds}s"
+    )
+    return plan
@@ -7,61 +7,153 @@ LLM (Large Language Model) çağrılarını yöneten katman.
 
 import logging
 from langchain_openai import ChatOpenAI
-from config import MODEL_API_BASE_URL, MODEL_IDENTIFIER
+from config import MODEL_IDENTIFIER
 
 # Logger ayarları (hataları ve bilgileri takip etmek için)
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def get_llm_instance(temperature: float = 0.7):
+# (model, temperature) -> ChatOpenAI; nesneler süreç boyunca yeniden kullanılır
+_llm_instances = {}
+
+def get_llm_instance(model_name: str = None, temperature: float = 0.7):
     """
-    LLM nesnesini oluşturur ve bağlantıyı test eder.
-    
+    LLM nesnesini döndürür; aynı model ve temperature için önbellekteki nesne kullanılır.
+
+    Bağlantı her çağrıda test sorgusuyla doğrulanmaz; backend sağlığı arka planda
+    /v1/models üzerinden izlenir (bkz. utils/llm_health.py). Nesne backend seçimi ve devre kesiciyi
+    kullanmaz; yük dağıtımı ve failover gereken çağrılar LLMClient üzerinden yapılmalıdır.
+
+    :param model_name: Model identifier; None ise MODEL_IDENTIFIER kullanılır.
     :param temperature: Modelin yaratıcılık seviyesi (varsayılan: 0.7).
     :return: ChatOpenAI nesnesi.
     :raises ValueError: Yapılandırma hataları için.
     :raises ConnectionError: Bağlantı hataları için.
     """
+    model_name = model_name or MODEL_IDENTIFIER
     # 1. Yapılandırma kontrolü
-    if not MODEL_API_BASE_URL:
-        logger.error("MODEL_API_BASE_URL boş olamaz.")
-        raise ValueError("MODEL_API_BASE_URL yapılandırması eksik.")
-    if not MODEL_IDENTIFIER:
+    if not model_name:
         logger.error("MODEL_IDENTIFIER boş olamaz.")
         raise ValueError("MODEL_IDENTIFIER yapılandırması eksik.")
-    
+
+    key = (model_name, temperature)
+    llm = _llm_instances.get(key)
+    if llm is not None:
+        return llm
+
     # 2. Model nesnesi oluşturma ve hata yakalama
     try:
-        logger.info(f"LLM nesnesi oluşturuluyor: {MODEL_IDENTIFIER} @ {MODEL_API_BASE_URL}")
+        # pick() devre kesicinin deneme slotunu ayırır ve bu nesne isteği kendisi gönderdiğinden slot
+        # kapatılamaz; uzun ömürlü nesne modelin yapılandırılmış ilk backend'ine bağlanır
+        api_base = get_backend_registry().backends_for(model_name)[0].url
+        logger.info(f"LLM nesnesi oluşturuluyor: {model_name} @ {api_base}")
         llm = ChatOpenAI(
-            model_name=MODEL_IDENTIFIER,
-            openai_api_base=MODEL_API_BASE_URL,
+            model_name=model_name,
+            openai_api_base=api_base,
             openai_api_key="not-needed",  # Gerekirse environment'tan çekilebilir
             temperature=temperature
         )
-        
-        # 3. Bağlantıyı test etme
-        logger.debug(f"LLM'e gönderilen test sorgusu: Merhaba, bu bir test sorgusudur.")
-        test_response = llm.invoke("Merhaba, bu bir test sorgusudur.")
-        logger.debug(f"LLM'den alınan yanıt: {test_response}")
-        if test_response:
-            logger.info("LLM bağlantısı başarılı.")
-        else:
-            logger.warning("LLM'den yanıt alınamadı.")
-        
+        _llm_instances[key] = llm
         return llm
     except Exception as e:
         logger.error(f"LLM nesnesi oluşturulurken hata: {str(e)}")
         raise ConnectionError(f"LLM sunucusuna bağlanılamadı: {str(e)}")
 
-import requests
-import logging
+import asyncio
+import json
+import time
+import httpx
+from config import (
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE,
+    LLM_POOL_KEEPALIVE_EXPIRY,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+)
+from utils.llm_cache import get_response_cache, make_cache_key
+from utils.single_flight import get_single_flight
+from utils.backend_registry import get_backend_registry
+from utils.model_scheduler import model_slot
+from utils.deadline import DeadlineExceededError, check_deadline, remaining_time
+from utils.hedging import get_hedge_policy
+from utils.model_capabilities import output_budget
+from utils.token_counter import count_tokens
+from utils.prompt_assembly import apply_cache_hints, prefix_key, get_prefix_cache_stats
+from utils.structured_output import (
+    apply_response_format,
+    mark_response_format_rejected,
+    response_format_for,
+    check_output,
+    repair_prompt,
+    get_structured_output_stats
+)
+from config import LLM_STRUCTURED_MAX_REPAIRS
+
+# Tüm LLMClient örneklerinin paylaştığı keep-alive bağlantı havuzu.
+# Her istekte yeni TCP bağlantısı açmak yerine aynı AsyncClient kullanılır.
+_http_client = None
+_http_client_lock = asyncio.Lock()
+
+
+def build_timeout(timeout=None):
+    """
+    Çağrı bazlı timeout nesnesi üretir. Aktif bir istek deadline'ı varsa süreler kalan süreyle sınırlanır.
+
+    :param timeout: None ise config değerleri, sayı ise read timeout, httpx.Timeout ise aynen kullanılır.
+    :return: httpx.Timeout nesnesi.
+    :raises DeadlineExceededError: Deadline zaten dolmuşsa.
+    """
+    if isinstance(timeout, httpx.Timeout):
+        read_timeout, connect_timeout = timeout.read, timeout.connect
+    else:
+        read_timeout = LLM_READ_TIMEOUT if timeout is None else float(timeout)
+        connect_timeout = LLM_CONNECT_TIMEOUT
+    remaining = check_deadline()
+    if remaining is not None:
+        read_timeout = remaining if read_timeout is None else min(read_timeout, remaining)
+        connect_timeout = remaining if connect_timeout is None else min(connect_timeout, remaining)
+    return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+
+async def get_http_client():
+    """
+    Paylaşılan httpx.AsyncClient nesnesini döndürür, yoksa havuz limitleriyle oluşturur.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        async with _http_client_lock:
+            if _http_client is None or _http_client.is_closed:
+                limits = httpx.Limits(
+                    max_connections=LLM_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY,
+                )
+                _http_client = httpx.AsyncClient(limits=limits, timeout=build_timeout())
+                logger.info(
+                    f"LLM HTTP havuzu oluşturuldu (max_connections={LLM_POOL_MAX_CONNECTIONS}, "
+                    f"max_keepalive={LLM_POOL_MAX_KEEPALIVE})"
+                )
+    return _http_client
+
+
+async def close_http_client():
+    """
+    Paylaşılan bağlantı havuzunu kapatır (uygulama kapanışında çağrılır).
+    """
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+        logger.info("LLM HTTP havuzu kapatıldı.")
+    _http_client = None
+
 
 class LLMClient:
-    def __init__(self, model_name=None):
-        self.api_url = "http://localhost:1234/v1"
+    def __init__(self, model_name=None, temperature=0.7):
+        # Endpoint seçimi her çağrıda backend kaydı üzerinden yapılır (bkz. LLM_BACKENDS)
+        self.backend_registry = get_backend_registry()
         # Default model kullan veya parametre olarak verilen modeli al
         self.model_name = model_name if model_name else "llama-3.2-1b-instruct"
+        self.temperature = temperature
         self.logger = logging.getLogger("LLMClient")
         self.logger.info(f"LLMClient initialized with model: {self.model_name}")
         
@@ -96,21 +188,291 @@ class LLMClient:
         self.logger.info(f"Selected model: {model_key} -> {model_id}")
         return model_id
 
-    async def generate_response(self, prompt, temperature=0.7, max_tokens=4096, response_format=None):
-        """LLM API çağrısı yapan temel metod"""
+    def _build_payload(self, prompt, temperature, max_tokens, response_format=None, stream=False, system_prompt=None):
+        if temperature is None:
+            temperature = self.temperature
+        if system_prompt:
+            # Sabit talimatlar önde: aynı system mesajıyla gelen istekler sunucunun KV önbelleğini paylaşır
+            messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+        else:
+            messages = [{"role": "system", "content": prompt}]
         payload = {
             "model": self.model_name,
-            "messages": [{"role": "system", "content": prompt}],
+            "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
         if response_format:
             payload["response_format"] = response_format
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _resolve_max_tokens(self, prompt, max_tokens, system_prompt=None):
+        # Verilmemişse çıktı bütçesi modelin context window'u ve prompt uzunluğuna göre belirlenir
+        if max_tokens is not None:
+            return max_tokens
+        prompt_tokens = count_tokens(prompt, self.model_name)
+        if system_prompt:
+            prompt_tokens += count_tokens(system_prompt, self.model_name)
+        return output_budget(self.model_name, prompt_tokens)
+
+    @staticmethod
+    def _prefix_key(payload):
+        messages = payload["messages"]
+        system_prompt = messages[0]["content"] if len(messages) > 1 else None
+        return prefix_key(system_prompt, messages[-1]["content"])
+
+    async def generate_response(self, prompt, temperature=None, max_tokens=None, response_format=None, timeout=None, use_cache=True, system_prompt=None):
+        """
+        LLM API çağrısı yapan temel metod.
+
+        İstek paylaşılan havuz üzerinden asenkron gönderilir; event loop bloklanmaz.
+        Aynı model, prompt ve örnekleme parametreleri için yanıt önbellekten döner;
+        eşzamanlı özdeş istekler tek bir upstream çağrısını paylaşır.
+
+        :param temperature: None ise client'ın varsayılan temperature değeri kullanılır.
+        :param max_tokens: None ise model yeteneklerine göre hesaplanır (bkz. utils/model_capabilities.py).
+        :param timeout: Çağrı bazlı read timeout (saniye) veya httpx.Timeout; None ise config değeri.
+        :param use_cache: False ise önbellek atlanır (yanıt yine de önbelleğe yazılır).
+        :param system_prompt: Verilirse sabit talimatlar system, prompt user mesajı olarak gönderilir.
+        """
+        if temperature is None:
+            temperature = self.temperature
+        max_tokens = self._resolve_max_tokens(prompt, max_tokens, system_prompt)
+        cache = get_response_cache()
+        cache_key = make_cache_key(self.model_name, prompt, temperature, max_tokens, response_format, system_prompt)
+        if use_cache:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                self.logger.debug(f"LLM cache hit for model: {self.model_name}")
+                return cached
+        else:
+            cache.record_bypass()
+
+        payload = self._build_payload(prompt, temperature, max_tokens, response_format, system_prompt=system_prompt)
+
+        async def request():
+            content = await self._post_completion(payload, timeout)
+            await cache.set(cache_key, content)
+            return content
+
+        # Aynı anda gelen özdeş istekler tek upstream çağrısında birleştirilir
+        return await get_single_flight().do(cache_key, request)
+
+    async def _post_completion(self, payload, timeout=None):
+        """
+        İsteği, varsa ortak deadline içinde gönderir; kuyrukta bekleme süresi de bütçeye dahildir.
+        """
+        remaining = check_deadline()
         try:
-            self.logger.debug(f"Sending request to LLM API with model: {self.model_name}")
-            response = requests.post(f"{self.api_url}/chat/completions", json=payload)
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
-        except requests.RequestException as e:
+            if remaining is None:
+                return await self._send_completion(payload, timeout)
+            return await asyncio.wait_for(self._send_completion(payload, timeout), remaining)
+        except asyncio.TimeoutError as e:
+            left = remaining_time()
+            if left is not None and left <= 0:
+                self.logger.error(f"LLM request deadline exceeded for model: {self.model_name}")
+                raise DeadlineExceededError("LLM istek süresi (deadline) doldu.") from e
+            raise
+
+    async def _send_completion(self, payload, timeout=None):
+        try:
+            # Model affinity kuyruğu: aynı modele ait işler gruplanarak model değişimleri azaltılır
+            async with model_slot(self.model_name):
+                replicas = len(self.backend_registry.backends_for(self.model_name))
+                delay = get_hedge_policy().hedge_delay(self.model_name, replicas)
+                if delay is None:
+                    return await self._attempt_completion(payload, timeout)
+                return await self._hedged_completion(payload, timeout, delay)
+        except httpx.HTTPError as e:
             self.logger.error(f"LLM API Error: {str(e)}")
             raise
+
+    async def _attempt_completion(self, payload, timeout=None, used_backends=None):
+        """
+        Tek bir backend'e istek gönderir.
+
+        :param used_backends: Verilirse seçilen backend URL'si eklenir; listedekiler seçimde atlanır.
+        """
+        exclude = tuple(used_backends) if used_backends else ()
+        client = await get_http_client()
+        # Devresi açık backend'ler seçilmez; hepsi açıksa CircuitOpenError ile hızlıca reddedilir
+        async with self.backend_registry.acquire(self.model_name, exclude=exclude) as backend:
+            if used_backends is not None:
+                used_backends.append(backend.url)
+            self.logger.debug(f"Sending request to LLM API with model: {self.model_name} @ {backend.url}")
+            started = time.monotonic()
+            request_payload = apply_response_format(apply_cache_hints(payload, backend.url, self._prefix_key(payload)), backend.url)
+            response = await client.post(f"{backend.url}/chat/completions", json=request_payload, timeout=build_timeout(timeout))
+            if response.status_code in (400, 422) and "response_format" in request_payload:
+                # Sunucu response_format'ı desteklemiyorsa istek onsuz tekrarlanır; başarılı olursa backend için kapatılır
+                retry_payload = {key: value for key, value in request_payload.items() if key != "response_format"}
+                retry = await client.post(f"{backend.url}/chat/completions", json=retry_payload, timeout=build_timeout(timeout))
+                if retry.is_success:
+                    mark_response_format_rejected(backend.url)
+                    response = retry
+            response.raise_for_status()
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+            get_prefix_cache_stats().record_usage(data.get("usage"))
+        get_hedge_policy().record_latency(self.model_name, time.monotonic() - started)
+        return content
+
+    async def _hedged_completion(self, payload, timeout, delay):
+        """
+        İstek `delay` saniyede bitmezse başka bir replikaya kopyasını gönderir; önce biten kazanır,
+        diğeri iptal edilir.
+        """
+        policy = get_hedge_policy()
+        used_backends = []
+        primary = asyncio.ensure_future(self._attempt_completion(payload, timeout, used_backends))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            if not policy.try_acquire():
+                return await primary
+            self.logger.info(f"Hedged request issued for model: {self.model_name} after {delay:.2f}s")
+            hedge = asyncio.ensure_future(self._attempt_completion(payload, timeout, used_backends))
+            pending = {primary, hedge}
+            errors = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            policy.record_win()
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[0]
+        finally:
+            # Kaybeden istek iptal edilir; bağlantı kapanınca sunucu üretimi bırakır
+            for task in pending:
+                task.cancel()
+
+    async def stream_response(self, prompt, temperature=None, max_tokens=None, response_format=None, timeout=None, use_cache=True, system_prompt=None):
+        """
+        OpenAI uyumlu `stream: true` API'si ile yanıtı token token üretir.
+        Önbellekte bulunan yanıtlar tek parça halinde döner; tamamlanan stream önbelleğe yazılır.
+
+        :return: Model ürettikçe içerik parçalarını (delta) veren async generator.
+        """
+        if temperature is None:
+            temperature = self.temperature
+        max_tokens = self._resolve_max_tokens(prompt, max_tokens, system_prompt)
+        cache = get_response_cache()
+        cache_key = make_cache_key(self.model_name, prompt, temperature, max_tokens, response_format, system_prompt)
+        if use_cache:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                self.logger.debug(f"LLM cache hit (stream) for model: {self.model_name}")
+                yield cached
+                return
+        else:
+            cache.record_bypass()
+
+        payload = self._build_payload(prompt, temperature, max_tokens, response_format, stream=True, system_prompt=system_prompt)
+        key = self._prefix_key(payload)
+        parts = []
+        try:
+            client = await get_http_client()
+            async with model_slot(self.model_name):
+                async with self.backend_registry.acquire(self.model_name) as backend:
+                    self.logger.debug(f"Sending streaming request to LLM API with model: {self.model_name} @ {backend.url}")
+                    started = time.monotonic()
+                    async with client.stream(
+                        "POST",
+                        f"{backend.url}/chat/completions",
+                        json=apply_response_format(apply_cache_hints(payload, backend.url, key), backend.url),
+                        timeout=build_timeout(timeout)
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            check_deadline()
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                break
+                            choices = json.loads(data).get("choices") or [{}]
+                            delta = choices[0].get("delta", {}).get("content")
+                            if delta:
+                                if not parts:
+                                    # İlk token gecikmesi; aynı prefix'in tekrarlarında KV önbellek kazancını gösterir
+                                    get_prefix_cache_stats().record_ttft(self.model_name, key, time.monotonic() - started)
+                                parts.append(delta)
+                                yield delta
+        except httpx.HTTPError as e:
+            self.logger.error(f"LLM API Stream Error: {str(e)}")
+            raise
+        await cache.set(cache_key, "".join(parts))
+
+
+    async def generate_structured(self, prompt, schema, name, max_repairs=None, **kwargs):
+        """
+        Şemaya uygun JSON çıktı üretir.
+        İstek `json_schema` response_format ile gönderilir (backend desteklemiyorsa düşürülür);
+        çıktı şemaya uymuyorsa repair_structured ile onarılır.
+
+        :param schema: Beklenen çıktının JSON şeması.
+        :param name: Şema/süreç adı (ör: "test_planning"); metriklerde kullanılır.
+        :param kwargs: generate_response'a aktarılacak diğer parametreler.
+        :return: Geçerliyse normalize edilmiş JSON metni, onarılamazsa son çıktı.
+        """
+        text = await self.generate_response(prompt, response_format=response_format_for(schema, name), **kwargs)
+        return await self.repair_structured(text, schema, name, max_repairs, max_tokens=kwargs.get("max_tokens"))
+
+    async def repair_structured(self, text, schema, name, max_repairs=None, max_tokens=None):
+        """
+        Üretilmiş bir çıktıyı doğrular; şemaya uymuyorsa hataları modele geri vererek en fazla
+        `max_repairs` kez düzeltilmiş çıktı ister (stream edilmiş çıktılar için de kullanılır).
+        """
+        if max_repairs is None:
+            max_repairs = LLM_STRUCTURED_MAX_REPAIRS
+        response_format = response_format_for(schema, name)
+        value, errors = check_output(text, schema)
+        first_pass_valid = not errors
+        repairs = 0
+        while errors and repairs < max_repairs:
+            repairs += 1
+            self.logger.info(f"{name} çıktısı şemaya uymuyor ({len(errors)} hata), onarım denemesi {repairs}/{max_repairs}")
+            try:
+                candidate = await self.generate_response(
+                    repair_prompt(text, schema, errors),
+                    temperature=0,
+                    max_tokens=max_tokens,
+                    response_format=response_format,
+                    use_cache=False
+                )
+            except httpx.HTTPError as e:
+                self.logger.warning(f"{name} onarım isteği başarısız: {str(e)}")
+                break
+            candidate_value, candidate_errors = check_output(candidate, schema)
+            # Onarım daha kötü sonuç verirse önceki çıktı korunur
+            if candidate_value is not None and (value is None or len(candidate_errors) <= len(errors)):
+                text, value, errors = candidate, candidate_value, candidate_errors
+        get_structured_output_stats().record_output(name, first_pass_valid, repairs, not errors)
+        if errors:
+            self.logger.warning(f"{name} çıktısı {repairs} onarımdan sonra da şemaya uymuyor: {errors[:5]}")
+            return text
+        return json.dumps(value, ensure_ascii=False, indent=2)
+
+# (model, temperature) -> LLMClient; istek yollarında yeni nesne oluşturulmaz
+_llm_clients = {}
+
+
+def get_llm_client(model_name=None, temperature=0.7):
+    """
+    Süreç genelinde paylaşılan LLMClient örneğini döndürür.
+
+    :param model_name: Model identifier; None ise varsayılan model.
+    :param temperature: Client'ın varsayılan temperature değeri.
+    """
+    key = (model_name, temperature)
+    client = _llm_clients.get(key)
+    if client is None:
+        client = LLMClient(model_name, temperature)
+        _llm_clients[key] = client
+    return client
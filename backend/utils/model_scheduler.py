@@ -0,0 +1,175 @@
+"""
+model_scheduler.py
+------------------
+LM Studio benzeri sunucular aynı anda tek model yükler; modeller arasında gidip gelen
+istekler her seferinde model yeniden yüklemesine yol açar. Bu modül, LLMClient önünde
+bekleyen işleri hedef modele göre gruplayan bir kuyruk sağlar.
+
+Aktif model için bekleyen iş oldukça o modelden devam edilir; ancak başka bir model
+bekliyorsa, aktif grup fairness penceresini (süre veya iş sayısı) aştığında en eski
+bekleyen işe sahip modele geçilir. Model değişimi, aktif modelin çalışan işleri
+bittikten sonra yapılır.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from config import (
+    LLM_SCHEDULER_ENABLED,
+    LLM_SCHEDULER_MAX_CONCURRENT,
+    LLM_SCHEDULER_FAIRNESS_WINDOW,
+    LLM_SCHEDULER_MAX_BATCH,
+)
+from utils.backend_registry import get_backend_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ModelAffinityScheduler:
+    def __init__(self, max_concurrent=LLM_SCHEDULER_MAX_CONCURRENT,
+                 fairness_window=LLM_SCHEDULER_FAIRNESS_WINDOW, max_batch=LLM_SCHEDULER_MAX_BATCH):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.fairness_window = fairness_window
+        self.max_batch = max(1, int(max_batch))
+        self._queues = {}
+        self._running = 0
+        self._current_model = None
+        self._batch_started = 0.0
+        self._batch_count = 0
+        self.swap_count = 0
+        self.granted = 0
+
+    def _pending(self, model):
+        queue = self._queues.get(model)
+        # İptal edilmiş bekleyenleri kuyruğun başından temizle
+        while queue and queue[0][0].done():
+            queue.popleft()
+        return queue
+
+    def _window_exceeded(self):
+        return (
+            self._batch_count >= self.max_batch
+            or time.monotonic() - self._batch_started >= self.fairness_window
+        )
+
+    def _select_model(self):
+        """
+        :return: (seçilen model, başka model bekliyor mu) ikilisi; bekleyen iş yoksa (None, False).
+        """
+        waiting = {model: queue for model in list(self._queues) if (queue := self._pending(model))}
+        if not waiting:
+            return None, False
+        current = self._current_model
+        others = [model for model in waiting if model != current]
+        if current in waiting and (not others or not self._window_exceeded()):
+            return current, bool(others)
+        # En eski bekleyen işe sahip modele geç
+        return min(others, key=lambda model: waiting[model][0][1]), True
+
+    def _dispatch(self):
+        while self._running < self.max_concurrent:
+            model, contested = self._select_model()
+            if model is None:
+                return
+            if model != self._current_model:
+                # Model değişimi için aktif modelin çalışan işlerinin bitmesi beklenir
+                if self._running > 0:
+                    return
+                if self._current_model is not None:
+                    self.swap_count += 1
+                    logger.info(f"Model değişimi: {self._current_model} -> {model}")
+                self._current_model = model
+                self._batch_started = time.monotonic()
+                self._batch_count = 0
+            elif not contested:
+                # Rakip model beklemiyorsa fairness penceresi işlemez, yeniden başlatılır
+                self._batch_started = time.monotonic()
+                self._batch_count = 0
+            grant, _ = self._queues[model].popleft()
+            self._running += 1
+            self._batch_count += 1
+            self.granted += 1
+            grant.set_result(None)
+
+    def _release(self):
+        self._running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model_name):
+        """
+        Model için çalıştırma izni alır; blok süresince izin tutulur.
+
+        :param model_name: İşin hedef modeli.
+        """
+        grant = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(model_name, deque()).append((grant, time.monotonic()))
+        self._dispatch()
+        try:
+            await grant
+        except asyncio.CancelledError:
+            # İzin verildiği anda iptal geldiyse slotu geri bırak
+            if grant.done() and not grant.cancelled():
+                self._release()
+            else:
+                self._dispatch()
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self):
+        return {
+            "current_model": self._current_model,
+            "running": self._running,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": {
+                model: len(queue) for model in list(self._queues) if (queue := self._pending(model))
+            },
+            "model_swaps": self.swap_count,
+            "granted": self.granted
+        }
+
+
+# Backend grubu (aynı endpoint listesi) -> scheduler. Farklı sunuculara giden modeller birbirini beklemez.
+_schedulers = {}
+
+
+def get_model_scheduler(model_name):
+    """
+    Modelin hizmet aldığı backend grubuna ait scheduler'ı döndürür; devre dışıysa None.
+    """
+    if not LLM_SCHEDULER_ENABLED:
+        return None
+    group = tuple(sorted(b.url for b in get_backend_registry().backends_for(model_name)))
+    scheduler = _schedulers.get(group)
+    if scheduler is None:
+        scheduler = ModelAffinityScheduler()
+        _schedulers[group] = scheduler
+    return scheduler
+
+
+@asynccontextmanager
+async def model_slot(model_name):
+    """
+    Scheduler etkinse model için slot alır, değilse doğrudan devam eder.
+    """
+    scheduler = get_model_scheduler(model_name)
+    if scheduler is None:
+        yield
+        return
+    async with scheduler.slot(model_name):
+        yield
+
+
+def scheduler_stats():
+    return {
+        "enabled": LLM_SCHEDULER_ENABLED,
+        "groups": [
+            {"backends": list(group), **scheduler.stats()}
+            for group, scheduler in _schedulers.items()
+        ]
+    }
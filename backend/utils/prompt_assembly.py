@@ -0,0 +1,166 @@
+"""
+prompt_assembly.py
+------------------
+Prefix-stable prompt düzeni.
+Talimatlar ve system suffix sabit bir `system` mesajında, yüklenen kod ve dokümanlar `user`
+mesajında gönderilir. Böylece aynı prompt sürümüyle yapılan tüm istekler ve bir isteğin
+tüm chunk'ları aynı prefix ile başlar ve inference sunucusunun KV önbelleğinden yararlanır.
+
+Destekleyen backend'lere (LLM_PROMPT_CACHE_HINTS) `cache_prompt` ve prefix'e göre sabit
+`id_slot` ipuçları eklenir. Stream isteklerinde ilk token gecikmesi (TTFT) aynı prefix'in
+ilk (soğuk) ve sonraki (sıcak) kullanımları için ayrı ölçülür.
+"""
+
+import hashlib
+import logging
+import zlib
+from collections import OrderedDict
+from config import LLM_PROMPT_LAYOUT, LLM_PROMPT_CACHE_HINTS
+from utils.prompt_template import compile_template
+
+logger = logging.getLogger(__name__)
+
+# Etiket olarak kullanılacak önceki satırın en fazla uzunluğu
+MAX_LABEL_LENGTH = 80
+# TTFT istatistiği tutulan en fazla prefix sayısı
+MAX_TRACKED_PREFIXES = 512
+
+
+def _label_for(template, index, name):
+    line_start = template.rfind("\n", 0, index) + 1
+    label = template[line_start:index].strip()
+    if not label:
+        # Yer tutucu kendi satırındaysa bir önceki dolu satır etiket kabul edilir
+        previous = template[:line_start].rstrip().rsplit("\n", 1)[-1].strip()
+        if previous and len(previous) <= MAX_LABEL_LENGTH:
+            label = previous
+    label = label.rstrip(":").strip() or name
+    return label.replace("{", "").replace("}", "")
+
+
+def split_template(template, payload_names, **fields):
+    """
+    Prompt şablonunu statik system mesajı ve değişken içerik için user şablonuna ayırır.
+
+    :param template: Talimatlar ve yer tutucular içeren prompt (used_prompt + system_suffix).
+    :param payload_names: User mesajına taşınacak yer tutucular (ör: ["code", "requirement_document"]).
+    :param fields: System mesajında aynen render edilecek diğer yer tutucular (ör: today).
+    :return: (system mesajı, user şablonu) ikilisi; user şablonu yalnızca etiketler ve payload
+        yer tutucularını içeren derlenmiş PromptTemplate'tir.
+    """
+    compiled = compile_template(template)
+    found = []
+    for name in payload_names:
+        index = template.find("{" + name + "}")
+        if index >= 0 and name in compiled.placeholders:
+            found.append((index, name, _label_for(template, index, name)))
+    found.sort()
+    markers = {name: f"[{label}: provided in the user message]" for _, name, label in found}
+    # Şablonda bulunmayan payload alanları boş render edilir
+    markers.update({name: "" for name in payload_names if name not in markers})
+    system_prompt = compiled.render(markers, **fields).text
+    user_template = compile_template("\n\n".join(f"{label}:\n{{{name}}}" for _, name, label in found))
+    return system_prompt, user_template
+
+
+def assemble_prompt(template, payload_names, **fields):
+    """
+    LLM_PROMPT_LAYOUT ayarına göre promptu düzenler.
+
+    :return: (system mesajı veya None, payload ile render edilecek derlenmiş şablon) ikilisi.
+        "inline" düzeninde system mesajı None, şablon ise promptun kendisidir.
+    """
+    if LLM_PROMPT_LAYOUT == "split":
+        return split_template(template, payload_names, **fields)
+    return None, compile_template(template)
+
+
+def prefix_key(system_prompt, prompt):
+    """
+    TTFT istatistikleri ve slot seçimi için prefix anahtarı (system mesajı yoksa promptun başı).
+    """
+    prefix = system_prompt if system_prompt else prompt[:2048]
+    return hashlib.sha1(prefix.encode("utf-8")).hexdigest()[:16]
+
+
+def apply_cache_hints(payload, backend_url, key):
+    """
+    Backend destekliyorsa payload'a prompt önbellek ipuçlarını ekler; payload kopyalanarak döner.
+
+    :param key: prefix_key; aynı prefix'li istekler aynı slota yönlendirilir.
+    """
+    hints = LLM_PROMPT_CACHE_HINTS.get(backend_url) or LLM_PROMPT_CACHE_HINTS.get("*")
+    if not hints:
+        return payload
+    payload = dict(payload)
+    if hints.get("cache_prompt"):
+        payload["cache_prompt"] = True
+    slots = int(hints.get("slots") or 0)
+    if slots > 0:
+        payload["id_slot"] = zlib.crc32(key.encode("utf-8")) % slots
+    return payload
+
+
+class PrefixCacheStats:
+    def __init__(self, max_prefixes=MAX_TRACKED_PREFIXES):
+        self.max_prefixes = max_prefixes
+        self._seen = OrderedDict()
+        self._ttft = {}
+        self.cached_prompt_tokens = 0
+        self.prompt_tokens = 0
+
+    def record_ttft(self, model_name, key, seconds):
+        """
+        İlk token gecikmesini kaydeder; prefix'in ilk kullanımı soğuk, sonrakiler sıcak sayılır.
+        """
+        warm = key in self._seen
+        self._seen[key] = True
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.max_prefixes:
+            self._seen.popitem(last=False)
+        bucket = self._ttft.setdefault(model_name, {"cold": [0, 0.0], "warm": [0, 0.0]})
+        entry = bucket["warm" if warm else "cold"]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def record_usage(self, usage):
+        """
+        Sunucunun döndürdüğü `usage` bilgisinden önbellekten okunan prompt token'larını kaydeder.
+        """
+        if not usage:
+            return
+        self.prompt_tokens += usage.get("prompt_tokens") or 0
+        details = usage.get("prompt_tokens_details") or {}
+        self.cached_prompt_tokens += details.get("cached_tokens") or 0
+
+    def stats(self):
+        models = {}
+        for model, bucket in self._ttft.items():
+            cold = bucket["cold"][1] / bucket["cold"][0] if bucket["cold"][0] else None
+            warm = bucket["warm"][1] / bucket["warm"][0] if bucket["warm"][0] else None
+            models[model] = {
+                "cold_requests": bucket["cold"][0],
+                "warm_requests": bucket["warm"][0],
+                "cold_ttft_s": round(cold, 3) if cold is not None else None,
+                "warm_ttft_s": round(warm, 3) if warm is not None else None,
+                "ttft_saving_pct": round(100 * (1 - warm / cold), 1) if cold and warm is not None else None
+            }
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "ttft": models
+        }
+
+
+_prefix_cache_stats = None
+
+
+def get_prefix_cache_stats():
+    """
+    Süreç genelinde paylaşılan PrefixCacheStats örneğini döndürür.
+    """
+    global _prefix_cache_stats
+    if _prefix_cache_stats is None:
+        _prefix_cache_stats = PrefixCacheStats()
+    return _prefix_cache_stats
+
@@ -0,0 +1,106 @@
+"""
+prompt_template.py
+------------------
+Ön derlenmiş, güvenli prompt şablonları.
+`str.format` kullanıcı promptlarındaki tek süslü parantezlerde (ör: JSON örnekleri) KeyError /
+ValueError fırlatır ve çok MB'lık içeriği birkaç kez kopyalar. Burada şablon metni bir kez
+literal parçalar ve yer tutucular olarak ayrıştırılır (metin, yani prompt sürümü bazında
+önbelleğe alınır); render işlemi parçaları tek geçişte birleştirir ve token tahminini de döndürür.
+
+Söz dizimi `str.format` ile uyumludur: `{name}` yer tutucu, `{{` ve `}}` literal süslü parantezdir.
+Değeri verilmeyen yer tutucular ve diğer tüm süslü parantezler metinde olduğu gibi kalır.
+"""
+
+import re
+from functools import lru_cache
+from utils.token_counter import count_tokens
+
+_TOKEN_RE = re.compile(r"\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class RenderedPrompt:
+    def __init__(self, text, tokens):
+        self.text = text
+        # Parça bazında toplanan token tahmini (literal kısımlar şablon başına bir kez sayılır)
+        self.tokens = tokens
+
+    def __str__(self):
+        return self.text
+
+
+class PromptTemplate:
+    def __init__(self, text=None, literals=None, names=None):
+        """
+        :param text: Şablon metni; verilmezse literals/names doğrudan kullanılır.
+        """
+        if text is not None:
+            literals, names = self._parse(text)
+        # len(literals) == len(names) + 1; render: literals[0] + v0 + literals[1] + ...
+        self._literals = tuple(literals)
+        self._names = tuple(names)
+        self.placeholders = tuple(dict.fromkeys(self._names))
+        self._literal_tokens = {}
+
+    @staticmethod
+    def _parse(text):
+        literals, names = [], []
+        current = []
+        position = 0
+        for match in _TOKEN_RE.finditer(text):
+            current.append(text[position:match.start()])
+            token = match.group(0)
+            if token == "{{":
+                current.append("{")
+            elif token == "}}":
+                current.append("}")
+            else:
+                literals.append("".join(current))
+                names.append(match.group(1))
+                current = []
+            position = match.end()
+        current.append(text[position:])
+        literals.append("".join(current))
+        return literals, names
+
+    def _tokens_of_literals(self, model_name):
+        tokens = self._literal_tokens.get(model_name)
+        if tokens is None:
+            tokens = sum(count_tokens(literal, model_name) for literal in self._literals)
+            self._literal_tokens[model_name] = tokens
+        return tokens
+
+    def render(self, values=None, model_name=None, **kwargs):
+        """
+        Şablonu tek geçişte render eder.
+
+        :param values: Yer tutucu değerleri (dict); kwargs ile birleştirilir.
+        :param model_name: Token tahmininde kullanılacak model.
+        :return: RenderedPrompt (metin ve token tahmini).
+        """
+        if kwargs:
+            values = {**(values or {}), **kwargs}
+        values = values or {}
+        parts = [self._literals[0]]
+        tokens = self._tokens_of_literals(model_name)
+        counted = {}
+        for name, literal in zip(self._names, self._literals[1:]):
+            value = values.get(name)
+            if value is None:
+                # Bilinmeyen yer tutucu metinde aynen kalır
+                value = "{" + name + "}"
+            else:
+                value = str(value)
+            if name not in counted:
+                counted[name] = count_tokens(value, model_name)
+            tokens += counted[name]
+            parts.append(value)
+            parts.append(literal)
+        return RenderedPrompt("".join(parts), tokens)
+
+
+@lru_cache(maxsize=256)
+def compile_template(*parts):
+    """
+    Şablon parçalarını (ör: prompt ve system suffix) birleştirip derler; aynı metin için önbellekteki şablon döner.
+    """
+    return PromptTemplate("".join(parts))
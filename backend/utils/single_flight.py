@@ -0,0 +1,68 @@
+"""
+single_flight.py
+----------------
+Aynı anda gelen özdeş LLM isteklerini tek bir upstream çağrısında birleştirir.
+İlk gelen istek çağrıyı başlatır, aynı anahtarla gelen diğer istekler bu çağrının
+sonucunu bekler. Çağrı ayrı bir task olarak çalıştığı için isteklerden biri iptal
+edilse bile diğer bekleyenler etkilenmez.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _on_done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Tüm bekleyenler iptal edildiyse hatanın "never retrieved" uyarısı vermemesi için
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, factory):
+        """
+        Anahtar için devam eden bir çağrı varsa onun sonucunu bekler, yoksa factory ile yenisini başlatır.
+
+        :param key: İsteği tanımlayan anahtar (ör: model + prompt hash).
+        :param factory: Argümansız, coroutine döndüren fonksiyon.
+        :return: Upstream çağrısının sonucu.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"Özdeş istek devam eden çağrıya bağlandı: {key[:12]}")
+        return await asyncio.shield(task)
+
+    def stats(self):
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.coalesced,
+            "coalesce_rate": round(self.coalesced / total, 4) if total else 0.0
+        }
+
+
+_single_flight = None
+
+
+def get_single_flight():
+    """
+    Süreç genelinde paylaşılan SingleFlight örneğini döndürür.
+    """
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
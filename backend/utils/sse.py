@@ -0,0 +1,54 @@
+"""
+sse.py
+------
+Server-sent events (SSE) yardımcıları.
+LLM'den gelen token'ları tarayıcıya `text/event-stream` formatında iletmek için kullanılır.
+"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # nginx gibi proxy'lerin yanıtı tamponlamasını engeller
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(data, event=None):
+    """
+    Tek bir SSE mesajı üretir.
+
+    :param data: JSON'a çevrilecek veri.
+    :param event: Opsiyonel event adı (ör: token, done, error).
+    :return: SSE formatında string.
+    """
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    message += f"data: {payload}\n\n"
+    return message
+
+
+async def stream_prompts(model_client, prompts, outputs, **kwargs):
+    """
+    Promptları sırayla stream eder ve her token için bir SSE `token` mesajı üretir.
+
+    :param model_client: stream_response metoduna sahip LLMClient.
+    :param prompts: Stream edilecek prompt listesi (tek prompt veya chunk'lar).
+    :param outputs: Her promptun tamamlanmış çıktısının ekleneceği liste.
+    :param kwargs: stream_response'a aktarılacak ek parametreler.
+    """
+    total = len(prompts)
+    for index, prompt in enumerate(prompts):
+        parts = []
+        async for token in model_client.stream_response(prompt, **kwargs):
+            parts.append(token)
+            yield format_sse({"chunk": index, "chunks": total, "token": token}, event="token")
+        outputs.append("".join(parts))
+        if total > 1:
+            yield format_sse({"chunk": index, "chunks": total}, event="chunk_done")
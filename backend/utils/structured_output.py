@@ -0,0 +1,158 @@
+"""
+structured_output.py
+--------------------
+Şemaya bağlı (JSON) LLM çıktıları.
+Süreçler çıktı şemasını bildirir; istek destekleyen backend'lerde `json_schema` response_format
+ile gönderilir ve sunucu çıktıyı şemaya göre kısıtlayarak (grammar-constrained decoding) üretir.
+Desteklemeyen backend'lerde response_format düşürülür (veya `json_object`e indirgenir);
+şemaya uymayan çıktılar sınırlı sayıda onarım isteğiyle düzeltilir.
+İlk denemede geçerli çıktı oranı süreç bazında izlenir.
+"""
+
+import json
+import logging
+import threading
+from config import LLM_STRUCTURED_OUTPUT
+from utils.map_reduce import parse_json_output
+from utils.prompt_template import compile_template
+from utils.validation import compile_schema
+
+logger = logging.getLogger(__name__)
+
+REPAIR_PROMPT = (
+    "Your previous answer does not match the required JSON schema.\n\n"
+    "Errors:\n{errors}\n\n"
+    "Required JSON schema:\n{schema}\n\n"
+    "Previous answer:\n{output}\n\n"
+    "Return only the corrected JSON value. Keep all of the original content that is valid. "
+    "Do not add explanations or code fences."
+)
+# Onarım promptunda listelenecek en fazla hata
+MAX_REPORTED_ERRORS = 20
+
+_MODES = ("json_schema", "json_object", "none")
+
+
+def response_format_for(schema, name):
+    """
+    OpenAI uyumlu `json_schema` response_format değerini üretir.
+    """
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": False}}
+
+
+# response_format'ı reddettiği gözlenen backend'ler (süreç ömrü boyunca kapalı kalır)
+_rejected_backends = set()
+
+
+def _mode_for(backend_url):
+    if backend_url in _rejected_backends:
+        return "none"
+    mode = LLM_STRUCTURED_OUTPUT.get(backend_url) or LLM_STRUCTURED_OUTPUT.get("*") or "none"
+    return mode if mode in _MODES else "none"
+
+
+def apply_response_format(payload, backend_url):
+    """
+    Payload'daki response_format'ı backend'in desteğine göre uyarlar; değişirse payload kopyalanarak döner.
+    """
+    response_format = payload.get("response_format")
+    if not response_format or response_format.get("type") != "json_schema":
+        return payload
+    mode = _mode_for(backend_url)
+    get_structured_output_stats().record_request(mode)
+    if mode == "json_schema":
+        return payload
+    payload = dict(payload)
+    if mode == "json_object":
+        payload["response_format"] = {"type": "json_object"}
+    else:
+        del payload["response_format"]
+    return payload
+
+
+def mark_response_format_rejected(backend_url):
+    """
+    Backend response_format içeren isteği reddettiğinde çağrılır; sonraki istekler onsuz gönderilir.
+    """
+    if backend_url not in _rejected_backends:
+        logger.warning(f"{backend_url} response_format desteklemiyor; yapısal çıktı bu backend için kapatıldı.")
+        _rejected_backends.add(backend_url)
+
+
+def check_output(text, schema):
+    """
+    Çıktıyı JSON olarak okuyup şemaya göre doğrular.
+
+    :return: (JSON değeri veya None, hata listesi) ikilisi.
+    """
+    try:
+        value = parse_json_output(text)
+    except ValueError as e:
+        return None, [f"$: output is not valid JSON ({str(e)})"]
+    return value, compile_schema(schema).errors(value)
+
+
+def repair_prompt(text, schema, errors):
+    """
+    Şemaya uymayan çıktı için onarım promptu.
+    """
+    listed = errors[:MAX_REPORTED_ERRORS]
+    if len(errors) > len(listed):
+        listed.append(f"... and {len(errors) - len(listed)} more")
+    return compile_template(REPAIR_PROMPT).render(
+        errors="\n".join(f"- {error}" for error in listed),
+        schema=json.dumps(schema, ensure_ascii=False),
+        output=text
+    ).text
+
+
+class StructuredOutputStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {mode: 0 for mode in _MODES}
+        self._outputs = {}
+
+    def record_request(self, mode):
+        with self._lock:
+            self.requests[mode] += 1
+
+    def record_output(self, name, first_pass_valid, repairs, valid):
+        """
+        :param first_pass_valid: İlk çıktı şemaya uygun muydu.
+        :param repairs: Yapılan onarım isteği sayısı.
+        :param valid: Son çıktı şemaya uygun mu.
+        """
+        with self._lock:
+            entry = self._outputs.setdefault(name, {"outputs": 0, "first_pass_valid": 0, "repaired": 0, "failed": 0, "repair_requests": 0})
+            entry["outputs"] += 1
+            entry["repair_requests"] += repairs
+            if first_pass_valid:
+                entry["first_pass_valid"] += 1
+            elif valid:
+                entry["repaired"] += 1
+            else:
+                entry["failed"] += 1
+
+    def stats(self):
+        with self._lock:
+            outputs = {
+                name: {
+                    **entry,
+                    "first_pass_valid_rate": round(entry["first_pass_valid"] / entry["outputs"], 3) if entry["outputs"] else None
+                }
+                for name, entry in self._outputs.items()
+            }
+            return {"requests_by_mode": dict(self.requests), "rejected_backends": sorted(_rejected_backends), "outputs": outputs}
+
+
+_structured_output_stats = None
+
+
+def get_structured_output_stats():
+    """
+    Süreç genelinde paylaşılan StructuredOutputStats örneğini döndürür.
+    """
+    global _structured_output_stats
+    if _structured_output_stats is None:
+        _structured_output_stats = StructuredOutputStats()
+    return _structured_output_stats
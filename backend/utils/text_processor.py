@@ -1,9 +1,166 @@
 import logging
+import re
+import time
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.token_counter import count_tokens
+from utils.code_chunker import chunk_code
+from utils.prompt_template import compile_template
+
+# Birleştirilmiş dosya içeriklerindeki dosya sınırları ("\n\n### File: name\n\n")
+_FILE_BOUNDARY_RE = re.compile(r"(?=\n\n### File: )")
+_FILE_HEADER_RE = re.compile(r"\n\n### File: ([^\n]*)\n\n")
+# Sözdizimi sınırı: boş satırdan sonra girintisiz başlayan satır (üst seviye def/class/fonksiyon, kapanan blok sonrası vb.)
+_TOP_LEVEL_RE = re.compile(r"\n[ \t]*\n(?=\S)")
+_LINE_RE = re.compile(r"\n")
+_SPLIT_LEVELS = (_TOP_LEVEL_RE, _LINE_RE)
+
+
+def _cut(text, pattern):
+    """
+    Metni desenin eşleştiği konumlardan böler; ayraçlar önceki parçada kalır.
+    """
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        end = match.end()
+        if start < end < len(text):
+            pieces.append(text[start:end])
+            start = end
+    pieces.append(text[start:])
+    return pieces
+
 
 class TextProcessor:
-    def count_tokens(self, text: str) -> int:
-        return len(text.split())
+    def count_tokens(self, text: str, model_name: str = None) -> int:
+        return count_tokens(text, model_name)
+
+    def chunk_text(self, template, payload: dict, max_tokens: int, model_name: str = None, **fields) -> list:
+        """
+        Promptu, talimat kısmını ve system suffix'i her chunk'ta koruyarak böler.
+        Yalnızca değişken içerik (payload) bölünür: önce `### File:` sınırlarından; sığmayan
+        kaynak dosyalar tanım sınırlarından (bkz. utils/code_chunker.py), diğer içerik üst
+        seviye sözdizimi sınırlarından, gerekirse satırlardan. Metin tek geçişte işlenir.
+
+        :param template: Yer tutucular içeren prompt (talimatlar + {code} vb. + system suffix);
+            metin veya derlenmiş PromptTemplate (bkz. utils/prompt_template.py).
+        :param payload: Bölünebilecek alanlar (ör: {"code": ..., "requirement_document": ...}).
+            En büyük alan bölünür; diğerleri bütçenin yarısına sığıyorsa her chunk'ta tekrarlanır.
+        :param max_tokens: Chunk başına prompt token bütçesi (talimatlar dahil).
+        :param model_name: Token sayımında kullanılacak model.
+        :param fields: Her chunk'ta aynen kullanılacak diğer yer tutucu değerleri (ör: today).
+        :return: Her biri talimatların tamamını içeren render edilmiş prompt listesi.
+        :raises ValueError: Talimatlar tek başına bütçeyi dolduruyorsa.
+        """
+        logger = logging.getLogger(__name__)
+        started = time.perf_counter()
+
+        if isinstance(template, str):
+            template = compile_template(template)
+        names = sorted(payload, key=lambda name: len(payload[name]))
+        pinned = {name: "" for name in payload}
+        overhead = template.render(pinned, model_name, **fields).tokens
+        if overhead >= max_tokens:
+            raise ValueError(f"Prompt talimatları ({overhead} token) chunk bütçesini ({max_tokens}) aşıyor.")
+
+        # Küçük bağlam alanları (ör: gereksinim dokümanı) her chunk'a eklenir, en büyük alan bölünür.
+        # En büyük alan burada sayılmaz; token'ları parçalanırken sayılır.
+        pin_budget = (max_tokens - overhead) // 2
+        for name in names[:-1]:
+            tokens = self.count_tokens(payload[name], model_name)
+            if tokens <= pin_budget:
+                pinned[name] = payload[name]
+                pin_budget -= tokens
+                overhead += tokens
+        split_fields = [name for name in payload if payload[name] and not pinned[name]]
+        budget = max_tokens - overhead
+
+        bins = []
+        current, current_tokens = {}, 0
+        for name in split_fields:
+            for segment, tokens, continuation in self._payload_segments(payload[name], budget, model_name):
+                if current_tokens and current_tokens + tokens > budget:
+                    bins.append(current)
+                    current, current_tokens = {}, 0
+                if not current_tokens and continuation:
+                    # Chunk bir dosyanın ortasından başlıyorsa dosya başlığı tekrarlanır
+                    segment = continuation[0] + segment
+                    tokens += continuation[1]
+                current.setdefault(name, []).append(segment)
+                current_tokens += tokens
+        if current_tokens or not bins:
+            bins.append(current)
+
+        prompts = []
+        for parts in bins:
+            values = dict(pinned)
+            values.update({name: "".join(segments) for name, segments in parts.items()})
+            prompts.append(template.render(values, **fields).text)
+
+        elapsed = time.perf_counter() - started
+        size_mb = sum(len(text) for text in payload.values()) / (1024 * 1024)
+        logger.info(
+            f"chunk_text: {size_mb:.2f} MB içerik {len(prompts)} chunk'a bölündü "
+            f"(bütçe {max_tokens} token, talimatlar {overhead} token) - "
+            f"{elapsed * 1000:.1f} ms, {size_mb / elapsed if elapsed else 0:.1f} MB/s"
+        )
+        return prompts
+
+    def _payload_segments(self, text, budget, model_name):
+        """
+        İçeriği bütçeye sığan parçalara böler.
+
+        :return: (parça, token sayısı, devam başlığı) üçlüleri; devam başlığı bölünmüş dosyanın
+            sonraki parçaları için (başlık metni, token sayısı), diğerleri için None.
+        """
+        for section in _cut(text, _FILE_BOUNDARY_RE):
+            tokens = self.count_tokens(section, model_name)
+            if tokens <= budget:
+                yield section, tokens, None
+                continue
+            header = _FILE_HEADER_RE.match(section)
+            continuation = None
+            if header:
+                filename = header.group(1)
+                parts = self._code_parts(filename, section[header.end():], budget, model_name)
+                if parts:
+                    yield from parts
+                    continue
+                header_text = f"\n\n### File: {filename} (continued)\n\n"
+                continuation = (header_text, self.count_tokens(header_text, model_name))
+            piece_budget = max(1, budget - (continuation[1] if continuation else 0))
+            for index, (piece, piece_tokens) in enumerate(self._split_to_budget(section, piece_budget, model_name)):
+                yield piece, piece_tokens, continuation if index else None
+
+    def _code_parts(self, filename, source, budget, model_name):
+        """
+        Desteklenen dillerde dosyayı tanım sınırlarından böler (bkz. utils/code_chunker.py).
+
+        :return: (parça, token sayısı, None) listesi; dosya sözdizimsel bölünemiyorsa None.
+        """
+        header_tokens = self.count_tokens(f"\n\n### File: {filename} (part 00/00)\n\n", model_name)
+        pieces = chunk_code(filename, source, budget - header_tokens, lambda text: self.count_tokens(text, model_name))
+        if not pieces:
+            return None
+        parts = []
+        for index, (piece, tokens) in enumerate(pieces, 1):
+            parts.append((f"\n\n### File: {filename} (part {index}/{len(pieces)})\n\n{piece}", tokens + header_tokens, None))
+        return parts
+
+    def _split_to_budget(self, text, budget, model_name, level=0):
+        if level >= len(_SPLIT_LEVELS):
+            # Tek satır bile bütçeyi aşıyorsa karakter oranına göre kesilir
+            tokens = self.count_tokens(text, model_name)
+            size = max(1, int(budget * len(text) / max(tokens, 1)))
+            for start in range(0, len(text), size):
+                piece = text[start:start + size]
+                yield piece, self.count_tokens(piece, model_name)
+            return
+        for piece in _cut(text, _SPLIT_LEVELS[level]):
+            tokens = self.count_tokens(piece, model_name)
+            if tokens <= budget:
+                yield piece, tokens
+            else:
+                yield from self._split_to_budget(piece, budget, model_name, level + 1)
 
     def split_text_into_chunks(self, text: str, base_chunk_size: int = 1000, overlap: int = 100, llm_token_limit: int = 4096, min_chunk_size: int = 500) -> list:
         logger = logging.getLogger(__name__)
@@ -1,17 +1,19 @@
 import logging
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils import token_counter
 
 # Logger ayarları
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def count_tokens(text: str) -> int:
+def count_tokens(text: str, model_name: str = None) -> int:
     """
-    Metindeki token sayısını basit bir şekilde hesaplar (kelime bazında).
+    Metindeki token sayısını hesaplar. Model tokenizer'ı varsa gerçek BPE sayımı, yoksa yaklaşık sayım kullanılır.
     :param text: Token sayısı hesaplanacak metin.
+    :param model_name: Tokenizer'ı kullanılacak model (opsiyonel).
     :return: Token sayısı.
     """
-    return len(text.split())
+    return token_counter.count_tokens(text, model_name)
 
 def split_text_into_chunks(text: str, base_chunk_size: int = 1000, overlap: int = 100, llm_token_limit: int = 4096, min_chunk_size: int = 500) -> list:
     """
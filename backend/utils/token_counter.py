@@ -0,0 +1,112 @@
+"""
+token_counter.py
+----------------
+Model bazlı token sayımı.
+Boşluğa göre kelime saymak kod için gerçek BPE token sayısını 2-4 kat eksik hesaplar.
+Bu modül her model için yerel dosyadan tembel (lazy) yüklenen ve önbelleğe alınan bir
+tokenizer kullanır; tokenizer bulunamazsa hızlı yaklaşık sayıma düşer.
+
+Tokenizer dosyaları HuggingFace `tokenizer.json` formatındadır ve opsiyonel `tokenizers`
+paketiyle okunur: <LLM_TOKENIZER_DIR>/<model_identifier>/tokenizer.json
+"""
+
+import logging
+import os
+import re
+import threading
+from config import LLM_TOKEN_COUNT_MODE, LLM_TOKENIZER_DIR
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # opsiyonel bağımlılık
+    Tokenizer = None
+
+logger = logging.getLogger(__name__)
+
+# Kelimeleri en fazla 4 karakterlik parçalara, noktalama ve sembolleri tek tek ayırır.
+# BPE tokenizer'ların kod ve doğal dil üzerindeki davranışına yakın, tek geçişlik bir tahmin.
+_APPROX_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+class ApproximateTokenCounter:
+    name = "approximate"
+
+    def count(self, text):
+        if not text:
+            return 0
+        return len(_APPROX_TOKEN_RE.findall(text))
+
+
+class TokenizerTokenCounter:
+    name = "tokenizer"
+
+    def __init__(self, tokenizer, path):
+        self.tokenizer = tokenizer
+        self.path = path
+
+    def count(self, text):
+        if not text:
+            return 0
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+_approximate_counter = ApproximateTokenCounter()
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def _tokenizer_path(model_name):
+    for candidate in (
+        os.path.join(LLM_TOKENIZER_DIR, model_name, "tokenizer.json"),
+        os.path.join(LLM_TOKENIZER_DIR, f"{model_name}.json"),
+    ):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _load_counter(model_name):
+    if Tokenizer is None:
+        return _approximate_counter
+    path = _tokenizer_path(model_name)
+    if not path:
+        logger.info(f"{model_name} için tokenizer dosyası bulunamadı, yaklaşık sayım kullanılacak.")
+        return _approximate_counter
+    try:
+        counter = TokenizerTokenCounter(Tokenizer.from_file(path), path)
+        logger.info(f"{model_name} için tokenizer yüklendi: {path}")
+        return counter
+    except Exception as e:
+        logger.warning(f"{model_name} tokenizer'ı yüklenemedi ({path}): {str(e)}")
+        return _approximate_counter
+
+
+def get_token_counter(model_name=None, approximate=False):
+    """
+    Model için token sayacını döndürür; tokenizer ilk kullanımda yüklenip önbelleğe alınır.
+
+    :param model_name: Model identifier; None ise yaklaşık sayaç.
+    :param approximate: True ise tokenizer yüklenmeden hızlı yaklaşık sayaç döner.
+    """
+    if approximate or not model_name or LLM_TOKEN_COUNT_MODE == "approximate":
+        return _approximate_counter
+    counter = _counters.get(model_name)
+    if counter is None:
+        with _counters_lock:
+            counter = _counters.get(model_name)
+            if counter is None:
+                counter = _load_counter(model_name)
+                _counters[model_name] = counter
+    return counter
+
+
+def count_tokens(text, model_name=None, approximate=False):
+    """
+    Metnin token sayısını hesaplar.
+
+    :param text: Token sayısı hesaplanacak metin.
+    :param model_name: Tokenizer'ı kullanılacak model.
+    :param approximate: True ise hızlı yaklaşık mod.
+    :return: Token sayısı.
+    """
+    return get_token_counter(model_name, approximate).count(text)
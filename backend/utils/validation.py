@@ -2,39 +2,299 @@
 validation.py
 -------------
 LLM çıktısının (structured_output) belirli bir formata uygunluğunu kontrol eden fonksiyonları içerir.
+JSON şemaları bir kez doğrulayıcı fonksiyonlara derlenir ve önbellekte tutulur; her çağrıda
+şema sözlüğü yeniden gezilmez. Tüm hatalar JSON yolu ile (ör: $.scenarios[3].title) raporlanır.
+
+Desteklenen anahtarlar: type, properties, required, additionalProperties, items, minItems,
+maxItems, enum, const, format, pattern, minLength, maxLength, minimum, maximum.
 """
 
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from utils.map_reduce import parse_json_output
+
+# Derlenmiş şema önbelleğinin en fazla boyutu
+MAX_COMPILED_SCHEMAS = 256
+
+_TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+    "null": lambda value: value is None,
+}
+
+
+def _is_date(value):
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_datetime(value):
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return True
+    except ValueError:
+        return False
+
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_URI_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:\S+$")
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+_FORMAT_CHECKS = {
+    "date": _is_date,
+    "date-time": _is_datetime,
+    "email": lambda value: bool(_EMAIL_RE.match(value)),
+    "uri": lambda value: bool(_URI_RE.match(value)),
+    "uuid": lambda value: bool(_UUID_RE.match(value)),
+}
+
+
+def _compile(schema):
+    """
+    Şema düğümünü `check(value, path, errors)` fonksiyonuna derler.
+    Yalnızca şemada bulunan kurallar için kontrol üretilir.
+    """
+    checks = []
+
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or [])
+    type_check = None
+    if types:
+        type_checks = [_TYPE_CHECKS[name] for name in types if name in _TYPE_CHECKS]
+        if len(type_checks) == 1:
+            type_check = type_checks[0]
+        elif type_checks:
+            type_check = lambda value: any(check(value) for check in type_checks)
+    expected = " or ".join(types)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+        checks.append(check_enum)
+
+    if "const" in schema:
+        constant = schema["const"]
+
+        def check_const(value, path, errors):
+            if value != constant:
+                errors.append(f"{path}: should be {constant!r}")
+        checks.append(check_const)
+
+    groups = (
+        (str, _compile_string_rules(schema), {"string"}),
+        ((int, float), _compile_number_rules(schema), {"integer", "number"}),
+        (dict, _compile_object_rules(schema), {"object"}),
+        (list, _compile_array_rules(schema), {"array"}),
+    )
+    if len(types) == 1:
+        # Tek tipte yalnızca o tipin kuralları kalır; değer tipine göre dallanma gerekmez
+        for _, rules, names in groups:
+            if types[0] in names:
+                checks.extend(rules)
+        guarded = []
+    else:
+        guarded = [(python_type, rules) for python_type, rules, _ in groups if rules]
+
+    if not checks and not guarded:
+        if type_check is None:
+            return lambda value, path, errors: None
+
+        def check_type(value, path, errors):
+            if not type_check(value):
+                errors.append(f"{path}: should be {expected}")
+        return check_type
+
+    def check(value, path, errors):
+        if type_check is not None and not type_check(value):
+            errors.append(f"{path}: should be {expected}")
+            return
+        for rule in checks:
+            rule(value, path, errors)
+        for python_type, rules in guarded:
+            if isinstance(value, python_type) and not isinstance(value, bool):
+                for rule in rules:
+                    rule(value, path, errors)
+
+    return check
+
+
+def _compile_string_rules(schema):
+    rules = []
+    if "minLength" in schema or "maxLength" in schema:
+        low, high = schema.get("minLength", 0), schema.get("maxLength")
+
+        def check_length(value, path, errors):
+            if len(value) < low or (high is not None and len(value) > high):
+                errors.append(f"{path}: length {len(value)} is outside [{low}, {high if high is not None else '∞'}]")
+        rules.append(check_length)
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check_pattern(value, path, errors):
+            if not pattern.search(value):
+                errors.append(f"{path}: does not match pattern {pattern.pattern!r}")
+        rules.append(check_pattern)
+    format_check = _FORMAT_CHECKS.get(schema.get("format"))
+    if format_check:
+        format_name = schema["format"]
+
+        def check_format(value, path, errors):
+            if not format_check(value):
+                errors.append(f"{path}: is not a valid {format_name}")
+        rules.append(check_format)
+    return rules
+
+
+def _compile_number_rules(schema):
+    rules = []
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+
+        def check_minimum(value, path, errors):
+            if value < minimum:
+                errors.append(f"{path}: should be >= {minimum}")
+        rules.append(check_minimum)
+    if "maximum" in schema:
+        maximum = schema["maximum"]
+
+        def check_maximum(value, path, errors):
+            if value > maximum:
+                errors.append(f"{path}: should be <= {maximum}")
+        rules.append(check_maximum)
+    return rules
+
+
+def _key_path(key):
+    """
+    Nesne anahtarının JSON yolu eki; tanımlayıcı olmayan anahtarlar ["Task Name"] biçiminde yazılır.
+    """
+    return f".{key}" if key.isidentifier() else f"[{json.dumps(key, ensure_ascii=False)}]"
+
+
+def _compile_object_rules(schema):
+    rules = []
+    # Anahtar -> (doğrulayıcı, JSON yolu eki)
+    properties = {key: (_compile(value), _key_path(key)) for key, value in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", True)
+
+    if required:
+        def check_required(value, path, errors):
+            for key in required:
+                if key not in value:
+                    errors.append(f"{path}: missing required key '{key}'")
+        rules.append(check_required)
+    if properties:
+        def check_properties(value, path, errors):
+            for key, item in value.items():
+                entry = properties.get(key)
+                if entry is not None:
+                    entry[0](item, path + entry[1], errors)
+        rules.append(check_properties)
+    if additional is False:
+        def check_additional(value, path, errors):
+            for key in value:
+                if key not in properties:
+                    errors.append(f"{path}: unexpected key '{key}'")
+        rules.append(check_additional)
+    elif isinstance(additional, dict):
+        additional_check = _compile(additional)
+
+        def check_additional_schema(value, path, errors):
+            for key, item in value.items():
+                if key not in properties:
+                    additional_check(item, path + _key_path(key), errors)
+        rules.append(check_additional_schema)
+    return rules
+
+
+def _compile_array_rules(schema):
+    rules = []
+    if "minItems" in schema or "maxItems" in schema:
+        low, high = schema.get("minItems", 0), schema.get("maxItems")
+
+        def check_size(value, path, errors):
+            if len(value) < low or (high is not None and len(value) > high):
+                errors.append(f"{path}: {len(value)} items is outside [{low}, {high if high is not None else '∞'}]")
+        rules.append(check_size)
+    items = schema.get("items")
+    if isinstance(items, dict) and items:
+        item_check = _compile(items)
+
+        def check_items(value, path, errors):
+            for index, item in enumerate(value):
+                item_check(item, f"{path}[{index}]", errors)
+        rules.append(check_items)
+    return rules
+
+
+class SchemaValidator:
+    def __init__(self, schema):
+        self.schema = schema
+        self._check = _compile(schema)
+
+    def errors(self, data, path="$"):
+        """
+        :return: JSON yollarıyla birlikte tüm doğrulama hataları (geçerliyse boş liste).
+        """
+        errors = []
+        self._check(data, path, errors)
+        return errors
+
+
+_validators = OrderedDict()
+_validators_lock = threading.Lock()
+
+
+def compile_schema(schema):
+    """
+    Şemanın derlenmiş doğrulayıcısını döndürür.
+    Aynı şema nesnesi (ör: modül seviyesindeki sabitler) bir kez derlenir; önbellek LRU olarak sınırlıdır.
+    """
+    key = id(schema)
+    with _validators_lock:
+        validator = _validators.get(key)
+        if validator is not None and validator.schema is schema:
+            _validators.move_to_end(key)
+            return validator
+    validator = SchemaValidator(schema)
+    with _validators_lock:
+        _validators[key] = validator
+        if len(_validators) > MAX_COMPILED_SCHEMAS:
+            _validators.popitem(last=False)
+    return validator
+
+
 def validate_output_format(data, schema):
     """
     Veriyi belirtilen şemaya göre doğrular.
-    
-    :param data: LLM'den gelen sonuç (dictionary).
-    :param schema: Beklenen JSON şeması veya benzeri bir yapı (dictionary).
-    :return: (bool, str): Doğrulama sonucu ve mesaj.
-    """
-    # Şemanın türü "object" değilse hata döndür
-    if schema.get("type") != "object":
-        return False, "Only object type is supported"
-
-    # Gelen veri bir sözlük (dictionary) değilse hata döndür
-    if not isinstance(data, dict):
-        return False, "Data is not a dictionary"
-
-    # Şemadaki her bir özellik (property) için kontrol yap
-    for key, value_schema in schema.get("properties", {}).items():
-        # Anahtar veride mevcutsa tipi kontrol et
-        if key in data:
-            value = data[key]
-            expected_type = value_schema.get("type")
-            
-            if expected_type == "string" and not isinstance(value, str):
-                return False, f"{key} should be a string"
-            elif expected_type == "integer" and not isinstance(value, int):
-                return False, f"{key} should be an integer"
-            # İhtiyaca göre diğer tipler (örneğin, "list", "boolean") eklenebilir
-        # Anahtar veride yoksa ve zorunluysa hata döndür
-        elif key in schema.get("required", []):
-            return False, f"Missing required key: {key}"
+
+    :param data: LLM'den gelen sonuç (dictionary, list veya JSON içeren metin).
+    :param schema: Beklenen JSON şeması (dictionary).
+    :return: (bool, str): Doğrulama sonucu ve mesaj (geçersizse tüm hatalar JSON yollarıyla).
+    """
+    if isinstance(data, str):
+        try:
+            data = parse_json_output(data)
+        except ValueError as e:
+            return False, f"Data is not valid JSON: {str(e)}"
+
+    errors = compile_schema(schema).errors(data)
+    if errors:
+        return False, "; ".join(errors)
 
     # Tüm kontroller başarılıysa doğrulama geçerli
-    return True, "Validation successful"
\ No newline at end of file
+    return True, "Validation successful"